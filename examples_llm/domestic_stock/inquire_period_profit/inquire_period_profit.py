@@ -37,8 +37,8 @@ def inquire_period_profit(
     tr_cont: str = "",  # 연속거래여부
     dataframe1: Optional[pd.DataFrame] = None,  # 누적 데이터프레임1
     dataframe2: Optional[pd.DataFrame] = None,  # 누적 데이터프레임2
-    depth: int = 0,  # 내부 재귀깊이 (자동관리)
-    max_depth: int = 10  # 최대 재귀 횟수 제한
+    depth: int = 0,  # 이미 조회한 페이지 수 (자동관리)
+    max_depth: int = 10  # 최대 연속조회 횟수 제한
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     기간별손익일별합산조회 API입니다.
@@ -58,8 +58,8 @@ def inquire_period_profit(
         tr_cont (str): 연속거래여부
         dataframe1 (Optional[pd.DataFrame]): 누적 데이터프레임1
         dataframe2 (Optional[pd.DataFrame]): 누적 데이터프레임2
-        depth (int): 내부 재귀깊이 (자동관리)
-        max_depth (int): 최대 재귀 횟수 제한
+        depth (int): 이미 조회한 페이지 수 (자동관리)
+        max_depth (int): 최대 연속조회 횟수 제한
 
     Returns:
         Tuple[pd.DataFrame, pd.DataFrame]: 기간별손익일별합산조회 데이터 (output1, output2)
@@ -115,37 +115,19 @@ def inquire_period_profit(
         "CTX_AREA_NK100": NK100
     }
     
-    res = ka._url_fetch(API_URL, tr_id, tr_cont, params)
-    
-    if res.isOK():
-        # output1 처리 (array)
-        current_data1 = pd.DataFrame(res.getBody().output1)
-        if dataframe1 is not None:
-            dataframe1 = pd.concat([dataframe1, current_data1], ignore_index=True)
-        else:
-            dataframe1 = current_data1
-            
-        # output2 처리 (object)
-        current_data2 = pd.DataFrame(res.getBody().output2, index=[0])
-        if dataframe2 is not None:
-            dataframe2 = pd.concat([dataframe2, current_data2], ignore_index=True)
-        else:
-            dataframe2 = current_data2
-            
-        tr_cont = res.getHeader().tr_cont
-        FK100 = res.getBody().ctx_area_fk100
-        NK100 = res.getBody().ctx_area_nk100
-        
-        if tr_cont in ["M", "F"]:  # 다음 페이지 존재
-            logging.info("Call Next page...")
-            ka.smart_sleep()  # 시스템 안정적 운영을 위한 지연
-            return inquire_period_profit(
-                cano, acnt_prdt_cd, inqr_strt_dt, inqr_end_dt, sort_dvsn, inqr_dvsn, cblc_dvsn,
-                pdno, NK100, FK100, "N", dataframe1, dataframe2, depth + 1, max_depth
-            )
-        else:
-            logging.info("Data fetch complete.")
-            return dataframe1, dataframe2
-    else:
-        res.printError(url=API_URL)
-        return pd.DataFrame(), pd.DataFrame() 
\ No newline at end of file
+    # 연속조회(tr_cont)는 ka.fetch_pages 에서 반복 호출하고, DataFrame 은 마지막에 한번만 생성
+    output1, output2 = ka.fetch_pages(
+        API_URL, tr_id, params,
+        outputs=("output1", "output2"),
+        cursor=ka.CTX_AREA_CURSOR_100,
+        tr_cont=tr_cont,
+        max_pages=max_depth - depth + 1
+    )
+
+    # 누적 데이터프레임이 전달된 경우 앞에 이어 붙여서 반환
+    if dataframe1 is not None:
+        output1 = pd.concat([dataframe1, output1], ignore_index=True)
+    if dataframe2 is not None:
+        output2 = pd.concat([dataframe2, output2], ignore_index=True)
+
+    return output1, output2
@@ -1,33 +1,44 @@
 # -*- coding: utf-8 -*-
 # ====|  (REST) 접근 토큰 / (Websocket) 웹소켓 접속키 발급 에 필요한 API 호출 샘플 아래 참고하시기 바랍니다.  |=====================
 # ====|  API 호출 공통 함수 포함                                  |=====================
+# ====|  import 시에는 설정 파일을 읽거나 파일을 만들지 않으며, pandas / websockets / pycryptodome / PyYAML 은
+# ====|  처음 사용할 때 import 한다. (REST 호출만 하는 경우 websockets / pycryptodome 은 import 하지 않음)
+# ====|  import 시간 목표 : 200ms 이내 (python -X importtime -c "import kis_auth" 로 확인)
 
-import asyncio
-import copy
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import heapq
+import inspect
+import itertools
 import json
 import logging
 import os
+import random
+import re
+import threading
 import time
-from base64 import b64decode
-from collections import namedtuple
-from collections.abc import Callable
+import weakref
+from collections import Counter, OrderedDict, deque, namedtuple
+from collections.abc import Callable, MutableMapping
+from concurrent.futures import Future, ThreadPoolExecutor, wait as futures_wait
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from io import StringIO
-
-import pandas as pd
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
 # pip install requests (패키지설치)
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 
-# 웹 소켓 모듈을 선언한다.
-import websockets
+if TYPE_CHECKING:
+    import asyncio
 
-# pip install PyYAML (패키지설치)
-import yaml
-from Crypto.Cipher import AES
-
-# pip install pycryptodome
-from Crypto.Util.Padding import unpad
+    import pandas as pd
+    import websockets
 
 clearConsole = lambda: os.system("cls" if os.name in ("nt", "dos") else "clear")
 
@@ -40,14 +51,48 @@ token_tmp = os.path.join(
     config_root, f"KIS{datetime.today().strftime("%Y%m%d")}"
 )  # 토큰 로컬저장시 파일명 년월일
 
-# 접근토큰 관리하는 파일 존재여부 체크, 없으면 생성
-if os.path.exists(token_tmp) == False:
-    f = open(token_tmp, "w+")
-
 # 앱키, 앱시크리트, 토큰, 계좌번호 등 저장관리, 자신만의 경로와 파일명으로 설정하시기 바랍니다.
-# pip install PyYAML (패키지설치)
-with open(os.path.join(config_root, "kis_devlp.yaml"), encoding="UTF-8") as f:
-    _cfg = yaml.load(f, Loader=yaml.FullLoader)
+config_path = os.path.join(config_root, "kis_devlp.yaml")
+
+
+# kis_devlp.yaml 설정값, 처음 값을 읽을 때 파일을 읽어들인다. (dict 와 같은 방식으로 사용)
+class _LazyConfig(MutableMapping):
+    def __init__(self, path: str):
+        self._path = path
+        self._data = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    # pip install PyYAML (패키지설치)
+                    import yaml
+
+                    with open(self._path, encoding="UTF-8") as f:
+                        self._data = yaml.load(f, Loader=yaml.FullLoader)
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+
+    def __delitem__(self, key):
+        del self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __repr__(self):
+        return repr(self._load())
+
+
+_cfg = _LazyConfig(config_path)
 
 _TRENV = tuple()
 _last_auth_time = datetime.now()
@@ -56,61 +101,347 @@ _DEBUG = False
 _isPaper = False
 _smartSleep = 0.1
 
+# HTTP 커넥션 풀 설정 (kis_devlp.yaml 에 pool_connections / pool_maxsize 를 지정하면 해당 값 사용)
+# None 이면 커넥션 풀을 처음 만들 때 kis_devlp.yaml 값(없으면 4 / 20)을 사용
+_poolConnections = None  # 풀을 유지할 호스트 수 (실전/모의 도메인 등)
+_poolMaxSize = None  # 호스트당 유지할 keep-alive 커넥션 수
+_httpAdapter = None
+_httpLock = threading.Lock()
+_httpLocal = threading.local()
+
+# 초당 호출 한도 (실전 20건, 모의 2건), kis_devlp.yaml 에 rate_limit_prod / rate_limit_vps 로 변경 가능
+_useRateLimiter = True  # False 로 두면 기존처럼 smart_sleep() 의 고정 지연만 사용
+# asyncio 호출시 이미 이벤트 루프에서 토큰을 받아둔 호출 한도 관리 객체 (작업 스레드에서 중복 대기 방지)
+_prepaidToken = contextvars.ContextVar("kis_prepaid_token", default=None)
+
+# 요청 우선순위 (숫자가 작을수록 먼저 처리), 우선순위 스케줄러 사용시 적용
+PRIORITY_ORDER = 0  # 주문
+PRIORITY_CANCEL = 1  # 정정/취소
+PRIORITY_ACCOUNT = 2  # 잔고/체결/주문가능 조회
+PRIORITY_QUOTE = 3  # 시세/순위 조회
+PRIORITY_REFERENCE = 4  # 종목정보/재무/예탁원정보/휴장일 등 참조성 조회
+
+# 우선순위 스케줄러 사용 여부, None 이면 처음 사용할 때 kis_devlp.yaml 의 priority_scheduler 값(없으면 사용 안 함)
+_usePriorityScheduler = None
+# 우선순위별로 남겨둘 토큰 (버킷 크기 대비 비율), 해당 순위의 요청은 잔량이 이만큼 남도록만 토큰을 사용한다.
+_priorityReserve = {
+    PRIORITY_ORDER: 0.0,
+    PRIORITY_CANCEL: 0.0,
+    PRIORITY_ACCOUNT: 0.1,
+    PRIORITY_QUOTE: 0.2,
+    PRIORITY_REFERENCE: 0.3,
+}
+_trPriorities = {}  # TR id 별 우선순위 지정 (set_tr_priority)
+
+# asyncio 동시 호출 수 (kis_devlp.yaml 의 async_concurrency 로 변경 가능, None 이면 처음 사용할 때 설정값 적용)
+_asyncConcurrency = None
+_asyncExecutor = None
+_asyncSemaphores = weakref.WeakKeyDictionary()  # 이벤트 루프별 세마포어
+
 # 기본 헤더값 정의
 _base_headers = {
     "Content-Type": "application/json",
     "Accept": "text/plain",
     "charset": "UTF-8",
-    "User-Agent": _cfg["my_agent"],
 }
 
 
+# (tr_id, custtype) 별 요청 헤더 템플릿
+# 인증 정보가 포함된 기본 헤더로 TR 별 헤더를 한번만 만들어 두고, 요청마다 얕은 복사 후 tr_cont 만 추가한다.
+# 토큰이 바뀌면 새 HeaderTemplates 로 교체하므로 만들어진 템플릿은 변경하지 않는다.
+class HeaderTemplates:
+    def __init__(self, base: dict):
+        self.base = MappingProxyType(dict(base))
+        self._templates = {}
+
+    def get(self, tr_id: str, custtype: str = "P") -> MappingProxyType:
+        template = self._templates.get((tr_id, custtype))
+        if template is None:
+            headers = dict(self.base)
+            headers["tr_id"] = tr_id  # 트랜젝션 TR id
+            headers["custtype"] = custtype  # 일반(개인고객,법인고객) "P", 제휴사 "B"
+            template = MappingProxyType(headers)
+            self._templates[(tr_id, custtype)] = template
+        return template
+
+
+_headerTemplates = None
+
+
+# 현재 환경(KISClient 또는 auth() 로 설정한 전역 환경)의 헤더 템플릿
+def _getHeaderTemplates() -> HeaderTemplates:
+    client = _currentClient.get()
+    if client is not None:
+        return client.headerTemplates
+    templates = _headerTemplates
+    if templates is None:
+        templates = _resetHeaderTemplates()
+    return templates
+
+
+# _base_headers 변경 후 호출하여 헤더 템플릿을 새로 만든다.
+def _resetHeaderTemplates() -> HeaderTemplates:
+    global _headerTemplates
+    if "User-Agent" not in _base_headers:
+        _base_headers["User-Agent"] = _cfg["my_agent"]
+    _headerTemplates = HeaderTemplates(_base_headers)
+    return _headerTemplates
+
+
+# 토큰 재발급 예약 (만료 전에 _autoReAuth 가 True 이면 reauth 실행)
+# 요청마다 유효시간을 확인하지 않고, 인증 시점에 만료(refresh_margin 전) 시각으로 타이머를 걸어 백그라운드에서 재발급한다.
+# 타이머는 항상 예약하고 실행 시점에 _autoReAuth 를 확인하므로 auth() 후에 켜도 적용된다.
+# 실행 시점에 꺼져 있으면 다시 예약하지 않으며, 이후 set_auto_reauth(True) 로 켜면 바로 재발급한다.
+# reauth 가 weakref.WeakMethod 이면 타이머가 객체(KISClient)를 붙잡지 않고, 객체가 사라지면 재발급을 멈춘다.
+_reAuthTimers = {}  # "rest" / "ws": threading.Timer
+_reAuthClients = weakref.WeakSet()  # 재발급 타이머가 있는 KISClient
+
+
+def _scheduleReAuth(timers: dict, kind: str, delay: float, reauth: Callable):
+    def run():
+        if not _autoReAuth or timers.get(kind) is not timer:  # 자동 재발급 해제 또는 다른 타이머로 교체됨
+            return
+        func = reauth() if isinstance(reauth, weakref.WeakMethod) else reauth
+        if func is None:  # 객체가 사라짐
+            return
+        func()  # 재발급에 성공하면 reauth 안에서 다음 재발급을 다시 예약
+        if timers.get(kind) is timer:  # 재발급에 실패하면 1분 후 다시 시도
+            _scheduleReAuth(timers, kind, 60.0, reauth)
+
+    old_timer = timers.get(kind)
+    if old_timer is not None:
+        old_timer.cancel()
+    timer = threading.Timer(min(max(delay, 1.0), threading.TIMEOUT_MAX), run)
+    timer.daemon = True
+    timer.reauth = reauth  # set_auto_reauth 에서 다시 예약할 때 사용
+    timers[kind] = timer
+    timer.start()
+
+
+# 토큰 자동 재발급 설정, 켜면 꺼져 있는 동안 만료 시각이 지나 멈춘 재발급을 바로 실행
+def set_auto_reauth(enabled: bool = True):
+    global _autoReAuth
+    _autoReAuth = enabled
+    if not enabled:
+        return
+    for timers in [_reAuthTimers] + [client._reAuthTimers for client in list(_reAuthClients)]:
+        for kind, timer in list(timers.items()):
+            if timer.finished.is_set():
+                _scheduleReAuth(timers, kind, 0.0, timer.reauth)
+
+
+# 저장된 토큰의 만료(refresh_margin 전)까지 남은 시간(초)
+def _reAuthDelay(token_path: str = None) -> float:
+    store = _getTokenStore()
+    valid_date = store.valid_until(token_path) if token_path is not None else None
+    if valid_date is None:
+        return 86400.0 - store.refresh_margin
+    return (valid_date - datetime.now()).total_seconds() - store.refresh_margin + 1.0
+
+
+# 프로세스 간 잠금 (path + ".lock" 파일), 같은 토큰 파일을 쓰는 프로세스가 동시에 토큰을 발급하지 않도록 사용
+@contextmanager
+def _fileLock(path: str):
+    with open(path + ".lock", "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK 은 10초 대기 후 실패하므로 다시 시도
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# 접근토큰 저장소
+# 장 시작 시 여러 프로세스가 동시에 auth() 를 호출해도 앱키(토큰 파일)별로 토큰은 한번만 발급되도록 관리한다.
+# - 메모리 캐시 : 한번 확인한 유효 토큰은 파일을 다시 읽지 않음
+# - 파일 잠금 : 발급은 잠금 안에서 저장된 토큰을 다시 확인한 뒤 진행 (먼저 발급한 프로세스의 토큰을 재사용)
+# - 원자적 저장 : 임시 파일에 쓴 뒤 교체하여 다른 프로세스가 쓰다 만 파일을 읽지 않음
+# - 만료 전 갱신 : 만료까지 refresh_margin 초 미만 남은 토큰은 만료된 것으로 보고 새로 발급
+# backend 가 'shm' 이면 토큰을 공유 메모리에도 보관하여 다른 프로세스가 파일을 읽지 않고 바로 사용한다.
+class TokenStore:
+    SHM_SIZE = 65536  # 공유 메모리 크기 (8바이트 버전 + 4바이트 길이 + JSON)
+
+    def __init__(self, backend: str = "file", refresh_margin: float = 600.0, shm_name: str = "kis_token_store"):
+        if backend not in ("file", "shm"):
+            raise ValueError("backend must be 'file' or 'shm'")
+        self.backend = backend
+        self.refresh_margin = refresh_margin
+        self.issued = 0  # 이 프로세스에서 발급한 토큰 수
+        self._shmName = shm_name
+        self._shm = None
+        self._memory = {}  # token_path: (token, valid_date)
+        self._lock = threading.Lock()
+
+    def _isFresh(self, valid_date: datetime) -> bool:
+        return (valid_date - datetime.now()).total_seconds() > self.refresh_margin
+
+    # 유효한 토큰 확인, 없거나 만료 임박이면 None
+    def read(self, token_path: str):
+        entry = self._memory.get(token_path)
+        if entry is None or not self._isFresh(entry[1]):
+            entry = self._load(token_path)
+            if entry is None or not self._isFresh(entry[1]):
+                return None
+            self._memory[token_path] = entry
+        return entry[0]
+
+    # 유효한 토큰이 없으면 issue() 로 발급하여 저장, issue 는 (토큰, 만료일시 문자열) 또는 (None, None) 반환
+    def get_or_issue(self, token_path: str, issue: Callable):
+        token = self.read(token_path)
+        if token is not None:
+            return token
+
+        with self._lock, _fileLock(token_path):
+            entry = self._load(token_path)  # 잠금을 기다리는 동안 다른 프로세스가 발급했는지 확인
+            if entry is not None and self._isFresh(entry[1]):
+                self._memory[token_path] = entry
+                return entry[0]
+
+            token, expired = issue()
+            if token is None:
+                return None
+            self.issued += 1
+            self._store(token_path, token, datetime.strptime(expired, "%Y-%m-%d %H:%M:%S"))
+        return token
+
+    # 메모리에 보관된 토큰의 만료일시, 없으면 None
+    def valid_until(self, token_path: str):
+        entry = self._memory.get(token_path)
+        return None if entry is None else entry[1]
+
+    def write(self, token_path: str, token: str, expired: str):
+        valid_date = datetime.strptime(expired, "%Y-%m-%d %H:%M:%S")
+        with self._lock, _fileLock(token_path):
+            self._store(token_path, token, valid_date)
+
+    def _store(self, token_path: str, token: str, valid_date: datetime):
+        tmp_path = f"{token_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f"token: {token}\n")
+            f.write(f"valid-date: {valid_date}\n")
+        os.replace(tmp_path, token_path)
+        self._memory[token_path] = (token, valid_date)
+        if self.backend == "shm":
+            self._shmWrite(token_path, token, valid_date)
+
+    def _load(self, token_path: str):
+        if self.backend == "shm":
+            entry = self._shmRead().get(token_path)
+            if entry is not None:
+                return entry[0], datetime.fromisoformat(entry[1])
+
+        try:
+            with open(token_path, encoding="UTF-8") as f:
+                values = dict(line.rstrip("\n").split(": ", 1) for line in f if ": " in line)
+            return values["token"], datetime.fromisoformat(values["valid-date"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _getShm(self):
+        if self._shm is None:
+            from multiprocessing import shared_memory
+
+            try:
+                self._shm = shared_memory.SharedMemory(self._shmName, create=True, size=self.SHM_SIZE, track=False)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(self._shmName, track=False)
+        return self._shm
+
+    # 버전 값이 홀수(쓰는 중)이거나 읽는 동안 바뀌었으면 다시 읽는다.
+    def _shmRead(self) -> dict:
+        buf = self._getShm().buf
+        while True:
+            version = int.from_bytes(buf[0:8], "little")
+            if version % 2 == 1:
+                time.sleep(0)
+                continue
+            length = int.from_bytes(buf[8:12], "little")
+            data = bytes(buf[12:12 + length])
+            if int.from_bytes(buf[0:8], "little") != version:
+                continue
+            return json.loads(data) if length > 0 else {}
+
+    def _shmWrite(self, token_path: str, token: str, valid_date: datetime):
+        with _fileLock(os.path.join(os.path.dirname(token_path), self._shmName)):
+            entries = {
+                key: value for key, value in self._shmRead().items()
+                if datetime.fromisoformat(value[1]) > datetime.now()
+            }
+            entries[token_path] = [token, valid_date.isoformat(sep=" ")]
+            data = json.dumps(entries).encode("utf-8")
+            if len(data) > self.SHM_SIZE - 12:
+                logging.warning("Token store shared memory is full, using token files only.")
+                return
+
+            buf = self._getShm().buf
+            version = int.from_bytes(buf[0:8], "little")
+            buf[0:8] = (version + 1).to_bytes(8, "little")
+            buf[8:12] = len(data).to_bytes(4, "little")
+            buf[12:12 + len(data)] = data
+            buf[0:8] = (version + 2).to_bytes(8, "little")
+
+
+_tokenStore = None
+
+
+# 토큰 저장소, 처음 사용할 때 kis_devlp.yaml 의 token_store / token_refresh_margin 로 생성
+def _getTokenStore() -> TokenStore:
+    global _tokenStore
+    if _tokenStore is None:
+        _tokenStore = TokenStore(_cfg.get("token_store", "file"), float(_cfg.get("token_refresh_margin", 600)))
+    return _tokenStore
+
+
+# 토큰 저장소 변경 (backend: 'file' 토큰 파일, 'shm' 공유 메모리 + 토큰 파일)
+def set_token_store(backend: str = "file", refresh_margin: float = 600.0):
+    global _tokenStore
+    _tokenStore = TokenStore(backend, refresh_margin)
+
+
 # 토큰 발급 받아 저장 (토큰값, 토큰 유효시간,1일, 6시간 이내 발급신청시는 기존 토큰값과 동일, 발급시 알림톡 발송)
-def save_token(my_token, my_expired):
-    # print(type(my_expired), my_expired)
-    valid_date = datetime.strptime(my_expired, "%Y-%m-%d %H:%M:%S")
-    # print('Save token date: ', valid_date)
-    with open(token_tmp, "w", encoding="utf-8") as f:
-        f.write(f"token: {my_token}\n")
-        f.write(f"valid-date: {valid_date}\n")
+# token_path 를 지정하지 않으면 기본 토큰 파일(token_tmp) 사용
+def save_token(my_token, my_expired, token_path=None):
+    _getTokenStore().write(token_path or token_tmp, my_token, my_expired)
 
 
 # 토큰 확인 (토큰값, 토큰 유효시간_1일, 6시간 이내 발급신청시는 기존 토큰값과 동일, 발급시 알림톡 발송)
-def read_token():
-    try:
-        # 토큰이 저장된 파일 읽기
-        with open(token_tmp, encoding="UTF-8") as f:
-            tkg_tmp = yaml.load(f, Loader=yaml.FullLoader)
-
-        # 토큰 만료 일,시간
-        exp_dt = datetime.strftime(tkg_tmp["valid-date"], "%Y-%m-%d %H:%M:%S")
-        # 현재일자,시간
-        now_dt = datetime.today().strftime("%Y-%m-%d %H:%M:%S")
-
-        # print('expire dt: ', exp_dt, ' vs now dt:', now_dt)
-        # 저장된 토큰 만료일자 체크 (만료일시 > 현재일시 인경우 보관 토큰 리턴)
-        if exp_dt > now_dt:
-            return tkg_tmp["token"]
-        else:
-            # print('Need new token: ', tkg_tmp['valid-date'])
-            return None
-    except Exception:
-        # print('read token error: ', e)
-        return None
+# 만료되었거나 만료 임박(refresh_margin 이내)이면 None
+def read_token(token_path=None):
+    return _getTokenStore().read(token_path or token_tmp)
 
 
-# 토큰 유효시간 체크해서 만료된 토큰이면 재발급처리
+# 기본 헤더 (인증 정보 포함), 토큰 재발급은 auth() 에서 예약한 타이머가 처리 (_autoReAuth)
 def _getBaseHeader():
-    if _autoReAuth:
-        reAuth()
-    return copy.deepcopy(_base_headers)
+    return dict(_getHeaderTemplates().base)
 
 
 # 가져오기 : 앱키, 앱시크리트, 종합계좌번호(계좌번호 중 숫자8자리), 계좌상품코드(계좌번호 중 숫자2자리), 토큰, 도메인
 def _setTRENV(cfg):
-    nt1 = namedtuple(
+    global _TRENV
+    _TRENV = _makeTREnv(cfg)
+
+
+def _makeTREnv(cfg):
+    nt1 = _getResultType(
         "KISEnv",
-        ["my_app", "my_sec", "my_acct", "my_prod", "my_htsid", "my_token", "my_url", "my_url_ws"],
+        ("my_app", "my_sec", "my_acct", "my_prod", "my_htsid", "my_token", "my_url", "my_url_ws"),
     )
     d = {
         "my_app": cfg["my_app"],  # 앱키
@@ -126,29 +457,50 @@ def _setTRENV(cfg):
     }  # 모의 도메인 (https://openapivts.koreainvestment.com:29443)
 
     # print(cfg['my_app'])
-    global _TRENV
-    _TRENV = nt1(**d)
+    return nt1(**d)
 
 
 def isPaperTrading():  # 모의투자 매매
+    client = _currentClient.get()
+    if client is not None:
+        return client.isPaperTrading()
     return _isPaper
 
 
 # 실전투자면 'prod', 모의투자면 'vps'를 셋팅 하시기 바랍니다.
-def changeTREnv(token_key, svr="prod", product=_cfg["my_prod"]):
+def changeTREnv(token_key, svr="prod", product=None):
+    global _isPaper, _smartSleep
+    if svr == "prod":  # 실전투자
+        _isPaper = False
+        _smartSleep = 0.05
+    elif svr == "vps":  # 모의투자
+        _isPaper = True
+        _smartSleep = 0.5
+
+    cfg = _envConfig(svr, product)
+
+    try:
+        my_token = _TRENV.my_token
+    except AttributeError:
+        my_token = ""
+    cfg["my_token"] = my_token if token_key else token_key
+
+    # print(cfg)
+    _setTRENV(cfg)
+
+
+# 환경(실전/모의), 계좌상품코드에 해당하는 앱키, 계좌번호, 도메인 (토큰 제외)
+def _envConfig(svr="prod", product=None):
     cfg = dict()
+    if product is None:
+        product = _cfg["my_prod"]
 
-    global _isPaper
     if svr == "prod":  # 실전투자
         ak1 = "my_app"  # 실전투자용 앱키
         ak2 = "my_sec"  # 실전투자용 앱시크리트
-        _isPaper = False
-        _smartSleep = 0.05
     elif svr == "vps":  # 모의투자
         ak1 = "paper_app"  # 모의투자용 앱키
         ak2 = "paper_sec"  # 모의투자용 앱시크리트
-        _isPaper = True
-        _smartSleep = 0.5
 
     cfg["my_app"] = _cfg[ak1]
     cfg["my_sec"] = _cfg[ak2]
@@ -171,27 +523,27 @@ def changeTREnv(token_key, svr="prod", product=_cfg["my_prod"]):
     cfg["my_prod"] = product
     cfg["my_htsid"] = _cfg["my_htsid"]
     cfg["my_url"] = _cfg[svr]
-
-    try:
-        my_token = _TRENV.my_token
-    except AttributeError:
-        my_token = ""
-    cfg["my_token"] = my_token if token_key else token_key
     cfg["my_url_ws"] = _cfg["ops" if svr == "prod" else "vops"]
+    return cfg
 
-    # print(cfg)
-    _setTRENV(cfg)
+
+# 응답 필드 구성별 namedtuple 클래스 캐시
+# 클래스 생성 비용이 커서 응답마다 새로 만들지 않고, 같은 TR 의 응답(동일한 필드 구성)은 같은 클래스를 재사용한다.
+@lru_cache(maxsize=1024)
+def _getResultType(name: str, fields: tuple):
+    return namedtuple(name, fields)
 
 
 def _getResultObject(json_data):
-    _tc_ = namedtuple("res", json_data.keys())
+    _tc_ = _getResultType("res", tuple(json_data.keys()))
 
-    return _tc_(**json_data)
+    return _tc_._make(json_data.values())
 
 
 # Token 발급, 유효기간 1일, 6시간 이내 발급시 기존 token값 유지, 발급시 알림톡 무조건 발송
 # 모의투자인 경우  svr='vps', 투자계좌(01)이 아닌경우 product='XX' 변경하세요 (계좌번호 뒤 2자리)
-def auth(svr="prod", product=_cfg["my_prod"], url=None):
+# product 미지정시 kis_devlp.yaml 의 my_prod 사용
+def auth(svr="prod", product=None, url=None):
     p = {
         "grant_type": "client_credentials",
     }
@@ -208,26 +560,12 @@ def auth(svr="prod", product=_cfg["my_prod"], url=None):
     p["appkey"] = _cfg[ak1]
     p["appsecret"] = _cfg[ak2]
 
-    # 기존 발급된 토큰이 있는지 확인
-    saved_token = read_token()  # 기존 발급 토큰 확인
-    # print("saved_token: ", saved_token)
-    if saved_token is None:  # 기존 발급 토큰 확인이 안되면 발급처리
-        url = f"{_cfg[svr]}/oauth2/tokenP"
-        res = requests.post(
-            url, data=json.dumps(p), headers=_getBaseHeader()
-        )  # 토큰 발급
-        rescode = res.status_code
-        if rescode == 200:  # 토큰 정상 발급
-            my_token = _getResultObject(res.json()).access_token  # 토큰값 가져오기
-            my_expired = _getResultObject(
-                res.json()
-            ).access_token_token_expired  # 토큰값 만료일시 가져오기
-            save_token(my_token, my_expired)  # 새로 발급 받은 토큰 저장
-        else:
-            print("Get Authentification token fail!\nYou have to restart your app!!!")
-            return
-    else:
-        my_token = saved_token  # 기존 발급 토큰 확인되어 기존 토큰 사용
+    # 기존 발급된 토큰이 있으면 사용, 없으면 발급 후 저장 (여러 프로세스가 동시에 호출해도 한번만 발급)
+    token_path = _tokenPath(p["appkey"])
+    my_token = _getTokenStore().get_or_issue(token_path, lambda: _issueToken(svr, p))
+    if my_token is None:
+        print("Get Authentification token fail!\nYou have to restart your app!!!")
+        return
 
     # 발급토큰 정보 포함해서 헤더값 저장 관리, API 호출시 필요
     changeTREnv(my_token, svr, product)
@@ -235,17 +573,30 @@ def auth(svr="prod", product=_cfg["my_prod"], url=None):
     _base_headers["authorization"] = f"Bearer {my_token}"
     _base_headers["appkey"] = _TRENV.my_app
     _base_headers["appsecret"] = _TRENV.my_sec
+    _resetHeaderTemplates()
 
     global _last_auth_time
     _last_auth_time = datetime.now()
+    _scheduleReAuth(_reAuthTimers, "rest", _reAuthDelay(token_path), lambda: auth(svr, product))
 
     if _DEBUG:
         print(f"[{_last_auth_time}] => get AUTH Key completed!")
 
 
+# 접근토큰 발급 요청, 정상 발급시 (토큰값, 만료일시) 반환, 실패시 (None, None)
+def _issueToken(svr, p):
+    url = f"{_cfg[svr]}/oauth2/tokenP"
+    res = _getSession().post(url, data=json.dumps(p), headers=_getBaseHeader())
+    if res.status_code != 200:
+        return None, None
+
+    result = _getResultObject(res.json())
+    return result.access_token, result.access_token_token_expired
+
+
 # end of initialize, 토큰 재발급, 토큰 발급시 유효시간 1일
 # 프로그램 실행시 _last_auth_time에 저장하여 유효시간 체크, 유효시간 만료시 토큰 발급 처리
-def reAuth(svr="prod", product=_cfg["my_prod"]):
+def reAuth(svr="prod", product=None):
     n2 = datetime.now()
     if (n2 - _last_auth_time).seconds >= 86400:  # 유효시간 1일
         auth(svr, product)
@@ -255,17 +606,371 @@ def getEnv():
     return _cfg
 
 
+# 초당 호출 한도를 지키기 위한 구간(sliding window) 제한
+# 어느 구간(capacity / rate 초)에서도 capacity 건을 넘지 않도록 최근 capacity 건의 전송 시각을 보관하고,
+# 구간 안에 자리가 있으면 대기 없이 보내며(burst) 없으면 가장 오래된 전송이 구간을 벗어날 때까지 기다린다.
+# (토큰 버킷은 처음 1초, 또는 쉬고 난 뒤 1초 동안 capacity + rate 건까지 보내 EGW00201 이 발생)
+# 자리가 없으면 전송 시각을 미리 예약하고 그만큼만 대기하므로 여러 스레드가 동시에 호출해도 한도를 넘지 않는다.
+#
+# capacity 는 정수로 내림하며(최소 1) 기본값은 rate 이다.
+# - 기본값(capacity = rate)이면 구간이 1초여서 서버와 같이 어느 1초 구간에서도 rate 건을 넘지 않는다.
+# - rate 가 1 미만이면 capacity 는 1, 구간은 1 / rate 초 (ex. rate=0.5 는 2초에 1건).
+# - capacity 가 rate 보다 작으면 더 짧은 구간으로 나누어 고르게 보내고, 크면 구간이 1초보다 길어져
+#   한번에 capacity 건까지 보낼 수 있지만 1초 한도를 넘을 수 있으므로 서버 한도가 초당인 경우 사용하지 않는다.
+#
+# 우선순위 스케줄러를 사용하면(set_priority_scheduler) 먼저 예약하는 대신 우선순위 대기열에서 차례를 기다린다.
+# - 대기열은 우선순위, 도착 순으로 정렬되어 나중에 온 주문이 먼저 대기 중인 시세 조회보다 앞서 전송된다.
+# - 낮은 순위의 요청은 구간에 _priorityReserve 만큼의 자리를 남겨두므로 시세 조회로 한도가 차 있어도 주문은 바로 나간다.
+_RATE_WINDOW_MARGIN = 0.02  # 스레드 깨어남, 네트워크 지연 차이로 서버에서 구간이 겹치지 않도록 두는 여유(초)
+
+
+class RateLimiter:
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self._limit = max(1, int(capacity if capacity is not None else rate))  # 구간의 최대 전송 수
+        self.capacity = float(self._limit)
+        self._window = self._limit / self.rate  # 구간 길이(초)
+        self._sent = deque(maxlen=self._limit)  # 최근 전송(예약) 시각, 오름차순
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._waiting = []  # 우선순위 대기열 (heap, [우선순위, 도착 순번])
+        self._seq = itertools.count()
+
+    # 현재 구간에 들어 있는 전송(예약 포함) 시각 목록 (_lock 을 잡은 상태에서 호출)
+    def _inWindow(self, now: float) -> list:
+        start = now - self._window - _RATE_WINDOW_MARGIN
+        return [t for t in self._sent if t > start]
+
+    # 전송 시각 1개를 예약하고, 그 시각까지 기다려야 하는 시간(초)을 반환
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = now
+            if len(self._sent) >= self._limit:
+                slot = max(now, self._sent[0] + self._window + _RATE_WINDOW_MARGIN)
+            if len(self._sent) > 0:
+                slot = max(slot, self._sent[-1])
+            self._sent.append(slot)
+            return slot - now
+
+    # 대기열 차례이고 우선순위별 예비분을 넘는 자리가 있으면 사용하고 0 반환
+    # 아니면 기다릴 시간(초), 앞선 요청이 있으면 None 반환 (_lock 을 잡은 상태에서 호출)
+    def _tryPriority(self, entry: list):
+        if self._waiting[0] is not entry:
+            return None
+        now = time.monotonic()
+        if len(self._sent) > 0 and self._sent[-1] > now:  # 먼저 예약된 전송 시각까지 대기
+            return self._sent[-1] - now
+        reserve = min(int(_priorityReserve.get(entry[0], 0.0) * self._limit), self._limit - 1)
+        window = self._inWindow(now)
+        expire = len(window) - (self._limit - reserve - 1)  # 구간을 벗어나야 하는 전송 수
+        if expire > 0:
+            return window[expire - 1] + self._window + _RATE_WINDOW_MARGIN - now
+        heapq.heappop(self._waiting)
+        self._sent.append(now)
+        self._cond.notify_all()
+        return 0.0
+
+    def _enqueue(self, priority: int) -> list:
+        entry = [priority, next(self._seq)]
+        heapq.heappush(self._waiting, entry)
+        return entry
+
+    # 토큰을 받지 못하고 중단된 요청(예외, 태스크 취소)을 대기열에서 제거
+    def _dequeue(self, entry: list):
+        if any(waiting is entry for waiting in self._waiting):
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+            self._cond.notify_all()
+
+    # priority 는 우선순위 스케줄러 사용시에만 적용 (PRIORITY_ORDER ~ PRIORITY_REFERENCE)
+    def acquire(self, priority: int = None):
+        if _prepaidToken.get() is self:  # 이벤트 루프에서 이미 받아둔 토큰 사용
+            _prepaidToken.set(None)
+            return
+        if priority is not None and _isPriorityScheduling():
+            self._acquirePriority(priority)
+            return
+        wait = self._reserve()
+        if wait > 0:
+            if _DEBUG:
+                print(f"[RateLimit] Waiting {wait:.3f}s ")
+            time.sleep(wait)
+
+    def _acquirePriority(self, priority: int):
+        started = time.monotonic()
+        with self._cond:
+            entry = self._enqueue(priority)
+            try:
+                wait = self._tryPriority(entry)
+                while wait != 0:
+                    self._cond.wait(wait)
+                    wait = self._tryPriority(entry)
+            except BaseException:
+                self._dequeue(entry)
+                raise
+        _recordPriorityWait(priority, time.monotonic() - started)
+
+    async def acquire_async(self, priority: int = None):
+        import asyncio
+
+        if priority is not None and _isPriorityScheduling():
+            started = time.monotonic()
+            with self._lock:
+                entry = self._enqueue(priority)
+            try:
+                while True:
+                    with self._lock:
+                        wait = self._tryPriority(entry)
+                    if wait == 0:
+                        break
+                    await asyncio.sleep(wait if wait is not None else self._window / self._limit)
+            except BaseException:
+                with self._lock:
+                    self._dequeue(entry)
+                raise
+            _recordPriorityWait(priority, time.monotonic() - started)
+            return
+
+        wait = self._reserve()
+        if wait > 0:
+            if _DEBUG:
+                print(f"[RateLimit] Waiting {wait:.3f}s ")
+            await asyncio.sleep(wait)
+
+    # 지금 대기 없이 보낼 수 있는 호출 수
+    def available(self) -> float:
+        with self._lock:
+            return float(self._limit - len(self._inWindow(time.monotonic())))
+
+    # 우선순위 대기열에서 기다리는 요청 수
+    def queued(self) -> int:
+        with self._lock:
+            return len(self._waiting)
+
+
+_defaultRateLimits = {"prod": 20, "vps": 2}  # 실전투자, 모의투자
+_rateLimiters = {}
+
+
+# 환경(실전/모의)별 호출 한도 관리 객체, 처음 사용할 때 kis_devlp.yaml 의 rate_limit_prod / rate_limit_vps 로 생성
+def _getSvrRateLimiter(svr: str) -> RateLimiter:
+    limiter = _rateLimiters.get(svr)
+    if limiter is None:
+        with _httpLock:
+            limiter = _rateLimiters.get(svr)
+            if limiter is None:
+                limiter = RateLimiter(_cfg.get(f"rate_limit_{svr}", _defaultRateLimits[svr]))
+                _rateLimiters[svr] = limiter
+    return limiter
+
+
+# 현재 환경(실전/모의)의 호출 한도 관리 객체
+def _getRateLimiter() -> RateLimiter:
+    client = _currentClient.get()
+    if client is not None and client.limiter is not None:
+        return client.limiter
+    return _getSvrRateLimiter("vps" if _isPaper else "prod")
+
+
+# 앱키별 호출 한도 관리 객체, 기본 앱키(kis_devlp.yaml 의 my_app / paper_app)는 환경별 호출 한도를 함께 사용
+_appKeyLimiters = {}
+
+
+def _getAppKeyRateLimiter(svr: str, appkey: str) -> RateLimiter:
+    if appkey == _cfg["my_app" if svr == "prod" else "paper_app"]:
+        return _getSvrRateLimiter(svr)
+    limiter = _appKeyLimiters.get(appkey)
+    if limiter is None:
+        svr_limiter = _getSvrRateLimiter(svr)  # _httpLock 을 잡기 전에 환경별 호출 한도 생성
+        with _httpLock:
+            limiter = _appKeyLimiters.get(appkey)
+            if limiter is None:
+                limiter = RateLimiter(svr_limiter.rate, svr_limiter.capacity)
+                _appKeyLimiters[appkey] = limiter
+    return limiter
+
+
+# 환경별 초당 호출 한도 변경 (svr: 'prod' 또는 'vps', capacity: 한번에 보낼 수 있는 최대 호출 수, 미지정시 rate 와 동일,
+# 구간 길이는 capacity / rate 초, RateLimiter 설명 참고)
+def set_rate_limit(svr: str, rate: float, capacity: float = None):
+    if svr not in _defaultRateLimits:
+        raise ValueError("svr must be 'prod' or 'vps'")
+    _rateLimiters[svr] = RateLimiter(rate, capacity)
+
+
+########### 우선순위 스케줄러
+
+_priorityStats = {}  # 우선순위: [요청 수, 대기시간 합, 최대 대기시간]
+_priorityStatsLock = threading.Lock()
+_PRIORITY_NAMES = ("order", "cancel", "account", "quote", "reference")
+
+
+def _isPriorityScheduling() -> bool:
+    global _usePriorityScheduler
+    if _usePriorityScheduler is None:
+        _usePriorityScheduler = bool(_cfg.get("priority_scheduler", False))
+    return _usePriorityScheduler
+
+
+def set_priority_scheduler(enabled: bool = True, reserve: dict = None):
+    """
+    우선순위 스케줄러 사용 여부 설정
+
+    초당 호출 한도를 기다리는 요청을 주문 > 정정/취소 > 계좌 조회 > 시세 조회 > 참조성 조회 순으로 처리한다.
+    시세 조회가 몰려 한도가 차 있어도 주문은 대기열 맨 앞에서 남겨둔 토큰으로 바로 전송된다.
+
+    Args:
+        enabled (bool): 사용 여부 (기본값: kis_devlp.yaml 의 priority_scheduler, 없으면 사용 안 함)
+        reserve (dict): 우선순위별로 남겨둘 토큰 비율 (ex. {ka.PRIORITY_QUOTE: 0.3})
+    """
+    global _usePriorityScheduler
+    _usePriorityScheduler = enabled
+    if reserve is not None:
+        _priorityReserve.update(reserve)
+
+
+# TR id 별 우선순위 지정 (ex. set_tr_priority("FHKST01010100", ka.PRIORITY_ACCOUNT))
+def set_tr_priority(tr_id: str, priority: int):
+    _trPriorities[tr_id] = priority
+
+
+# 모의투자 TR id 는 실전투자 TR id 의 첫 글자(T / J / C)를 V 로 바꾼 것 (_url_fetch 참고)
+# 실전투자 TR id 로 등록한 설정(캐시 정책, 우선순위 등)을 모의투자 TR id 로도 찾을 수 있도록 table 에 등록된 TR id 를 반환
+def _registeredTrId(table, tr_id: str) -> str:
+    if tr_id in table or tr_id[:1] != "V":
+        return tr_id
+    for prefix in ("T", "J", "C"):
+        if prefix + tr_id[1:] in table:
+            return prefix + tr_id[1:]
+    return tr_id
+
+
+# 요청 우선순위 판단 : 지정된 TR 우선순위 > 캐시 대상 참조성 TR > API 경로
+def _requestPriority(url: str, tr_id: str, postFlag: bool) -> int:
+    priority = _trPriorities.get(_registeredTrId(_trPriorities, tr_id))
+    if priority is not None:
+        return priority
+    if _registeredTrId(_cachePolicies, tr_id) in _cachePolicies:
+        return PRIORITY_REFERENCE
+    if "/trading/" in url:
+        if postFlag and "rvsecncl" in url:
+            return PRIORITY_CANCEL
+        if postFlag and "ccnl" not in url:  # order-resv-ccnl 등 POST 조회 제외
+            return PRIORITY_ORDER
+        return PRIORITY_ACCOUNT
+    if "/quotations/" in url or "/ranking/" in url:
+        return PRIORITY_QUOTE
+    return PRIORITY_REFERENCE
+
+
+def _recordPriorityWait(priority: int, waited: float):
+    with _priorityStatsLock:
+        stats = _priorityStats.setdefault(priority, [0, 0.0, 0.0])
+        stats[0] += 1
+        stats[1] += waited
+        stats[2] = max(stats[2], waited)
+
+
+# 우선순위별 호출 한도 대기 현황 {이름: {"requests", "wait_avg", "wait_max"}} (대기시간 단위: 초)
+def get_priority_stats() -> dict:
+    with _priorityStatsLock:
+        return {
+            _PRIORITY_NAMES[priority] if 0 <= priority < len(_PRIORITY_NAMES) else str(priority): {
+                "requests": count,
+                "wait_avg": total / count,
+                "wait_max": max_wait,
+            }
+            for priority, (count, total, max_wait) in sorted(_priorityStats.items())
+        }
+
+
+# 연속조회 사이 지연
+# 호출 한도는 _url_fetch / KISWebSocket.send 진입 시 토큰 버킷으로 관리하므로, 토큰 버킷 사용 시에는 대기하지 않는다.
 def smart_sleep():
+    if _useRateLimiter:
+        return
+
+    client = _currentClient.get()
+    delay = _smartSleep if client is None else (0.5 if client.isPaperTrading() else 0.05)
+
     if _DEBUG:
-        print(f"[RateLimit] Sleeping {_smartSleep}s ")
+        print(f"[RateLimit] Sleeping {delay}s ")
 
-    time.sleep(_smartSleep)
+    time.sleep(delay)
 
 
 def getTREnv():
+    client = _currentClient.get()
+    if client is not None:
+        return client.env
     return _TRENV
 
 
+# 모든 REST 호출이 공유하는 keep-alive 커넥션 풀
+# requests.Session 은 스레드 간 공유가 보장되지 않으므로 스레드마다 Session 을 따로 두고,
+# 실제 커넥션 풀(HTTPAdapter, urllib3 PoolManager)은 하나를 공유하여 TCP/TLS 핸드셰이크를 재사용한다.
+def _getHttpAdapter() -> HTTPAdapter:
+    global _httpAdapter
+    if _httpAdapter is None:
+        with _httpLock:
+            if _httpAdapter is None:
+                _httpAdapter = HTTPAdapter(
+                    pool_connections=_poolConnections or int(_cfg.get("pool_connections", 4)),
+                    pool_maxsize=_poolMaxSize or int(_cfg.get("pool_maxsize", 20)),
+                )
+    return _httpAdapter
+
+
+def _getSession() -> requests.Session:
+    adapter = _getHttpAdapter()
+    client = _currentClient.get()
+    local = _httpLocal if client is None else client._httpLocal  # KISClient 는 커넥션 풀만 공유하고 Session 은 따로 사용
+    session = getattr(local, "session", None)
+    if session is None or local.adapter is not adapter:
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        local.session = session
+        local.adapter = adapter
+    return session
+
+
+# 커넥션 풀 크기 변경, 기존 풀의 커넥션은 정리하고 다음 호출부터 새 풀을 사용
+def set_http_pool(pool_connections: int = 4, pool_maxsize: int = 20):
+    global _httpAdapter, _poolConnections, _poolMaxSize
+    with _httpLock:
+        old_adapter = _httpAdapter
+        _poolConnections = pool_connections
+        _poolMaxSize = pool_maxsize
+        _httpAdapter = None
+    if old_adapter is not None:
+        old_adapter.close()
+
+
+# 커넥션 풀 사용 현황 (requests: 전체 요청 수, connections: 새로 맺은 커넥션 수, reused: 재사용된 요청 수)
+def get_http_pool_stats() -> dict:
+    stats = {"pools": 0, "requests": 0, "connections": 0, "reused": 0, "hit_ratio": 0.0}
+    if _httpAdapter is None:
+        return stats
+
+    pools = _httpAdapter.poolmanager.pools
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats["pools"] += 1
+        stats["requests"] += pool.num_requests
+        stats["connections"] += pool.num_connections
+
+    stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+    if stats["requests"] > 0:
+        stats["hit_ratio"] = stats["reused"] / stats["requests"]
+    return stats
+
+
 # 주문 API에서 사용할 hash key값을 받아 header에 설정해 주는 함수
 # 현재는 hash key 필수 사항아님, 생략가능, API 호출과정에서 변조 우려를 하는 경우 사용
 # Input: HTTP Header, HTTP post param
@@ -273,7 +978,7 @@ def getTREnv():
 def set_order_hash_key(h, p):
     url = f"{getTREnv().my_url}/uapi/hashkey"  # hashkey 발급 API URL
 
-    res = requests.post(url, data=json.dumps(p), headers=h)
+    res = _getSession().post(url, data=json.dumps(p), headers=h)
     rescode = res.status_code
     if rescode == 200:
         h["hashkey"] = _getResultObject(res.json()).HASH
@@ -281,8 +986,152 @@ def set_order_hash_key(h, p):
         print("Error:", rescode)
 
 
+########### 계좌(환경)별 클라이언트
+
+# 현재 실행 흐름(스레드, asyncio 태스크)에서 사용할 KISClient, None 이면 auth() 로 설정한 모듈 전역 환경 사용
+_currentClient = contextvars.ContextVar("kis_client", default=None)
+
+
+class KISClient:
+    """
+    계좌(환경)별 인증 상태를 독립적으로 보관하는 클라이언트
+
+    auth() 는 환경(_TRENV), 헤더, 토큰을 모듈 전역에 저장하므로 한 프로세스에서 하나의 계좌만 사용할 수 있다.
+    KISClient 는 환경, 헤더, 토큰, Session, 호출 한도를 인스턴스마다 따로 보관하여
+    실전/모의 계좌, 상품코드("01" 주식, "03" 선물옵션)가 다른 계좌를 여러 스레드, 태스크에서 동시에 사용할 수 있다.
+
+    *_functions.py 의 함수는 수정 없이 call() / call_async() 로 실행하거나 activate() 블록 안에서 호출하면
+    해당 클라이언트의 환경(getTREnv(), 헤더, 호출 한도)으로 실행된다.
+    커넥션 풀은 모든 클라이언트가 공유하고, 호출 한도는 같은 앱키를 쓰는 클라이언트끼리 공유한다.
+
+    Args:
+        svr (str): 'prod' 실전투자, 'vps' 모의투자
+        product (str): 계좌상품코드, 미지정시 kis_devlp.yaml 의 my_prod
+        appkey (str): 앱키, 미지정시 kis_devlp.yaml 의 my_app / paper_app
+        appsecret (str): 앱시크리트, 미지정시 kis_devlp.yaml 의 my_sec / paper_sec
+        account (str): 종합계좌번호(8자리), 미지정시 kis_devlp.yaml 에서 svr, product 에 맞는 계좌번호
+
+    Example:
+        >>> stock = ka.KISClient("prod", "01"); stock.auth()
+        >>> futures = ka.KISClient("prod", "03"); futures.auth()
+        >>> df1, df2 = stock.call(inquire_balance, env_dv="real", cano=stock.getTREnv().my_acct, ...)
+        >>> with futures.activate():
+        ...     df = inquire_psbl_order(...)
+    """
+
+    def __init__(self, svr: str = "prod", product: str = None, appkey: str = None, appsecret: str = None,
+                 account: str = None):
+        if svr not in ("prod", "vps"):
+            raise ValueError("svr must be 'prod' or 'vps'")
+
+        cfg = _envConfig(svr, product)
+        if appkey is not None:
+            cfg["my_app"] = appkey
+            cfg["my_sec"] = appsecret
+        if account is not None:
+            cfg["my_acct"] = account
+        cfg["my_token"] = ""
+
+        self.svr = svr
+        self.env = _makeTREnv(cfg)
+        self.headerTemplates = HeaderTemplates({
+            "Content-Type": "application/json",
+            "Accept": "text/plain",
+            "charset": "UTF-8",
+            "User-Agent": _cfg["my_agent"],
+        })
+        self.headers_ws = {"content-type": "utf-8"}
+        self.limiter = _getAppKeyRateLimiter(svr, cfg["my_app"])
+        self.last_auth_time = None
+        self._authLock = threading.Lock()
+        self._httpLocal = threading.local()
+        self._reAuthTimers = {}
+        _reAuthClients.add(self)
+
+    def isPaperTrading(self) -> bool:
+        return self.svr == "vps"
+
+    def getTREnv(self):
+        return self.env
+
+    # 토큰 발급 (앱키별 토큰 파일에 저장된 유효한 토큰이 있으면 재사용)
+    def auth(self) -> bool:
+        with self._authLock:
+            p = {"grant_type": "client_credentials", "appkey": self.env.my_app, "appsecret": self.env.my_sec}
+            token_path = _tokenPath(self.env.my_app)
+            token = _getTokenStore().get_or_issue(token_path, lambda: _issueToken(self.svr, p))
+            if token is None:
+                print("Get Authentification token fail!\nYou have to restart your app!!!")
+                return False
+
+            headers = dict(self.headerTemplates.base)
+            headers["authorization"] = f"Bearer {token}"
+            headers["appkey"] = self.env.my_app
+            headers["appsecret"] = self.env.my_sec
+
+            self.env = self.env._replace(my_token=token)
+            self.headerTemplates = HeaderTemplates(headers)
+            self.last_auth_time = datetime.now()
+            _scheduleReAuth(self._reAuthTimers, "rest", _reAuthDelay(token_path), weakref.WeakMethod(self.auth))
+
+        if _DEBUG:
+            print(f"[{self.last_auth_time}] => get AUTH Key completed! ({self.svr}, {self.env.my_prod})")
+        return True
+
+    def reAuth(self):
+        if self.last_auth_time is None or (datetime.now() - self.last_auth_time).total_seconds() >= 86400:
+            self.auth()
+
+    # 웹소켓 접속키 발급
+    def auth_ws(self) -> bool:
+        with self.activate():
+            approval_key = _issueApprovalKey(self.env.my_url, self.env.my_app, self.env.my_sec)
+        if approval_key is None:
+            return False
+
+        headers_ws = dict(self.headers_ws)
+        headers_ws["approval_key"] = approval_key
+        self.headers_ws = headers_ws
+        _scheduleReAuth(self._reAuthTimers, "ws", _reAuthDelay(), weakref.WeakMethod(self.auth_ws))
+        return True
+
+    # 토큰 재발급 타이머 중지 (더 이상 사용하지 않는 클라이언트)
+    def close(self):
+        for timer in self._reAuthTimers.values():
+            timer.cancel()
+        self._reAuthTimers.clear()
+
+    def __del__(self):
+        if hasattr(self, "_reAuthTimers"):  # 생성 중 오류가 난 경우 제외
+            self.close()
+
+    # with 블록 안의 호출은 이 클라이언트의 환경으로 실행 (스레드, asyncio 태스크별로 적용)
+    @contextmanager
+    def activate(self):
+        token = _currentClient.set(self)
+        try:
+            yield self
+        finally:
+            _currentClient.reset(token)
+
+    # func(*args, **kwargs) 를 이 클라이언트의 환경으로 실행 (ex. client.call(inquire_price, "real", "J", "005930"))
+    def call(self, func: Callable, *args, **kwargs):
+        with self.activate():
+            return func(*args, **kwargs)
+
+    # call_async 를 이 클라이언트의 환경으로 실행
+    async def call_async(self, func: Callable, *args, **kwargs):
+        with self.activate():
+            return await call_async(func, *args, **kwargs)
+
+    def url_fetch(self, api_url, ptr_id, tr_cont, params, appendHeaders=None, postFlag=False, hashFlag=True):
+        return self.call(_url_fetch, api_url, ptr_id, tr_cont, params, appendHeaders, postFlag, hashFlag)
+
+
 # API 호출 응답에 필요한 처리 공통 함수
 class APIResp:
+    _retryCount = 0  # 응답을 받기까지 재시도한 횟수
+
     def __init__(self, resp):
         self._rescode = resp.status_code
         self._resp = resp
@@ -296,17 +1145,18 @@ class APIResp:
 
     def _setHeader(self):
         fld = dict()
-        for x in self._resp.headers.keys():
+        for x, v in self._resp.headers.items():
             if x.islower():
-                fld[x] = self._resp.headers.get(x)
-        _th_ = namedtuple("header", fld.keys())
+                fld[x] = v
+        _th_ = _getResultType("header", tuple(fld.keys()))
 
-        return _th_(**fld)
+        return _th_._make(fld.values())
 
     def _setBody(self):
-        _tb_ = namedtuple("body", self._resp.json().keys())
+        data = self._resp.json()  # JSON 파싱은 응답당 한번만 수행
+        _tb_ = _getResultType("body", tuple(data.keys()))
 
-        return _tb_(**self._resp.json())
+        return _tb_._make(data.values())
 
     def getHeader(self):
         return self._header
@@ -329,6 +1179,9 @@ class APIResp:
     def getErrorCode(self):
         return self._err_code
 
+    def getRetryCount(self):
+        return self._retryCount
+
     def getErrorMessage(self):
         return self._err_message
 
@@ -410,27 +1263,615 @@ class APIRespError(APIResp):
 ########### API call wrapping : API 호출 공통
 
 
+# API 호출 재시도 정책
+# - 초당 거래건수 초과(EGW00201) 등 호출 한도 오류 : 서버에서 처리되지 않은 요청이므로 주문(POST)도 재시도
+# - 5xx, 연결 끊김/타임아웃 등 일시적 오류 : 주문이 이미 처리되었을 수 있으므로 조회(GET)만 재시도
+# - 그 외 오류 : 재시도하지 않음
+# 재시도 간격은 지수적으로 늘어나는 최대값 안에서 무작위(jitter)로 정하고, 호출당 전체 소요시간(deadline)을 넘지 않는다.
+class RetryPolicy:
+    def __init__(
+            self,
+            max_retries: int = 3,
+            base_delay: float = 0.2,
+            max_delay: float = 2.0,
+            deadline: float = 10.0,
+            throttle_codes: tuple = ("EGW00201",),
+            transient_status: tuple = (500, 502, 503, 504),
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.throttle_codes = throttle_codes
+        self.transient_status = transient_status
+
+    # 응답 분류 : "ok", "throttle", "transient", "fatal"
+    # 호출 한도 오류는 HTTP 500 과 함께 body 의 msg_cd 로 전달되므로, 정상(200) 응답은 body 를 파싱하지 않는다.
+    def classify(self, res) -> str:
+        if res.status_code == 200:
+            return "ok"
+        try:
+            if res.json().get("msg_cd") in self.throttle_codes:
+                return "throttle"
+        except (ValueError, AttributeError):
+            pass
+        if res.status_code in self.transient_status:
+            return "transient"
+        return "fatal"
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+_retryPolicy = RetryPolicy()
+_retryStats = {"calls": 0, "retried_calls": 0, "retries": 0, "throttle": 0, "transient": 0, "gave_up": 0}
+_retryStatsLock = threading.Lock()
+
+
+# 재시도 정책 변경 (ex. set_retry_policy(RetryPolicy(max_retries=5, deadline=30)))
+def set_retry_policy(policy: RetryPolicy):
+    global _retryPolicy
+    _retryPolicy = policy
+
+
+# 재시도 현황 (calls: 전체 호출, retried_calls: 재시도가 발생한 호출, retries: 전체 재시도 횟수,
+#             throttle/transient: 사유별 재시도 횟수, gave_up: 재시도 후에도 실패한 호출)
+def get_retry_stats() -> dict:
+    with _retryStatsLock:
+        return dict(_retryStats)
+
+
+def _recordRetry(retries: int, reasons: list, failed: bool):
+    with _retryStatsLock:
+        _retryStats["calls"] += 1
+        if retries > 0:
+            _retryStats["retried_calls"] += 1
+            _retryStats["retries"] += retries
+            for reason in reasons:
+                _retryStats[reason] += 1
+            if failed:
+                _retryStats["gave_up"] += 1
+
+
+# 재시도 정책에 따라 요청 전송, 연결 오류가 끝내 해결되지 않으면 마지막 예외를 그대로 발생
+def _send_with_retry(url, headers, params, postFlag, limiter=None):
+    policy = _retryPolicy
+    limiter = limiter or _getRateLimiter()
+    deadline = time.monotonic() + policy.deadline
+    reasons = []
+    while True:
+        if _useRateLimiter:
+            limiter.acquire(_requestPriority(url, headers.get("tr_id", ""), postFlag))  # 초당 호출 한도 대기
+
+        error = None
+        try:
+            if postFlag:
+                # if (hashFlag): set_order_hash_key(headers, params)
+                res = _getSession().post(url, headers=headers, data=json.dumps(params))
+            else:
+                res = _getSession().get(url, headers=headers, params=params)
+            kind = policy.classify(res)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            res, error, kind = None, e, "transient"
+
+        retryable = kind == "throttle" or (kind == "transient" and not postFlag)
+        delay = policy.backoff(len(reasons))
+        if (
+                not retryable
+                or len(reasons) >= policy.max_retries
+                or time.monotonic() + delay > deadline
+        ):
+            break
+
+        reasons.append(kind)
+        logging.warning(
+            "Retry %d/%d (%s) after %.3fs : %s", len(reasons), policy.max_retries, kind, delay, url
+        )
+        time.sleep(delay)
+
+    _recordRetry(len(reasons), reasons, kind != "ok")
+    if error is not None:
+        raise error
+    return res, len(reasons)
+
+
+# 동일 요청 병합(coalescing) 설정
+# 여러 전략이 같은 시세를 거의 동시에 조회하는 경우, 진행 중인 요청 하나의 응답을 함께 사용하여 호출 한도를 아낀다.
+# 주문(POST)과 주문/정정/취소 TR(끝자리 U)은 절대 병합하지 않는다.
+_useCoalescing = False
+_noCoalesceTRs = set()  # 병합에서 제외할 TR id 추가 지정
+_inflight = {}
+_inflightLock = threading.Lock()
+_coalesceStats = {"requests": 0, "shared": 0}
+
+
+# 동일 요청 병합 사용 여부 설정 (기본값: 사용 안 함)
+def set_request_coalescing(enabled: bool = True, exclude_tr_ids: list = None):
+    global _useCoalescing
+    _useCoalescing = enabled
+    if exclude_tr_ids is not None:
+        _noCoalesceTRs.update(exclude_tr_ids)
+
+
+# 병합 현황 (requests: 병합 대상 호출 수, shared: 진행 중인 요청의 응답을 함께 사용한 호출 수)
+def get_coalescing_stats() -> dict:
+    with _inflightLock:
+        return dict(_coalesceStats)
+
+
+def _isCoalescable(tr_id: str, postFlag: bool) -> bool:
+    if postFlag or tr_id.endswith("U"):
+        return False
+    return _registeredTrId(_noCoalesceTRs, tr_id) not in _noCoalesceTRs
+
+
+# key 가 같은 요청이 진행 중이면 그 결과를 기다려 함께 사용하고, 없으면 직접 호출
+def _coalesce(key, fetch: Callable):
+    with _inflightLock:
+        _coalesceStats["requests"] += 1
+        future = _inflight.get(key)
+        leader = future is None
+        if leader:
+            future = Future()
+            _inflight[key] = future
+        else:
+            _coalesceStats["shared"] += 1
+
+    if not leader:
+        return future.result()
+
+    try:
+        result = fetch()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflightLock:
+            _inflight.pop(key, None)
+
+
+# 여러 앱키로 시세 조회 분산
+# 앱키마다 호출 한도가 따로 적용되므로, 계좌와 무관한 조회(GET, 계좌번호 없음)를 여러 앱키에 나누어 보내 처리량을 늘린다.
+# 주문/계좌 조회는 항상 auth() 로 인증한 기본 앱키를 사용한다.
+class AppKeySlot:
+    def __init__(self, svr: str, appkey: str, appsecret: str, limiter: RateLimiter):
+        self.svr = svr
+        self.appkey = appkey
+        self.appsecret = appsecret
+        self.limiter = limiter
+        self.calls = 0
+        self.inflight = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.calls += 1
+            self.inflight += 1
+
+    def end(self):
+        with self._lock:
+            self.inflight -= 1
+
+    # 요청 시점의 유효한 토큰, 저장된 토큰이 없거나 만료 임박이면 이 앱키로 다시 발급 (실패시 None)
+    def getToken(self):
+        p = {"grant_type": "client_credentials", "appkey": self.appkey, "appsecret": self.appsecret}
+        return _getTokenStore().get_or_issue(_tokenPath(self.appkey), lambda: _issueToken(self.svr, p))
+
+
+_appKeyPool = []
+_appKeyStrategy = "round_robin"
+_appKeyCounter = itertools.count()
+
+
+# 앱키별 토큰 파일 경로 (파일명에서 앱키를 유추할 수 없도록 해시값 사용)
+# 실전투자 기본 앱키(my_app)는 기존 토큰 파일(token_tmp)을 그대로 사용
+def _tokenPath(appkey: str) -> str:
+    if appkey == _cfg["my_app"]:
+        return token_tmp
+    return f"{token_tmp}_{hashlib.sha256(appkey.encode('utf-8')).hexdigest()[:12]}"
+
+
+def load_app_key_pool(svr: str = "prod", strategy: str = "round_robin"):
+    """
+    kis_devlp.yaml 의 추가 앱키(my_app_pool / paper_app_pool)를 읽어 시세 조회 분산용 앱키 풀을 구성
+
+    기본 앱키(auth() 로 인증한 앱키)를 포함하여 앱키마다 토큰을 발급(또는 저장된 토큰 재사용)하고,
+    앱키별로 별도의 초당 호출 한도를 적용한다. 추가 앱키의 토큰은 요청할 때마다 토큰 저장소에서 확인하여
+    만료 전에 다시 발급하고, 기본 앱키는 auth() 로 관리하는 토큰을 그대로 사용한다.
+
+    Args:
+        svr (str): 'prod' 실전투자, 'vps' 모의투자
+        strategy (str): 'round_robin' 순서대로 분산, 'least_loaded' 남은 호출 한도가 가장 많은 앱키 선택
+
+    Example:
+        >>> ka.auth()
+        >>> ka.load_app_key_pool("prod", strategy="least_loaded")
+    """
+    global _appKeyStrategy
+    if strategy not in ("round_robin", "least_loaded"):
+        raise ValueError("strategy must be 'round_robin' or 'least_loaded'")
+
+    pool_key, ak1, ak2 = ("my_app_pool", "my_app", "my_sec") if svr == "prod" else ("paper_app_pool", "paper_app", "paper_sec")
+    limiter = _getSvrRateLimiter(svr)
+
+    slots = [AppKeySlot(svr, _cfg[ak1], _cfg[ak2], limiter)]
+    for item in _cfg.get(pool_key) or []:
+        slot = AppKeySlot(svr, item[ak1], item[ak2], _getAppKeyRateLimiter(svr, item[ak1]))
+        if slot.getToken() is None:
+            logging.error("Get Authentification token fail! (app key pool)")
+            continue
+        slots.append(slot)
+
+    _appKeyStrategy = strategy
+    _appKeyPool[:] = slots
+
+
+# 계좌, HTS ID 에 묶인 요청은 다른 앱키(다른 계좌·HTS ID 의 앱키)로 보내지 않음
+_ACCOUNT_BOUND_PARAMS = ("CANO", "USER_ID", "user_id")
+
+
+# 분산 대상 요청이면 사용할 앱키를 선택, 대상이 아니면 None
+def _pickAppKeySlot(headers: dict, params: dict, postFlag: bool):
+    if postFlag or any(key in params for key in _ACCOUNT_BOUND_PARAMS):
+        return None
+    pool = _appKeyPool
+    if len(pool) < 2 or pool[0].appkey != headers.get("appkey"):  # 기본 앱키로 인증된 요청만 분산
+        return None
+    if _appKeyStrategy == "least_loaded":
+        return max(pool, key=lambda slot: slot.limiter.available() - slot.inflight)
+    return pool[next(_appKeyCounter) % len(pool)]
+
+
+# 앱키별 분산 현황 (앱키는 앞 4자리만 표시)
+def get_app_key_pool_stats() -> list:
+    return [
+        {"appkey": slot.appkey[:4] + "****", "calls": slot.calls, "inflight": slot.inflight,
+         "available": slot.limiter.available()}
+        for slot in _appKeyPool
+    ]
+
+
+# TR 별 호출 지표 (호출 수, 응답시간 분포, 수신 바이트, 연속조회 페이지 수, 재시도, 오류코드)
+# enable_metrics() 로 켜기 전에는 _url_fetch 에서 플래그 확인 외의 비용이 없다.
+class MetricsRegistry:
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    SAMPLE_SIZE = 1000  # 백분위 계산에 사용할 최근 응답시간 개수
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _get(self, tr_id: str, api_url: str) -> dict:
+        key = (tr_id, api_url)
+        series = self._series.get(key)
+        if series is None:
+            series = {
+                "calls": 0,
+                "errors": Counter(),
+                "retries": 0,
+                "bytes": 0,
+                "latency_sum": 0.0,
+                "latency_buckets": [0] * len(self.LATENCY_BUCKETS),
+                "latency_samples": deque(maxlen=self.SAMPLE_SIZE),
+                "paged_calls": 0,
+                "pages": 0,
+            }
+            self._series[key] = series
+        return series
+
+    def record_call(self, tr_id: str, api_url: str, latency: float, nbytes: int, retries: int, error_code=None):
+        with self._lock:
+            series = self._get(tr_id, api_url)
+            series["calls"] += 1
+            series["retries"] += retries
+            series["bytes"] += nbytes
+            series["latency_sum"] += latency
+            series["latency_samples"].append(latency)
+            for index, bound in enumerate(self.LATENCY_BUCKETS):
+                if latency <= bound:
+                    series["latency_buckets"][index] += 1
+                    break
+            if error_code is not None:
+                series["errors"][str(error_code)] += 1
+
+        for hook in _metricsHooks:
+            hook({"tr_id": tr_id, "api_url": api_url, "latency": latency, "bytes": nbytes,
+                  "retries": retries, "error_code": error_code})
+
+    def record_pages(self, tr_id: str, api_url: str, pages: int):
+        with self._lock:
+            series = self._get(tr_id, api_url)
+            series["paged_calls"] += 1
+            series["pages"] += pages
+
+    # TR 별 요약 (응답시간 p50/p95/p99 는 최근 SAMPLE_SIZE 건 기준)
+    def snapshot(self) -> dict:
+        result = {}
+        with self._lock:
+            for (tr_id, api_url), series in self._series.items():
+                samples = sorted(series["latency_samples"])
+                result[(tr_id, api_url)] = {
+                    "calls": series["calls"],
+                    "errors": dict(series["errors"]),
+                    "retries": series["retries"],
+                    "bytes": series["bytes"],
+                    "latency_avg": series["latency_sum"] / series["calls"] if series["calls"] else 0.0,
+                    "latency_p50": self._percentile(samples, 0.50),
+                    "latency_p95": self._percentile(samples, 0.95),
+                    "latency_p99": self._percentile(samples, 0.99),
+                    "pages_per_call": series["pages"] / series["paged_calls"] if series["paged_calls"] else 0.0,
+                }
+        return result
+
+    @staticmethod
+    def _percentile(samples: list, q: float) -> float:
+        if len(samples) == 0:
+            return 0.0
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    # Prometheus text exposition 형식으로 출력
+    def to_prometheus(self) -> str:
+        lines = []
+
+        def add_header(name, kind, text):
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            items = [
+                (f'tr_id="{tr_id}",api_url="{api_url}"', series)
+                for (tr_id, api_url), series in self._series.items()
+            ]
+
+            add_header("kis_requests_total", "counter", "KIS REST API calls")
+            for labels, series in items:
+                lines.append(f"kis_requests_total{{{labels}}} {series['calls']}")
+
+            add_header("kis_request_errors_total", "counter", "KIS REST API error responses by code")
+            for labels, series in items:
+                for code, count in series["errors"].items():
+                    lines.append(f'kis_request_errors_total{{{labels},code="{code}"}} {count}')
+
+            add_header("kis_request_retries_total", "counter", "KIS REST API retries")
+            for labels, series in items:
+                lines.append(f"kis_request_retries_total{{{labels}}} {series['retries']}")
+
+            add_header("kis_response_bytes_total", "counter", "KIS REST API response bytes")
+            for labels, series in items:
+                lines.append(f"kis_response_bytes_total{{{labels}}} {series['bytes']}")
+
+            add_header("kis_request_latency_seconds", "histogram", "KIS REST API call latency")
+            for labels, series in items:
+                cumulative = 0
+                for bound, count in zip(self.LATENCY_BUCKETS, series["latency_buckets"]):
+                    cumulative += count
+                    lines.append(f'kis_request_latency_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'kis_request_latency_seconds_bucket{{{labels},le="+Inf"}} {series["calls"]}')
+                lines.append(f"kis_request_latency_seconds_sum{{{labels}}} {series['latency_sum']}")
+                lines.append(f"kis_request_latency_seconds_count{{{labels}}} {series['calls']}")
+
+            add_header("kis_pagination_calls_total", "counter", "KIS REST API paginated logical calls")
+            for labels, series in items:
+                if series["paged_calls"] > 0:
+                    lines.append(f"kis_pagination_calls_total{{{labels}}} {series['paged_calls']}")
+
+            add_header("kis_pagination_pages_total", "counter", "KIS REST API pages fetched by paginated calls")
+            for labels, series in items:
+                if series["paged_calls"] > 0:
+                    lines.append(f"kis_pagination_pages_total{{{labels}}} {series['pages']}")
+
+        return "\n".join(lines) + "\n"
+
+
+_useMetrics = False
+_metrics = MetricsRegistry()
+_metricsHooks = []
+
+
+# 호출 지표 수집 사용 여부 (기본값: 사용 안 함)
+def enable_metrics(enabled: bool = True):
+    global _useMetrics
+    _useMetrics = enabled
+
+
+# 호출마다 지표를 전달받을 함수 등록 (ex. 외부 모니터링 시스템 전송), hook(event: dict)
+def add_metrics_hook(hook: Callable[[dict], None]):
+    _metricsHooks.append(hook)
+
+
+# TR 별 지표 요약, {(tr_id, api_url): {calls, errors, retries, bytes, latency_p50/p95/p99, pages_per_call, ...}}
+def get_metrics() -> dict:
+    return _metrics.snapshot()
+
+
+def export_metrics_prometheus() -> str:
+    return _metrics.to_prometheus()
+
+
+def reset_metrics():
+    global _metrics
+    _metrics = MetricsRegistry()
+
+
+# 응답 캐시 정책 : TR id 별 유효시간(ttl, 초)과 최대 보관 건수(max_entries)
+# 하루 단위 이하로 변하는 종목정보/재무/예탁원정보/휴장일 조회만 등록되어 있으며, 필요한 TR 은 set_cache_policy 로 추가한다.
+_cachePolicies = {
+    "CTPF1002R": {"ttl": 86400, "max_entries": 2000},  # 주식기본조회 (search_stock_info)
+    "CTPF1604R": {"ttl": 86400, "max_entries": 2000},  # 상품기본조회 (search_info)
+    "CTPF1702R": {"ttl": 86400, "max_entries": 2000},  # 해외주식 상품기본정보 (search_info)
+    "CTCA0903R": {"ttl": 3600, "max_entries": 100},  # 국내휴장일조회 (chk_holiday)
+    "HHMCM000002C0": {"ttl": 3600, "max_entries": 10},  # 국내선물 영업일조회 (market_time)
+    "CTOS5011R": {"ttl": 86400, "max_entries": 100},  # 해외결제일자조회 (countries_holiday)
+    "FHKST66430100": {"ttl": 86400, "max_entries": 1000},  # 재무정보 대차대조표 (finance_balance_sheet)
+    "FHKST66430200": {"ttl": 86400, "max_entries": 1000},  # 재무정보 손익계산서 (finance_income_statement)
+    "FHKST66430300": {"ttl": 86400, "max_entries": 1000},  # 재무정보 재무비율 (finance_financial_ratio)
+    "FHKST66430400": {"ttl": 86400, "max_entries": 1000},  # 재무정보 수익성비율 (finance_profit_ratio)
+    "FHKST66430500": {"ttl": 86400, "max_entries": 1000},  # 재무정보 기타주요비율 (finance_other_major_ratios)
+    "FHKST66430600": {"ttl": 86400, "max_entries": 1000},  # 재무정보 안정성비율 (finance_stability_ratio)
+    "FHKST66430800": {"ttl": 86400, "max_entries": 1000},  # 재무정보 성장성비율 (finance_growth_ratio)
+    "HHKDB669100C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 유상증자일정 (ksdinfo_paidin_capin)
+    "HHKDB669101C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 무상증자일정 (ksdinfo_bonus_issue)
+    "HHKDB669102C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 배당일정 (ksdinfo_dividend)
+    "HHKDB669103C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 주식매수청구일정 (ksdinfo_purreq)
+    "HHKDB669104C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 합병/분할일정 (ksdinfo_merger_split)
+    "HHKDB669105C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 액면교체일정 (ksdinfo_rev_split)
+    "HHKDB669106C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 자본감소일정 (ksdinfo_cap_dcrs)
+    "HHKDB669107C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 상장정보일정 (ksdinfo_list_info)
+    "HHKDB669108C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 공모주청약일정 (ksdinfo_pub_offer)
+    "HHKDB669109C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 실권주일정 (ksdinfo_forfeit)
+    "HHKDB669110C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 의무예치일정 (ksdinfo_mand_deposit)
+    "HHKDB669111C0": {"ttl": 21600, "max_entries": 500},  # 예탁원정보 주주총회일정 (ksdinfo_sharehld_meet)
+}
+_useResponseCache = True
+
+
+# 저장된 응답(상태코드, 헤더, body)으로 requests.Response 를 다시 만든다 (디스크 캐시 등에서 APIResp 복원시 사용)
+def _buildResponse(status_code: int, headers: dict, content: bytes) -> requests.Response:
+    res = requests.Response()
+    res.status_code = status_code
+    res.headers = CaseInsensitiveDict(headers)
+    res._content = content
+    res.encoding = "utf-8"
+    return res
+
+
+# TR id 별 LRU 메모리 캐시 + 선택적 디스크(sqlite) 캐시
+# 디스크 캐시는 프로그램을 다시 시작해도 유효시간 안의 응답을 재사용할 수 있도록 응답 원문을 저장한다.
+# 응답 객체가 아닌 응답 내용(상태코드, 헤더, body)을 보관하고 적중할 때마다 새 APIResp 를 만들어 반환하므로,
+# 호출한 쪽에서 응답(또는 그로 만든 DataFrame)을 변경해도 이후 캐시 적중 결과에 영향이 없다.
+class ResponseCache:
+    def __init__(self, disk_path: str = None):
+        self._lock = threading.Lock()
+        self._memory = {}  # tr_id -> OrderedDict(key -> (만료시각, (상태코드, 헤더, body)))
+        self._disk = None
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if disk_path:
+            import sqlite3
+
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, tr_id TEXT, expires REAL, status INTEGER, headers TEXT, body BLOB)"
+            )
+            self._disk.commit()
+
+    def get(self, tr_id: str, key: str):
+        now = time.time()
+        with self._lock:
+            entries = self._memory.get(tr_id)
+            if entries is not None and key in entries:
+                expires, payload = entries[key]
+                if expires > now:
+                    entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return APIResp(_buildResponse(*payload))
+                del entries[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT expires, status, headers, body FROM response_cache WHERE key = ? AND expires > ?",
+                    (key, now),
+                ).fetchone()
+                if row is not None:
+                    payload = (row[1], json.loads(row[2]), row[3])
+                    self._putMemory(tr_id, key, row[0], payload)
+                    self.stats["disk_hits"] += 1
+                    return APIResp(_buildResponse(*payload))
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, tr_id: str, key: str, ar, ttl: float):
+        expires = time.time() + ttl
+        res = ar.getResponse()
+        payload = (res.status_code, dict(res.headers), res.content)
+        with self._lock:
+            self._putMemory(tr_id, key, expires, payload)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, tr_id, expires, payload[0], json.dumps(payload[1]), payload[2]),
+                )
+                self._disk.execute(
+                    "DELETE FROM response_cache WHERE tr_id = ? AND key NOT IN "
+                    "(SELECT key FROM response_cache WHERE tr_id = ? ORDER BY expires DESC LIMIT ?)",
+                    (tr_id, tr_id, _cachePolicies[tr_id]["max_entries"]),
+                )
+                self._disk.commit()
+
+    def _putMemory(self, tr_id: str, key: str, expires: float, payload: tuple):
+        entries = self._memory.setdefault(tr_id, OrderedDict())
+        entries[key] = (expires, payload)
+        entries.move_to_end(key)
+        while len(entries) > _cachePolicies[tr_id]["max_entries"]:
+            entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM response_cache")
+                self._disk.commit()
+
+
+_responseCache = ResponseCache()
+
+
+# 응답 캐시 설정 (disk_path 를 지정하면 sqlite 파일에도 저장, ex. os.path.join(config_root, "kis_cache.db"))
+def set_response_cache(enabled: bool = True, disk_path: str = None):
+    global _useResponseCache, _responseCache
+    _useResponseCache = enabled
+    _responseCache = ResponseCache(disk_path)
+
+
+# TR 별 캐시 정책 추가/변경 (계좌번호(CANO)가 포함된 요청과 주문 TR 은 allow_account=True 가 아니면 캐시하지 않음)
+def set_cache_policy(tr_id: str, ttl: float, max_entries: int = 1000, allow_account: bool = False):
+    _cachePolicies[tr_id] = {"ttl": ttl, "max_entries": max_entries, "allow_account": allow_account}
+
+
+def clear_response_cache():
+    _responseCache.clear()
+
+
+# 캐시 현황 (hits: 메모리 적중, disk_hits: 디스크 적중, misses: 미적중, evictions: LRU 로 밀려난 건수)
+def get_cache_stats() -> dict:
+    with _responseCache._lock:
+        return dict(_responseCache.stats)
+
+
+def _getCachePolicy(tr_id: str, params: dict, postFlag: bool):
+    policy = _cachePolicies.get(tr_id)
+    if policy is None or postFlag or tr_id.endswith("U"):
+        return None
+    if "CANO" in params and not policy.get("allow_account", False):  # 계좌 조회는 캐시하지 않음
+        return None
+    return policy
+
+
+# 요청 헤더에 넣는 TR id, 모의투자는 실전투자 TR id 의 첫 글자(T / J / C)를 V 로 바꿈 (호출 지표도 이 TR id 로 기록)
+def _requestTrId(ptr_id: str) -> str:
+    if ptr_id[0] in ("T", "J", "C"):  # 실전투자용 TR id 체크
+        if isPaperTrading():  # 모의투자용 TR id 식별
+            return "V" + ptr_id[1:]
+    return ptr_id
+
+
 def _url_fetch(
         api_url, ptr_id, tr_cont, params, appendHeaders=None, postFlag=False, hashFlag=True
 ):
     url = f"{getTREnv().my_url}{api_url}"
 
-    headers = _getBaseHeader()  # 기본 header 값 정리
-
     # 추가 Header 설정
-    tr_id = ptr_id
-    if ptr_id[0] in ("T", "J", "C"):  # 실전투자용 TR id 체크
-        if isPaperTrading():  # 모의투자용 TR id 식별
-            tr_id = "V" + ptr_id[1:]
+    tr_id = _requestTrId(ptr_id)
 
-    headers["tr_id"] = tr_id  # 트랜젝션 TR id
-    headers["custtype"] = "P"  # 일반(개인고객,법인고객) "P", 제휴사 "B"
-    headers["tr_cont"] = tr_cont  # 트랜젝션 TR id
+    # 환경, tr_id, custtype 별로 만들어 둔 헤더 템플릿에 tr_cont 추가 (appendHeaders 는 그 위에 덮어씀)
+    headers = {**_getHeaderTemplates().get(tr_id), "tr_cont": tr_cont}
 
-    if appendHeaders is not None:
-        if len(appendHeaders) > 0:
-            for x in appendHeaders.keys():
-                headers[x] = appendHeaders.get(x)
+    if appendHeaders:
+        headers.update(appendHeaders)
 
     if _DEBUG:
         print("< Sending Info >")
@@ -438,26 +1879,610 @@ def _url_fetch(
         print(f"<header>\n{headers}")
         print(f"<body>\n{params}")
 
-    if postFlag:
-        # if (hashFlag): set_order_hash_key(headers, params)
-        res = requests.post(url, headers=headers, data=json.dumps(params))
+    policy_tr_id = _registeredTrId(_cachePolicies, tr_id)  # 모의투자도 실전투자 TR id 의 캐시 정책 사용
+    cache_policy = _getCachePolicy(policy_tr_id, params, postFlag) if _useResponseCache else None
+    coalescable = _useCoalescing and _isCoalescable(tr_id, postFlag)
+    if cache_policy is None and not coalescable:
+        ar = _fetch_response(api_url, url, headers, params, postFlag)
+    else:
+        key = f"{url}|{tr_id}|{tr_cont}|{json.dumps(params, sort_keys=True)}|{json.dumps(appendHeaders, sort_keys=True)}"
+        ar = _fetch_shared(api_url, url, headers, params, postFlag, policy_tr_id, key, cache_policy, coalescable)
+
+    call_log = _callLog.get()
+    if call_log is not None:  # ka.call(typed / arrow) 호출이면 스키마 조회, Arrow 변환을 위해 응답 기록
+        call_log.append((ptr_id, ar))
+    return ar
+
+
+# 응답 캐시 확인 후 없으면 (동일 요청 병합하여) 요청
+def _fetch_shared(api_url, url, headers, params, postFlag, tr_id, key, cache_policy, coalescable):
+    if cache_policy is not None:
+        ar = _responseCache.get(tr_id, key)
+        if ar is not None:
+            return ar
+
+    if coalescable:
+        ar = _coalesce(key, lambda: _fetch_response(api_url, url, headers, params, postFlag))
     else:
-        res = requests.get(url, headers=headers, params=params)
+        ar = _fetch_response(api_url, url, headers, params, postFlag)
+
+    if cache_policy is not None and ar.isOK():
+        _responseCache.put(tr_id, key, ar, cache_policy["ttl"])
+    return ar
+
+
+# 요청을 전송하고 응답을 APIResp / APIRespError 로 변환
+def _fetch_response(api_url, url, headers, params, postFlag):
+    started = time.perf_counter() if _useMetrics else 0.0
+    limiter = None
+    slot = _pickAppKeySlot(headers, params, postFlag) if len(_appKeyPool) > 0 else None
+    if slot is not None and slot is not _appKeyPool[0]:  # 시세 조회는 앱키 풀에 분산 (기본 앱키는 요청 헤더 그대로)
+        token = slot.getToken()
+        if token is None:  # 토큰 발급 실패시 기본 앱키로 전송
+            slot = None
+        else:
+            headers = dict(headers)
+            headers["authorization"] = f"Bearer {token}"
+            headers["appkey"] = slot.appkey
+            headers["appsecret"] = slot.appsecret
+    if slot is not None:
+        limiter = slot.limiter
+        slot.begin()
+
+    try:
+        res, retries = _send_with_retry(url, headers, params, postFlag, limiter)
+    finally:
+        if slot is not None:
+            slot.end()
 
     if res.status_code == 200:
         ar = APIResp(res)
+        ar._retryCount = retries
         if _DEBUG:
             ar.printAll()
-        return ar
     else:
         print("Error Code : " + str(res.status_code) + " | " + res.text)
-        return APIRespError(res.status_code, res.text)
+        ar = APIRespError(res.status_code, res.text)
+        ar._retryCount = retries
+
+    if _useMetrics:
+        _metrics.record_call(
+            headers["tr_id"], api_url, time.perf_counter() - started, len(res.content), retries,
+            None if ar.isOK() else ar.getErrorCode(),
+        )
+    return ar
 
 
 # auth()
 # print("Pass through the end of the line")
 
 
+########### 연속조회(tr_cont) 공통
+
+# 연속조회 키 매핑 : 다음 요청 파라미터 이름 -> 이전 응답 body 의 필드 이름 (또는 응답을 받아 값을 돌려주는 함수)
+CTX_AREA_CURSOR_100 = {"CTX_AREA_FK100": "ctx_area_fk100", "CTX_AREA_NK100": "ctx_area_nk100"}
+CTX_AREA_CURSOR_200 = {"CTX_AREA_FK200": "ctx_area_fk200", "CTX_AREA_NK200": "ctx_area_nk200"}
+
+# 연속조회 키 함수가 돌려주면 tr_cont 가 M / F 라도 다음 페이지를 요청하지 않고 종료 (ex. 응답 목록이 비어 키를 만들 수 없을 때)
+END_OF_PAGES = object()
+
+
+def paginate(
+        api_url, ptr_id, params, cursor=None, tr_cont="", max_pages=None, appendHeaders=None, postFlag=False
+):
+    """
+    연속조회(tr_cont)가 필요한 API 를 페이지 단위로 호출하는 generator
+
+    응답 header 의 tr_cont 가 M 또는 F 이면 cursor 에 따라 연속조회 키를 갱신하고 tr_cont="N" 으로 다음 페이지를 요청한다.
+    재귀 호출 대신 반복문으로 처리하므로 페이지 수에 따른 호출 깊이 제한이 없다.
+
+    Args:
+        api_url (str): API URL (ex. /uapi/domestic-stock/v1/trading/inquire-balance)
+        ptr_id (str): TR ID
+        params (dict): 첫 페이지 요청 파라미터
+        cursor (dict): 연속조회 키 매핑 (ex. CTX_AREA_CURSOR_100, {"KEYB": lambda res: ...}), 함수가 END_OF_PAGES 를 돌려주면 종료
+        tr_cont (str): 첫 요청의 연속거래여부
+        max_pages (int): 최대 조회 페이지 수 (None 이면 제한 없음)
+
+    Returns:
+        Generator[APIResp]: 페이지별 응답, 오류 응답을 받으면 해당 응답을 마지막으로 종료
+
+    Example:
+        >>> for res in ka.paginate(api_url, tr_id, params, cursor=ka.CTX_AREA_CURSOR_100):
+        ...     print(res.getBody().output1)
+    """
+    params = dict(params)
+    page = 0
+    try:
+        while True:
+            res = _url_fetch(api_url, ptr_id, tr_cont, params, appendHeaders, postFlag)
+            page += 1
+            yield res
+
+            if not res.isOK() or res.getHeader().tr_cont not in ("M", "F"):
+                return
+            if max_pages is not None and page >= max_pages:
+                logging.warning("Max page count reached.")
+                return
+
+            if cursor is not None:
+                for key, source in cursor.items():
+                    if callable(source):
+                        params[key] = source(res)
+                        if params[key] is END_OF_PAGES:
+                            logging.info("No next page key, stop.")
+                            return
+                    else:
+                        params[key] = getattr(res.getBody(), source, "")
+            tr_cont = "N"
+
+            logging.info("Call Next page...")
+            smart_sleep()  # 시스템 안정적 운영을 위한 지연
+    finally:
+        if _useMetrics:
+            _metrics.record_pages(_requestTrId(ptr_id), api_url, page)  # record_call 과 같은 TR id
+
+
+def fetch_pages(
+        api_url, ptr_id, params, outputs=("output",), cursor=None, tr_cont="", max_pages=None, appendHeaders=None,
+        postFlag=False, typed=False, arrow=False
+) -> tuple:
+    """
+    연속조회 결과를 모두 받아 output 별 DataFrame 으로 반환
+
+    페이지마다 DataFrame 을 만들어 이어 붙이지 않고, 레코드를 모은 뒤 마지막에 한번만 DataFrame 을 생성한다.
+
+    Args:
+        outputs (tuple[str]): DataFrame 으로 만들 응답 body 필드 (ex. ("output1", "output2"))
+        typed (bool): True 면 컬럼을 스키마에 따라 숫자 / 날짜 / 시간 타입으로 변환 (apply_schema 참고)
+        arrow (bool): True 면 DataFrame 대신 pyarrow.Table 을 JSON 레코드에서 바로 생성 (to_arrow 참고)
+        그 외 인자는 paginate 와 동일
+
+    Returns:
+        tuple[pd.DataFrame, ...]: outputs 순서대로의 DataFrame (arrow=True 면 pyarrow.Table), 오류 발생시 빈 DataFrame
+
+    Example:
+        >>> df1, df2 = ka.fetch_pages(api_url, tr_id, params, outputs=("output1", "output2"), cursor=ka.CTX_AREA_CURSOR_100)
+    """
+    records = [[] for _ in outputs]
+    for res in paginate(api_url, ptr_id, params, cursor, tr_cont, max_pages, appendHeaders, postFlag):
+        if not res.isOK():
+            res.printError(url=api_url)
+            if arrow:
+                return tuple(to_arrow([]) for _ in outputs)
+            import pandas as pd
+
+            return tuple(pd.DataFrame() for _ in outputs)
+
+        body = res.getBody()
+        for rows, name in zip(records, outputs):
+            data = getattr(body, name, None)
+            if isinstance(data, list):
+                rows.extend(data)
+            elif isinstance(data, dict) and len(data) > 0:
+                rows.append(data)
+
+    logging.info("Data fetch complete.")
+    if arrow:
+        return tuple(to_arrow(rows, ptr_id if typed else None) for rows in records)
+
+    import pandas as pd
+
+    if typed:
+        return tuple(apply_schema(pd.DataFrame(rows), ptr_id) for rows in records)
+    return tuple(pd.DataFrame(rows) for rows in records)
+
+
+########### 컬럼 타입 스키마 (typed=True)
+
+# 응답의 모든 값은 문자열이므로 DataFrame 컬럼이 object 타입이 된다.
+# typed=True 로 호출하면 tr_id 별 스키마(컬럼: 'int' / 'float' / 'date' / 'time')에 따라 DataFrame 생성 직후 한번에 변환한다.
+# 스키마는 kis_schema.json (kis_schema_gen.py 로 chk_*.py 의 COLUMN_MAPPING 에서 생성) 을 사용하고,
+# 등록되지 않은 TR 은 컬럼명 규칙(_inferDtype)으로 추정한다.
+_schemaRegistry = None
+_schemaLock = threading.Lock()
+_callLog = contextvars.ContextVar("kis_call_log", default=None)  # ka.call 실행 중 요청한 (tr_id, 응답) 기록
+
+# 컬럼명 마지막 단어(숫자 제외)별 타입
+_DTYPE_BY_SUFFIX = {
+    **dict.fromkeys(("date", "dt", "ymd", "xymd"), "date"),
+    **dict.fromkeys(("hour", "tmd", "hms", "xhms", "time"), "time"),
+    **dict.fromkeys(("rate", "ctrt", "rt", "ehrt", "tnrt", "per", "pbr", "eps", "bps", "roe", "roa"), "float"),
+    **dict.fromkeys(
+        ("prpr", "prc", "pric", "oprc", "hgpr", "lwpr", "clpr", "mxpr", "llam", "sdpr", "sspr", "vrss", "vol", "qty",
+         "pbmn", "amt", "stcn", "cnt", "avls", "cpfn", "fcam", "unit", "askp", "bidp", "rsqn", "icdc", "smtn"),
+        "int",
+    ),
+}
+
+# 한글 설명 끝말별 타입 (설명이 있으면 컬럼명 규칙보다 먼저 적용)
+_DTYPE_BY_DESCRIPTION = (
+    (("코드", "여부", "명", "번호", "부호", "구분", "ID"), None),
+    (("일자",), "date"),
+    (("시간", "시각"), "time"),
+    (("율", "률"), "float"),
+    (("가", "가격", "금액", "대금", "수량", "량", "주수", "대비"), "int"),
+)
+
+
+# 컬럼 타입 추정, 문자열로 둘 컬럼은 None
+# 부호, 종목명/이름 컬럼은 설명(ex. '전일 대비 부호', '체결종목명')과 관계없이 문자열
+_TEXT_SUFFIXES = ("_sign", "_name")
+_TEXT_KEYWORDS = ("isnm",)
+
+
+def _inferDtype(column: str, description: str = None):
+    name = column.lower().rstrip("0123456789")
+    if name.endswith(_TEXT_SUFFIXES) or any(keyword in name for keyword in _TEXT_KEYWORDS):
+        return None
+    by_name = _DTYPE_BY_SUFFIX.get(name.split("_")[-1])
+    if by_name == "float":  # 비율 컬럼(ctrt, rate 등)은 설명이 '대비' 로 끝나도 float
+        return by_name
+    if description:
+        text = description.strip().rstrip("0123456789 ")
+        for endings, dtype in _DTYPE_BY_DESCRIPTION:
+            if text.endswith(endings):
+                return dtype
+    return by_name
+
+
+def _getSchemaRegistry() -> dict:
+    global _schemaRegistry
+    if _schemaRegistry is None:
+        with _schemaLock:
+            if _schemaRegistry is None:
+                path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kis_schema.json")
+                registry = {}
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        registry = json.load(f)
+                _schemaRegistry = registry
+    return _schemaRegistry
+
+
+# 스키마 등록, columns: {컬럼명: 'int' / 'float' / 'date' / 'time'} (등록된 TR 의 나머지 컬럼은 문자열 유지)
+def register_schema(tr_id: str, columns: dict):
+    _getSchemaRegistry().setdefault(tr_id, {}).update(columns)
+
+
+# 스키마 파일 추가 로드 ({tr_id: {컬럼명: 타입}} 형식의 json)
+def load_schema_registry(path: str):
+    with open(path, encoding="utf-8") as f:
+        for tr_id, columns in json.load(f).items():
+            register_schema(tr_id, columns)
+
+
+def _convertColumn(series, dtype: str):
+    import pandas as pd
+
+    if dtype == "int" or dtype == "float":
+        values = pd.to_numeric(series, errors="coerce")
+        if dtype == "int":
+            valid = values.dropna()
+            if (valid % 1 == 0).all():  # 소수점이 있는 가격(해외 등)은 float 유지
+                values = values.astype("Int64")
+    elif dtype == "date":
+        values = pd.to_datetime(series, format="%Y%m%d", errors="coerce")
+    elif dtype == "time":
+        text = series.astype(str)
+        values = pd.to_timedelta(text.str[0:2] + ":" + text.str[2:4] + ":" + text.str[4:6], errors="coerce")
+    else:
+        return series
+
+    # 변환되지 않는 값(빈 값 제외)이 있으면 원본 유지
+    failed = values.isna() & series.notna() & (series.astype(str).str.strip() != "")
+    return series if failed.any() else values
+
+
+def apply_schema(df, tr_id: str):
+    """
+    DataFrame 의 문자열 컬럼을 tr_id 스키마에 따라 숫자 / 날짜 / 시간 타입으로 변환 (컬럼 단위 일괄 변환)
+
+    Args:
+        df (pd.DataFrame): API 응답으로 만든 DataFrame
+        tr_id (str): 실전투자 기준 tr_id (스키마 조회 키)
+
+    Returns:
+        pd.DataFrame: 변환된 DataFrame (변환할 컬럼이 없으면 df 그대로)
+    """
+    if len(df.columns) == 0:
+        return df
+    from pandas.api.types import is_string_dtype
+
+    schema = _getSchemaRegistry().get(tr_id)
+    converted = {}
+    for column in df.columns:
+        dtype = schema.get(column) if schema is not None else _inferDtype(column)
+        if dtype is not None and is_string_dtype(df[column]):
+            converted[column] = _convertColumn(df[column], dtype)
+    if len(converted) == 0:
+        return df
+    return df.assign(**converted)
+
+
+def call(func: Callable, *args, typed: bool = False, arrow: bool = False, client: KISClient = None, **kwargs):
+    """
+    *_functions.py 의 함수를 실행하는 공통 함수 (타입 변환, Arrow 출력, 계좌별 클라이언트 선택)
+
+    Args:
+        func (Callable): 실행할 함수 (ex. inquire_price)
+        typed (bool): True 면 반환된 DataFrame(또는 DataFrame tuple)의 컬럼을 스키마에 따라 변환
+        arrow (bool): True 면 함수가 받은 응답의 output 필드별로 JSON 레코드에서 바로 만든 pyarrow.Table 을
+                      {"output1": Table, "output2": Table, ...} 로 반환 (연속조회한 페이지는 이어 붙임)
+        client (KISClient): 지정하면 해당 클라이언트의 환경으로 실행
+        *args, **kwargs: func 에 전달할 인자
+
+    Example:
+        >>> df = ka.call(inquire_daily_itemchartprice, "real", "J", "005930", "20250101", "20250131", "D", "0", typed=True)
+        >>> df["stck_clpr"].dtype
+        Int64Dtype()
+        >>> tables = ka.call(inquire_investor, "real", "J", "005930", typed=True, arrow=True)
+        >>> ka.append_parquet(tables["output"], "data", "FHKST01010900", symbol="005930")
+    """
+    if client is not None:
+        return client.call(call, func, *args, typed=typed, arrow=arrow, **kwargs)
+    if not typed and not arrow:
+        return func(*args, **kwargs)
+
+    call_log = []
+    token = _callLog.set(call_log)
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        _callLog.reset(token)
+
+    if arrow:
+        return _responsesToArrow(call_log, typed)
+
+    tr_ids = [tr_id for tr_id, _ in call_log]
+    if len(tr_ids) == 0:
+        return result
+
+    if isinstance(result, tuple):
+        return tuple(_applySchemaAny(item, tr_ids) for item in result)
+    return _applySchemaAny(result, tr_ids)
+
+
+def _applySchemaAny(result, tr_ids: list):
+    if not hasattr(result, "columns"):  # DataFrame 이 아니면 그대로
+        return result
+    tr_id = next((t for t in tr_ids if t in _getSchemaRegistry()), tr_ids[0])
+    return apply_schema(result, tr_id)
+
+
+########### Arrow / Parquet 출력 (pip install pyarrow)
+
+# 스키마 타입별 Arrow 타입
+def _arrowType(pa, dtype: str):
+    return {"int": pa.int64(), "float": pa.float64(), "date": pa.date32(), "time": pa.time32("s")}[dtype]
+
+
+def _importArrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow / Parquet 출력에는 pyarrow 가 필요합니다. (pip install pyarrow)") from None
+    return pyarrow
+
+
+# 문자열 컬럼을 스키마 타입으로 변환, 변환할 수 없는 값이 있으면 원본 유지 (소수점이 있는 정수 컬럼은 float64)
+def _castArrowColumn(pa, column, dtype: str):
+    import pyarrow.compute as pc
+
+    trimmed = pc.utf8_trim_whitespace(column)
+    values = pc.if_else(pc.equal(trimmed, ""), pa.scalar(None, pa.string()), trimmed)
+    try:
+        if dtype == "date":
+            return pc.cast(pc.strptime(values, format="%Y%m%d", unit="s"), pa.date32())
+        if dtype == "time":
+            return pc.cast(pc.strptime(values, format="%H%M%S", unit="s"), pa.time32("s"))
+        try:
+            return pc.cast(values, _arrowType(pa, dtype))
+        except pa.ArrowInvalid:
+            if dtype != "int":
+                raise
+            return pc.cast(values, pa.float64())
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+        return column
+
+
+def to_arrow(rows: list, tr_id: str = None):
+    """
+    API 응답의 output 레코드(list[dict])로 pyarrow.Table 생성 (pandas 를 거치지 않음)
+
+    Args:
+        rows (list[dict]): 응답 body 의 output 레코드
+        tr_id (str): 지정하면 스키마에 따라 숫자 / 날짜 / 시간 타입으로 변환 (apply_schema 와 같은 규칙)
+
+    Returns:
+        pyarrow.Table
+    """
+    pa = _importArrow()
+    table = pa.Table.from_pylist(rows)
+    if tr_id is None or table.num_rows == 0:
+        return table
+
+    schema = _getSchemaRegistry().get(tr_id)
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        dtype = schema.get(name) if schema is not None else _inferDtype(name)
+        if dtype is not None and pa.types.is_string(column.type):
+            column = _castArrowColumn(pa, column, dtype)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, names=table.column_names)
+
+
+# ka.call(arrow=True) : 기록된 응답의 output 필드별 레코드를 모아 Table 생성
+def _responsesToArrow(call_log: list, typed: bool) -> dict:
+    records = {}
+    schema_tr_id = {}
+    for tr_id, res in call_log:
+        if not res.isOK():
+            continue
+        body = res.getBody()
+        for name in body._fields:
+            if not name.startswith("output"):
+                continue
+            data = getattr(body, name)
+            rows = records.setdefault(name, [])
+            schema_tr_id.setdefault(name, tr_id)
+            if isinstance(data, list):
+                rows.extend(data)
+            elif isinstance(data, dict) and len(data) > 0:
+                rows.append(data)
+    return {
+        name: to_arrow(rows, schema_tr_id[name] if typed else None) for name, rows in records.items()
+    }
+
+
+def append_parquet(table, root_path: str, tr_id: str, date: str = None, symbol: str = None) -> str:
+    """
+    Arrow Table 을 TR / 일자 / 종목별로 분할된 Parquet 데이터셋에 추가 (파일 하나씩 추가하므로 기존 파일은 그대로)
+
+    저장 경로 : root_path/tr_id=<tr_id>/date=<YYYYMMDD>/symbol=<종목코드>/part-<난수>.parquet (symbol 미지정시 symbol 폴더 없음)
+    read_parquet(root_path, filters=[("symbol", "=", "005930")]) 로 조건에 맞는 파일만 읽을 수 있다.
+
+    Args:
+        table (pyarrow.Table): 저장할 데이터 (ka.call(..., arrow=True), fetch_pages(..., arrow=True) 결과)
+        root_path (str): 데이터셋 최상위 폴더
+        tr_id (str): TR id
+        date (str): 일자 (YYYYMMDD), 미지정시 오늘
+        symbol (str): 종목코드
+
+    Returns:
+        str: 저장한 파일 경로
+    """
+    _importArrow()
+    import pyarrow.parquet as pq
+
+    path = os.path.join(root_path, f"tr_id={tr_id}", f"date={date or datetime.now().strftime('%Y%m%d')}")
+    if symbol is not None:
+        path = os.path.join(path, f"symbol={symbol}")
+    os.makedirs(path, exist_ok=True)
+
+    file_path = os.path.join(path, f"part-{os.urandom(8).hex()}.parquet")
+    pq.write_table(table, file_path)
+    return file_path
+
+
+def read_parquet(root_path: str, filters: list = None, columns: list = None):
+    """
+    append_parquet 으로 저장한 데이터셋 읽기 (분할 키 tr_id / date / symbol 은 문자열 컬럼, 종목코드 앞자리 0 유지)
+
+    Args:
+        root_path (str): 데이터셋 최상위 폴더
+        filters (list): 조건 (ex. [("tr_id", "=", "FHKST03010100"), ("date", ">=", "20250101")])
+        columns (list): 읽을 컬럼, 미지정시 전체
+
+    Returns:
+        pyarrow.Table
+    """
+    pa = _importArrow()
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    partitioning = ds.partitioning(
+        pa.schema([("tr_id", pa.string()), ("date", pa.string()), ("symbol", pa.string())]), flavor="hive"
+    )
+    return pq.read_table(root_path, filters=filters, columns=columns, partitioning=partitioning)
+
+
+# Arrow IPC 파일로 저장, 다른 프로세스는 pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all() 로 복사 없이 읽을 수 있다.
+def save_arrow(table, path: str):
+    pa = _importArrow()
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+########### asyncio 대응 : API 호출 공통 (비동기)
+
+# 비동기 호출을 실행할 작업 스레드 풀
+# 각 요청은 커넥션 풀을 공유하는 작업 스레드에서 _url_fetch 로 실행되며,
+# 이벤트 루프는 세마포어로 동시 호출 수를 제한하고 초당 호출 한도 대기도 스레드를 점유하지 않고 루프에서 처리한다.
+def _getAsyncExecutor() -> ThreadPoolExecutor:
+    global _asyncExecutor
+    if _asyncExecutor is None:
+        with _httpLock:
+            if _asyncExecutor is None:
+                _asyncExecutor = ThreadPoolExecutor(
+                    max_workers=_getAsyncConcurrency(), thread_name_prefix="kis-async"
+                )
+    return _asyncExecutor
+
+
+def _getAsyncConcurrency() -> int:
+    return _asyncConcurrency or int(_cfg.get("async_concurrency", 64))
+
+
+def _getAsyncSemaphore() -> asyncio.Semaphore:
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    sem = _asyncSemaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(_getAsyncConcurrency())
+        _asyncSemaphores[loop] = sem
+    return sem
+
+
+# 비동기 동시 호출 수 변경 (커넥션 풀 크기도 함께 늘려야 커넥션 재사용 효과가 유지됨, set_http_pool 참고)
+def set_async_concurrency(max_concurrency: int):
+    global _asyncConcurrency, _asyncExecutor
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be greater than 0")
+    with _httpLock:
+        old_executor = _asyncExecutor
+        _asyncConcurrency = max_concurrency
+        _asyncExecutor = None
+    _asyncSemaphores.clear()
+    if old_executor is not None:
+        old_executor.shutdown(wait=False)
+
+
+async def call_async(func: Callable, *args, **kwargs):
+    """
+    동기 API 호출 함수를 asyncio 에서 사용할 수 있도록 실행하는 공통 함수
+
+    *_functions.py 의 모든 함수(예: inquire_price)와 _url_fetch 를 그대로 비동기로 호출할 수 있다.
+    동시 실행 수는 set_async_concurrency 로, 초당 호출 수는 토큰 버킷(set_rate_limit)으로 제한된다.
+
+    Args:
+        func (Callable): 실행할 동기 함수
+        *args, **kwargs: func 에 전달할 인자
+
+    Returns:
+        func 의 반환값
+
+    Example:
+        >>> dfs = await asyncio.gather(*[
+        ...     ka.call_async(inquire_price, "real", "J", code) for code in codes
+        ... ])
+    """
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    async with _getAsyncSemaphore():
+        ctx = contextvars.copy_context()
+        # 앱키 분산, 우선순위 스케줄러 사용시에는 앱키별 한도, 요청의 우선순위를 알 수 있는 작업 스레드에서 대기
+        if _useRateLimiter and len(_appKeyPool) == 0 and not _isPriorityScheduling():
+            limiter = _getRateLimiter()
+            await limiter.acquire_async()  # 초당 호출 한도 대기 (루프에서)
+            ctx.run(_prepaidToken.set, limiter)
+        return await loop.run_in_executor(
+            _getAsyncExecutor(), lambda: ctx.run(func, *args, **kwargs)
+        )
+
+
+# _url_fetch 의 비동기 버전, 응답은 동기 버전과 동일한 APIResp / APIRespError
+async def _url_fetch_async(
+        api_url, ptr_id, tr_cont, params, appendHeaders=None, postFlag=False, hashFlag=True
+):
+    return await call_async(
+        _url_fetch, api_url, ptr_id, tr_cont, params, appendHeaders, postFlag, hashFlag
+    )
+
+
 ########### New - websocket 대응
 
 _base_headers_ws = {
@@ -466,14 +2491,34 @@ _base_headers_ws = {
 
 
 def _getBaseHeader_ws():
-    if _autoReAuth:
-        reAuth_ws()
+    client = _currentClient.get()
+    if client is not None:
+        return dict(client.headers_ws)
+
+    return dict(_base_headers_ws)
 
-    return copy.deepcopy(_base_headers_ws)
+
+# 웹소켓 접속키 발급, 실패하면 None
+def _issueApprovalKey(url: str, appkey: str, secretkey: str):
+    p = {"grant_type": "client_credentials", "appkey": appkey, "secretkey": secretkey}
+    res = _getSession().post(f"{url}/oauth2/Approval", data=json.dumps(p), headers=_getBaseHeader())  # 토큰 발급
+    if res.status_code != 200:
+        print("Get Approval token fail!\nYou have to restart your app!!!")
+        return None
+    return _getResultObject(res.json()).approval_key
 
 
-def auth_ws(svr="prod", product=_cfg["my_prod"]):
-    p = {"grant_type": "client_credentials"}
+# 현재 환경의 웹소켓 접속키만 다시 발급 (재접속시 사용, auth_ws 와 달리 REST 환경, 토큰은 그대로 유지)
+def _refreshApprovalKey() -> bool:
+    env = getTREnv()
+    approval_key = _issueApprovalKey(env.my_url, env.my_app, env.my_sec)
+    if approval_key is None:
+        return False
+    _base_headers_ws["approval_key"] = approval_key
+    return True
+
+
+def auth_ws(svr="prod", product=None):
     if svr == "prod":
         ak1 = "my_app"
         ak2 = "my_sec"
@@ -481,16 +2526,8 @@ def auth_ws(svr="prod", product=_cfg["my_prod"]):
         ak1 = "paper_app"
         ak2 = "paper_sec"
 
-    p["appkey"] = _cfg[ak1]
-    p["secretkey"] = _cfg[ak2]
-
-    url = f"{_cfg[svr]}/oauth2/Approval"
-    res = requests.post(url, data=json.dumps(p), headers=_getBaseHeader())  # 토큰 발급
-    rescode = res.status_code
-    if rescode == 200:  # 토큰 정상 발급
-        approval_key = _getResultObject(res.json()).approval_key
-    else:
-        print("Get Approval token fail!\nYou have to restart your app!!!")
+    approval_key = _issueApprovalKey(_cfg[svr], _cfg[ak1], _cfg[ak2])
+    if approval_key is None:
         return
 
     changeTREnv(None, svr, product)
@@ -499,12 +2536,30 @@ def auth_ws(svr="prod", product=_cfg["my_prod"]):
 
     global _last_auth_time
     _last_auth_time = datetime.now()
+    _scheduleReAuth(_reAuthTimers, "ws", _reAuthDelay(), lambda: _reAuthApprovalKey(svr, product))
 
     if _DEBUG:
         print(f"[{_last_auth_time}] => get AUTH Key completed!")
 
 
-def reAuth_ws(svr="prod", product=_cfg["my_prod"]):
+# 타이머에서 웹소켓 접속키만 재발급 (auth_ws 와 달리 _TRENV 를 바꾸지 않으므로 진행 중인 REST 요청의 토큰은 그대로)
+def _reAuthApprovalKey(svr="prod", product=None):
+    if svr == "prod":
+        ak1 = "my_app"
+        ak2 = "my_sec"
+    elif svr == "vps":
+        ak1 = "paper_app"
+        ak2 = "paper_sec"
+
+    approval_key = _issueApprovalKey(_cfg[svr], _cfg[ak1], _cfg[ak2])
+    if approval_key is None:
+        return
+
+    _base_headers_ws["approval_key"] = approval_key
+    _scheduleReAuth(_reAuthTimers, "ws", _reAuthDelay(), lambda: _reAuthApprovalKey(svr, product))
+
+
+def reAuth_ws(svr="prod", product=None):
     n2 = datetime.now()
     if (n2 - _last_auth_time).seconds >= 86400:
         auth_ws(svr, product)
@@ -560,9 +2615,9 @@ def system_resp(data):
     else:
         isPingPong = True if tr_id == "PINGPONG" else False
 
-    nt2 = namedtuple(
+    nt2 = _getResultType(
         "SysMsg",
-        [
+        (
             "isOk",
             "tr_id",
             "tr_key",
@@ -572,7 +2627,7 @@ def system_resp(data):
             "iv",
             "ekey",
             "encrypt",
-        ],
+        ),
     )
     d = {
         "isOk": isOk,
@@ -593,31 +2648,166 @@ def aes_cbc_base64_dec(key, iv, cipher_text):
     if key is None or iv is None:
         raise AttributeError("key and iv cannot be None")
 
+    from base64 import b64decode
+
+    # pip install pycryptodome
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import unpad
+
     cipher = AES.new(key.encode("utf-8"), AES.MODE_CBC, iv.encode("utf-8"))
     return bytes.decode(unpad(cipher.decrypt(b64decode(cipher_text)), AES.block_size))
 
 
+# 실시간 데이터 payload 를 레코드별 행으로 변환
+# 체결이 몰리면 한 메시지에 여러 건(건수: 메시지의 세번째 값)의 값이 '^' 로 이어져 오므로,
+# 값 목록을 건수 x 컬럼 수 배열로 한번에 나누어 건당 한 행의 DataFrame 을 만든다.
+# 건당 값의 수가 컬럼 정의와 다르면(컬럼 추가 등) 남는 값은 버리고 모자란 값은 None 으로 채운다.
+# 빈 값은 기존 pd.read_csv 와 같이 결측값(None)으로 둔다.
+def _frameToDataFrame(payload: str, count: int, columns: list) -> pd.DataFrame:
+    import numpy as np
+    import pandas as pd
+
+    fields = payload.split("^")
+    if count < 1 or len(fields) % count != 0:
+        logging.warning("record count %d does not match %d fields", count, len(fields))
+        count = 1
+    values = np.array(fields, dtype=object).reshape(count, -1)
+    values[values == ""] = None
+
+    width = len(columns)
+    if values.shape[1] > width:
+        values = values[:, :width]
+    elif values.shape[1] < width:
+        values = np.concatenate([values, np.full((count, width - values.shape[1]), None, dtype=object)], axis=1)
+    return pd.DataFrame(values, columns=columns, dtype=object)
+
+
+# pandas 없이 실시간 메시지를 나누는 디코더 (KISWebSocket.start(..., result_type="tuple" / "record"))
+# tr_id, 컬럼 목록별로 한번만 만들고, 메시지의 값 목록을 건당 튜플 또는 레코드(__slots__ 클래스)로 나눈다.
+# typed=True 이면 컬럼명으로 추정한 int / float 컬럼만 숫자로 바꾸고(날짜, 시간은 문자열 유지) 빈 값은 None
+class TickDecoder:
+    __slots__ = ("tr_id", "columns", "width", "record", "int_index", "float_index")
+
+    def __init__(self, tr_id: str, columns: list, result_type: str = "tuple", typed: bool = False):
+        self.tr_id = tr_id
+        self.columns = columns
+        self.width = len(columns)
+        self.record = _tickRecordClass(tr_id, tuple(columns)) if result_type == "record" else None
+        self.int_index = ()
+        self.float_index = ()
+        if typed:
+            dtypes = [_inferDtype(column) for column in columns]
+            self.int_index = tuple(i for i, dtype in enumerate(dtypes) if dtype == "int")
+            self.float_index = tuple(i for i, dtype in enumerate(dtypes) if dtype == "float")
+
+    def decode(self, payload: str, count: int) -> list:
+        fields = payload.split("^")
+        width = self.width
+        if count < 1 or len(fields) % count != 0:
+            logging.warning("record count %d does not match %d fields", count, len(fields))
+            count = 1
+        step = len(fields) // count
+        if step == width:
+            rows = [fields[i:i + width] for i in range(0, len(fields), width)]
+        else:  # 컬럼 정의와 값의 수가 다르면 _frameToDataFrame 과 같이 자르거나 None 으로 채움
+            pad = [None] * max(width - step, 0)
+            rows = [fields[i:i + min(step, width)] + pad for i in range(0, len(fields), step)]
+
+        if self.int_index or self.float_index:
+            for row in rows:
+                for i in self.int_index:
+                    row[i] = _toInt(row[i])
+                for i in self.float_index:
+                    row[i] = _toFloat(row[i])
+
+        if self.record is not None:
+            record = self.record
+            return [record(*row) for row in rows]
+        return [tuple(row) for row in rows]
+
+
+# 숫자로 변환할 수 없는 값("-", 공백 등)은 원래 문자열 그대로 두어 한 건의 값 때문에 메시지 전체가 실패하지 않도록 함
+def _toInt(value: str):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:  # 소수점이 있는 가격(해외 등)은 float
+        return _toFloat(value)
+
+
+def _toFloat(value: str):
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+# tr_id 별 레코드 클래스, 속성명은 컬럼명 그대로 (ex. record.STCK_PRPR)
+@lru_cache(maxsize=None)
+def _tickRecordClass(tr_id: str, columns: tuple) -> type:
+    import dataclasses
+    import keyword
+
+    names = []
+    for column in columns:
+        name = re.sub(r"\W", "_", column)
+        if not name.isidentifier() or keyword.iskeyword(name) or name in names:
+            name = f"f{len(names)}_{name}"
+        names.append(name)
+    return dataclasses.make_dataclass(f"Tick_{tr_id}", names, slots=True)
+
+
+_tickDecoders: dict = {}
+
+
+def _getTickDecoder(tr_id: str, columns: list, result_type: str, typed: bool) -> TickDecoder:
+    key = (tr_id, result_type, typed)
+    decoder = _tickDecoders.get(key)
+    if decoder is None or decoder.columns is not columns:  # add_data_map 으로 컬럼이 바뀌면 다시 만듦
+        decoder = TickDecoder(tr_id, columns, result_type, typed)
+        _tickDecoders[key] = decoder
+    return decoder
+
+
 #####
 open_map: dict = {}
 
+# 웹소켓 세션(접속키)당 구독 가능한 (tr_id, 종목) 수
+_WS_MAX_SUBSCRIPTIONS = 40
+
 
 def add_open_map(
         name: str,
         request: Callable[[str, str, ...], (dict, list[str])],
         data: str | list[str],
         kwargs: dict = None,
+        target: dict = None,
 ):
-    if open_map.get(name, None) is None:
-        open_map[name] = {
+    target = open_map if target is None else target
+    if target.get(name, None) is None:
+        target[name] = {
             "func": request,
             "items": [],
             "kwargs": kwargs,
         }
 
     if type(data) is list:
-        open_map[name]["items"] += data
+        target[name]["items"] += data
     elif type(data) is str:
-        open_map[name]["items"].append(data)
+        target[name]["items"].append(data)
+
+
+def _countSubscriptions(subscriptions: dict) -> int:
+    return sum(len(obj["items"]) for obj in subscriptions.values())
+
+
+# 구독 식별자 (tr_id, 종목)
+def _subscriptionKey(request: Callable, item: str, kwargs: dict = None) -> tuple:
+    msg, _ = request("1", item, **({} if kwargs is None else kwargs))
+    return msg["body"]["input"]["tr_id"], item
 
 
 data_map: dict = {}
@@ -646,28 +2836,309 @@ def add_data_map(
         data_map[tr_id]["iv"] = iv
 
 
+class WSDispatchQueue:
+    """
+    웹소켓 수신 루프와 on_result 호출을 분리하는 tr_id 별 대기열
+
+    수신 루프는 받은 메시지를 tr_id 별 대기열에 넣기만 하고, 복호화·변환과 on_result 호출은 작업자가
+    이벤트 루프 밖의 스레드에서 처리하므로 on_result 가 느려도 소켓 수신이 멈추지 않는다.
+    on_result 가 async 함수이면 변환은 스레드에서, on_result 코루틴은 이벤트 루프에서 실행한다.
+    같은 tr_id 의 메시지는 받은 순서대로 한번에 하나씩, 서로 다른 tr_id 는 작업자 수만큼 동시에 처리한다.
+
+    Args:
+        maxsize (int): tr_id 별 대기열 크기
+        overflow (str): 대기열이 가득 찼을 때 처리
+            "drop_oldest" : 가장 오래된 메시지를 버림
+            "conflate"    : 종목별 가장 최근 메시지만 남김 (대기 중인 같은 종목 메시지를 새 메시지로 교체,
+                            암호화된 체결통보는 교체하지 않음)
+            "block"       : 자리가 날 때까지 수신을 멈춤
+        workers (int): 작업자 수
+        threads (bool): False 이면 asyncio 태스크 작업자가 메시지마다 기본 스레드 풀(asyncio.to_thread)로 처리,
+                        True 이면 작업자마다 전용 스레드를 띄워 처리 (메시지가 많고 on_result 가 계속 바쁜 경우)
+
+    Example:
+        >>> dispatch = ka.WSDispatchQueue(maxsize=500, overflow="conflate", workers=4, threads=True)
+        >>> kws.start(on_result, dispatch=dispatch)
+        >>> dispatch.stats()
+    """
+
+    OVERFLOW_POLICIES = ("drop_oldest", "conflate", "block")
+
+    def __init__(self, maxsize: int = 1000, overflow: str = "drop_oldest", workers: int = 1, threads: bool = False):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {self.OVERFLOW_POLICIES}")
+        if maxsize < 1 or workers < 1:
+            raise ValueError("maxsize and workers must be positive")
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.workers = workers
+        self.threads = threads
+
+        self._cond = threading.Condition()
+        self._queues = {}  # tr_id: deque, conflate 는 OrderedDict(종목: 메시지)
+        self._ready = deque()  # 대기 중인 메시지가 있고 처리 중이 아닌 tr_id
+        self._scheduled = set()  # _ready 에 있거나 처리 중인 tr_id
+        self._seq = itertools.count()
+        self._closed = True
+        self._loop = None
+        self._event = None
+        self._space = None
+        self._runners = []
+
+        self.received = Counter()
+        self.dispatched = Counter()
+        self.dropped = Counter()
+        self.errors = Counter()
+        self.max_depth = Counter()
+
+    # 수신 루프에서 호출, key: 종목(conflate), 없으면 교체하지 않음
+    async def put(self, tr_id: str, key, item):
+        q = self._queues.get(tr_id)
+        if q is None:
+            q = self._queues[tr_id] = OrderedDict() if self.overflow == "conflate" else deque()
+
+        if self.overflow == "block":
+            while len(q) >= self.maxsize and not self._closed:
+                self._space.clear()
+                await self._space.wait()
+
+        with self._cond:
+            self.received[tr_id] += 1
+            if self.overflow == "conflate":
+                if key is None:
+                    key = next(self._seq)
+                if key in q:
+                    self.dropped[tr_id] += 1
+                elif len(q) >= self.maxsize:
+                    q.popitem(last=False)
+                    self.dropped[tr_id] += 1
+                q[key] = item
+            else:
+                if len(q) >= self.maxsize:
+                    q.popleft()
+                    self.dropped[tr_id] += 1
+                q.append(item)
+
+            if len(q) > self.max_depth[tr_id]:
+                self.max_depth[tr_id] = len(q)
+            if tr_id not in self._scheduled:
+                self._scheduled.add(tr_id)
+                self._ready.append(tr_id)
+                if self.threads:
+                    self._cond.notify()
+                else:
+                    self._event.set()
+
+    # 처리할 메시지 (tr_id, item), 없으면 None
+    def _take(self):
+        if len(self._ready) == 0:
+            return None
+        tr_id = self._ready.popleft()
+        q = self._queues[tr_id]
+        item = q.popitem(last=False)[1] if self.overflow == "conflate" else q.popleft()
+        return tr_id, item
+
+    def _done(self, tr_id: str):
+        self.dispatched[tr_id] += 1
+        if len(self._queues[tr_id]) > 0:
+            self._ready.append(tr_id)
+            if self.threads:
+                self._cond.notify()
+            else:
+                self._event.set()
+        else:
+            self._scheduled.discard(tr_id)
+
+    def _notifySpace(self):
+        if self.overflow != "block":
+            return
+        if self.threads:
+            if not self._closed:
+                self._loop.call_soon_threadsafe(self._space.set)
+        else:
+            self._space.set()
+
+    # handler 실행, handler 가 코루틴을 돌려주면(async on_result) 그대로 반환
+    def _handle(self, handler, tr_id, item):
+        try:
+            return handler(tr_id, item)
+        except Exception:
+            self.errors[tr_id] += 1
+            logging.exception("websocket dispatch failed (%s)", tr_id)
+            return None
+
+    async def _await(self, result, tr_id):
+        try:
+            await result
+        except Exception:
+            self.errors[tr_id] += 1
+            logging.exception("websocket dispatch failed (%s)", tr_id)
+
+    async def _taskWorker(self, handler):
+        import asyncio
+
+        while not self._closed:
+            taken = self._take()
+            if taken is None:
+                self._event.clear()
+                await self._event.wait()
+                continue
+            self._notifySpace()
+            # 변환, 동기 on_result 는 스레드에서 실행하여 수신 루프를 막지 않음
+            result = await asyncio.to_thread(self._handle, handler, *taken)
+            if inspect.isawaitable(result):
+                await self._await(result, taken[0])
+            self._done(taken[0])
+
+    def _threadWorker(self, handler):
+        while True:
+            with self._cond:
+                taken = self._take()
+                while taken is None and not self._closed:
+                    self._cond.wait()
+                    taken = self._take()
+                if taken is None:
+                    return
+            self._notifySpace()
+            result = self._handle(handler, *taken)
+            if inspect.isawaitable(result):  # async on_result 는 이벤트 루프에서 실행하고 끝날 때까지 대기 (종료시 취소)
+                import asyncio
+
+                future = asyncio.run_coroutine_threadsafe(self._await(result, taken[0]), self._loop)
+                while not future.done():
+                    if self._closed:
+                        future.cancel()
+                        break
+                    futures_wait([future], timeout=0.1)
+            with self._cond:
+                self._done(taken[0])
+
+    # 작업자 시작, handler(tr_id, item) 는 작업자에서 실행
+    def start(self, handler: Callable):
+        import asyncio
+
+        self._closed = False
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._space = asyncio.Event()
+        if self.threads:
+            self._runners = [
+                threading.Thread(target=self._threadWorker, args=(handler,), name=f"kis-ws-dispatch-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for thread in self._runners:
+                thread.start()
+        else:
+            self._runners = [asyncio.create_task(self._taskWorker(handler)) for _ in range(self.workers)]
+
+    # 작업자 종료, 남은 메시지는 버림
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._space is not None:
+            self._space.set()
+        for runner in self._runners:
+            if self.threads:
+                runner.join(timeout=5)
+            else:
+                runner.cancel()
+        self._runners = []
+
+    # tr_id 별 대기열 크기, 최대 크기, 받은/처리한/버린 메시지 수
+    def stats(self) -> dict:
+        return {
+            tr_id: {
+                "depth": len(q),
+                "max_depth": self.max_depth[tr_id],
+                "received": self.received[tr_id],
+                "dispatched": self.dispatched[tr_id],
+                "dropped": self.dropped[tr_id],
+                "errors": self.errors[tr_id],
+            }
+            for tr_id, q in list(self._queues.items())
+        }
+
+
 class KISWebSocket:
     api_url: str = ""
     on_result: Callable[
         [websockets.ClientConnection, str, pd.DataFrame, dict], None
     ] = None
     result_all_data: bool = False
+    result_type: str = "dataframe"
+    typed: bool = False
+    dispatch: WSDispatchQueue = None
 
     retry_count: int = 0
     amx_retries: int = 0
 
-    # init
-    def __init__(self, api_url: str, max_retries: int = 3):
+    # init, client 를 지정하면 해당 KISClient 의 환경(접속키, 도메인, 호출 한도)으로 실행
+    # subscriptions 를 지정하면 subscribe() 로 등록한 전역 open_map 대신 이 구독 목록(open_map 형식)을 사용
+    # 연결이 끊기면 backoff_base 초부터 두배씩(최대 backoff_max 초, 무작위 지연 포함) 기다려 재접속하고 구독을 다시 등록,
+    # max_retries: 연속 재접속 실패 허용 횟수 (None 이면 계속 재접속)
+    def __init__(self, api_url: str, max_retries: int = 3, client: KISClient = None, subscriptions: dict = None,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
         self.api_url = api_url
         self.max_retries = max_retries
+        self.client = client
+        self.subscriptions = subscriptions
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # 연결이 끊겨 수신하지 못한 구간 {"start", "end", "tr_ids": {tr_id: [종목, ...]}}, on_gap 으로도 전달
+        # 끊기 전 마지막 메시지부터 재접속 후 첫 메시지까지를 한 구간으로 기록 (재접속을 여러 번 시도해도 한 구간)
+        self.on_gap = None
+        self.gaps = deque(maxlen=1000)
+        self.reconnects = 0
+        self._approvalExpired = False
+        self._established = False  # 현재 연결에서 구독 등록 성공 응답 또는 실시간 데이터를 받았는지
+        self._awaitingFrame = False  # 현재 연결에서 아직 실시간 데이터를 받지 못함
+        self._gapStart = None  # 진행 중인 수신 중단 구간의 시작 (마지막 메시지 시각)
+
+        # 실행 중 구독 변경 (연결된 웹소켓, 이벤트 루프)
+        import asyncio
+
+        self._ws = None
+        self._loop = None
+        self._controlLock = asyncio.Lock()
+
+        # 연결 상태, 처리량
+        self.connected = False
+        self.messages = 0
+        self.records = 0
+        self.last_message_time = None
+        self.last_error = None
+        self._started_time = None
 
     # private
+    # 실시간 데이터 변환 후 on_result 호출 (dispatch 사용시 작업자에서 실행)
+    def __deliver(self, ws, tr_id: str, d: str, count: int):
+        dm = data_map[tr_id]
+        if d is None:  # 시스템 메시지 (result_all_data)
+            if self.result_type == "dataframe":
+                import pandas as pd
+
+                df = pd.DataFrame()
+            else:
+                df = []
+        else:
+            if dm.get("encrypt", None) == "Y":
+                d = aes_cbc_base64_dec(dm["key"], dm["iv"], d)
+            if self.result_type == "dataframe":
+                df = _frameToDataFrame(d, count, dm["columns"])
+            else:
+                df = _getTickDecoder(tr_id, dm["columns"], self.result_type, self.typed).decode(d, count)
+
+        if self.on_result is not None:
+            return self.on_result(ws, tr_id, df, dm)
+
     async def __subscriber(self, ws: websockets.ClientConnection):
+        dispatch = self.dispatch
+        conflate = dispatch is not None and dispatch.overflow == "conflate"
+
         async for raw in ws:
             logging.info("received message >> %s" % raw)
-            show_result = False
-
-            df = pd.DataFrame()
 
             if raw[0] in ["0", "1"]:
                 d1 = raw.split("|")
@@ -675,17 +3146,19 @@ class KISWebSocket:
                     raise ValueError("data not found...")
 
                 tr_id = d1[1]
+                count = int(d1[2])
+                self.messages += 1
+                self.records += count
+                self.last_message_time = time.time()
+                if self._awaitingFrame:
+                    self.__firstFrame()
 
-                dm = data_map[tr_id]
                 d = d1[3]
-                if dm.get("encrypt", None) == "Y":
-                    d = aes_cbc_base64_dec(dm["key"], dm["iv"], d)
-
-                df = pd.read_csv(
-                    StringIO(d), header=None, sep="^", names=dm["columns"], dtype=object
-                )
-
-                show_result = True
+                if dispatch is not None:  # 변환, on_result 는 작업자에서 처리
+                    key = d.split("^", 1)[0] if conflate and data_map[tr_id].get("encrypt", None) != "Y" else None
+                    await dispatch.put(tr_id, key, (ws, d, count))
+                else:
+                    self.__deliver(ws, tr_id, d, count)
 
             else:
                 rsp = system_resp(raw)
@@ -695,40 +3168,156 @@ class KISWebSocket:
                     tr_id=rsp.tr_id, encrypt=rsp.encrypt, key=rsp.ekey, iv=rsp.iv
                 )
 
+                if not rsp.isOk and rsp.tr_msg is not None and "approval" in rsp.tr_msg.lower():
+                    self._approvalExpired = True  # 접속키 재발급 후 재접속
+                    raise ConnectionError(rsp.tr_msg)
+                if rsp.isOk and not rsp.isUnSub and not self._established:  # 구독 등록 성공
+                    self.__established()
+
                 if rsp.isPingPong:
                     print(f"### RECV [PINGPONG] [{raw}]")
                     await ws.pong(raw)
                     print(f"### SEND [PINGPONG] [{raw}]")
 
                 if self.result_all_data:
-                    show_result = True
-
-            if show_result is True and self.on_result is not None:
-                self.on_result(ws, tr_id, df, data_map[tr_id])
+                    if dispatch is not None:
+                        await dispatch.put(tr_id, None, (ws, None, 0))
+                    else:
+                        self.__deliver(ws, tr_id, None, 0)
 
     async def __runner(self):
-        if len(open_map.keys()) > 40:
-            raise ValueError("Subscription's max is 40")
+        subscriptions = self.__subscriptionMap()
+        if _countSubscriptions(subscriptions) > _WS_MAX_SUBSCRIPTIONS:
+            raise ValueError(f"Subscription's max is {_WS_MAX_SUBSCRIPTIONS}")
+
+        import asyncio
 
         url = f"{getTREnv().my_url_ws}{self.api_url}"
 
-        while self.retry_count < self.max_retries:
+        self._started_time = time.time()
+        self._loop = asyncio.get_running_loop()
+        if self.dispatch is not None:
+            self.dispatch.start(lambda tr_id, item: self.__deliver(item[0], tr_id, item[1], item[2]))
+        try:
+            await self.__connectLoop(url)
+        finally:
+            if self.dispatch is not None:
+                self.dispatch.close()
+
+    async def __connectLoop(self, url: str):
+        import asyncio
+
+        # 웹 소켓 모듈을 선언한다.
+        import websockets
+
+        refresh = False
+        while self.max_retries is None or self.retry_count < self.max_retries:
+            if refresh:
+                await self.__refreshApproval()
+                refresh = False
+
+            self._established = False
+            self._awaitingFrame = True
             try:
                 async with websockets.connect(url) as ws:
-                    # request subscribe
-                    for name, obj in open_map.items():
-                        await self.send_multiple(
-                            ws, obj["func"], "1", obj["items"], obj["kwargs"]
-                        )
+                    self.connected = True
+                    # request subscribe, 암호화 TR 의 AES key, iv 는 등록 응답(system_resp)으로 다시 받음
+                    async with self._controlLock:
+                        for name, obj in list(self.__subscriptionMap().items()):
+                            await self.send_multiple(
+                                ws, obj["func"], "1", list(obj["items"]), obj["kwargs"]
+                            )
+                        self._ws = ws
 
                     # subscriber
                     await asyncio.gather(
                         self.__subscriber(ws),
                     )
+                raise ConnectionError("connection closed by server")
             except Exception as e:
                 print("Connection exception >> ", e)
+                self.last_error = repr(e)
+                if self._gapStart is None and self.last_message_time is not None:  # 수신 중단 구간 시작
+                    self._gapStart = datetime.fromtimestamp(self.last_message_time)
                 self.retry_count += 1
-                await asyncio.sleep(1)
+                # 접속 거부, 접속키 오류, 연속 실패시 접속키 재발급
+                if isinstance(e, websockets.InvalidHandshake) or self._approvalExpired \
+                        or self.retry_count >= 2:
+                    refresh = True
+                if self.max_retries is None or self.retry_count < self.max_retries:
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (self.retry_count - 1))
+                    await asyncio.sleep(random.uniform(delay / 2, delay))
+            finally:
+                self.connected = False
+                self._ws = None
+
+        logging.error("websocket reconnect failed %d times, giving up (%s)", self.retry_count, self.last_error)
+        print(f"Connection closed after {self.retry_count} retries >> {self.last_error}")
+        if self._gapStart is not None:
+            self.__reportGap(self._gapStart, None)
+            self._gapStart = None
+
+    # 구독 등록 성공 응답 또는 첫 실시간 데이터를 받으면 연결 성공으로 보고 재시도 횟수 초기화
+    def __established(self):
+        self._established = True
+        self.retry_count = 0
+
+    # 연결 후 첫 실시간 데이터, 수신 중단 구간이 있으면 여기서 끝남
+    def __firstFrame(self):
+        self._awaitingFrame = False
+        if not self._established:
+            self.__established()
+        if self._gapStart is not None:
+            self.reconnects += 1
+            self.__reportGap(self._gapStart, datetime.fromtimestamp(self.last_message_time))
+            self._gapStart = None
+
+    async def __refreshApproval(self):
+        import asyncio
+
+        try:
+            if self.client is not None:
+                await asyncio.to_thread(self.client.auth_ws)
+            else:
+                await asyncio.to_thread(_refreshApprovalKey)
+            self._approvalExpired = False
+        except Exception as e:
+            logging.warning("approval key refresh failed: %s", e)
+
+    # 수신하지 못한 구간 기록, end 가 None 이면 재접속 실패
+    def __reportGap(self, start: datetime, end: datetime | None):
+        tr_ids = {}
+        for obj in self.__subscriptionMap().values():
+            for item in obj["items"]:
+                tr_id, _ = _subscriptionKey(obj["func"], item, obj["kwargs"])
+                tr_ids.setdefault(tr_id, []).append(item)
+
+        gap = {"start": start, "end": end, "tr_ids": tr_ids}
+        self.gaps.append(gap)
+        if self.on_gap is not None:
+            try:
+                self.on_gap(gap)
+            except Exception:
+                logging.exception("on_gap failed")
+
+    # 연결 상태와 처리량
+    def stats(self) -> dict:
+        subscriptions = self.__subscriptionMap()
+        elapsed = time.time() - self._started_time if self._started_time is not None else 0
+        return {
+            "connected": self.connected,
+            "subscriptions": _countSubscriptions(subscriptions),
+            "messages": self.messages,
+            "records": self.records,
+            "msgs_per_sec": self.messages / elapsed if elapsed > 0 else 0.0,
+            "last_message_age": (
+                time.time() - self.last_message_time if self.last_message_time is not None else None
+            ),
+            "retries": self.retry_count,
+            "reconnects": self.reconnects,
+            "gaps": len(self.gaps),
+            "last_error": self.last_error,
+        }
 
     # func
     @classmethod
@@ -747,6 +3336,8 @@ class KISWebSocket:
 
         logging.info("send message >> %s" % json.dumps(msg))
 
+        if _useRateLimiter:
+            await _getRateLimiter().acquire_async(PRIORITY_QUOTE)  # 초당 호출 한도 대기
         await ws.send(json.dumps(msg))
         smart_sleep()
 
@@ -775,25 +3366,332 @@ class KISWebSocket:
     ):
         add_open_map(request.__name__, request, data, kwargs)
 
-    def unsubscribe(
+    async def unsubscribe(
             self,
             ws: websockets.ClientConnection,
             request: Callable[[str, str, ...], (dict, list[str])],
             data: list | str,
     ):
-        self.send_multiple(ws, request, "2", data)
+        await self.send_multiple(ws, request, "2", data)
+
+    # 실행 중인 세션의 구독 변경 (재접속 없이 등록/해제 요청, 접속 중이 아니면 다음 접속할 때 적용)
+    # 변경한 구독 목록은 재접속할 때도 그대로 다시 등록하며, 등록 후 구독 수가 40건을 넘으면 아무것도 바꾸지 않고 ValueError
+    # 다른 스레드에서는 run_threadsafe 로 실행 (ex. kws.run_threadsafe(kws.set_subscriptions(ccnl_krx, codes)).result())
+    async def add_subscriptions(
+            self,
+            request: Callable[[str, str, ...], (dict, list[str])],
+            data: list | str,
+            kwargs: dict = None,
+    ) -> dict:
+        return await self.__changeSubscriptions(request, kwargs, add=data)
+
+    async def remove_subscriptions(
+            self,
+            request: Callable[[str, str, ...], (dict, list[str])],
+            data: list | str,
+    ) -> dict:
+        return await self.__changeSubscriptions(request, None, remove=data)
+
+    # request 로 구독할 종목을 data 로 맞춤 (없는 종목은 해제, 새 종목은 등록)
+    async def set_subscriptions(
+            self,
+            request: Callable[[str, str, ...], (dict, list[str])],
+            data: list | str,
+            kwargs: dict = None,
+    ) -> dict:
+        desired = [data] if type(data) is str else list(data)
+        entry = self.__subscriptionMap().get(request.__name__)
+        current = entry["items"] if entry is not None else []
+        return await self.__changeSubscriptions(
+            request, kwargs, add=desired, remove=[d for d in current if d not in desired]
+        )
+
+    async def __changeSubscriptions(self, request: Callable, kwargs: dict, add=(), remove=()) -> dict:
+        add = [add] if type(add) is str else add
+        remove = [remove] if type(remove) is str else remove
+        async with self._controlLock:
+            subscriptions = self.__subscriptionMap()
+            name = request.__name__
+            entry = subscriptions.get(name)
+            current = entry["items"] if entry is not None else []
+            added = [d for d in dict.fromkeys(add) if d not in current]
+            removed = [d for d in dict.fromkeys(remove) if d in current]
+            if _countSubscriptions(subscriptions) - len(removed) + len(added) > _WS_MAX_SUBSCRIPTIONS:
+                raise ValueError(f"Subscription's max is {_WS_MAX_SUBSCRIPTIONS}")
+
+            if len(removed) > 0:
+                kwargs = entry["kwargs"]
+                entry["items"] = [d for d in entry["items"] if d not in removed]
+            if len(added) > 0:
+                add_open_map(name, request, added, kwargs, target=subscriptions)
+                kwargs = subscriptions[name]["kwargs"]
+
+            ws = self._ws
+            if ws is not None:
+                for d in removed:
+                    await self.send(ws, request, "2", d, kwargs)
+                for d in added:
+                    await self.send(ws, request, "1", d, kwargs)
+
+        return {
+            "added": [_subscriptionKey(request, d, kwargs) for d in added],
+            "removed": [_subscriptionKey(request, d, kwargs) for d in removed],
+        }
+
+    # 등록된 구독 (tr_id, 종목) 목록
+    def subscribed(self) -> list:
+        return [
+            _subscriptionKey(obj["func"], item, obj["kwargs"])
+            for obj in self.__subscriptionMap().values()
+            for item in obj["items"]
+        ]
+
+    # 추가로 구독할 수 있는 수
+    def free_slots(self) -> int:
+        return _WS_MAX_SUBSCRIPTIONS - _countSubscriptions(self.__subscriptionMap())
+
+    # 다른 스레드에서 세션의 이벤트 루프로 코루틴 실행, concurrent.futures.Future 반환
+    def run_threadsafe(self, coro) -> Future:
+        import asyncio
+
+        if self._loop is None or self._loop.is_closed():
+            coro.close()
+            raise RuntimeError("websocket session is not running")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def __subscriptionMap(self) -> dict:
+        return open_map if self.subscriptions is None else self.subscriptions
 
     # start
+    # result_type: "dataframe"(기본, 건당 한 행의 DataFrame), "tuple"(건당 값 튜플의 list),
+    #              "record"(건당 tr_id 별 레코드 객체의 list), typed=True 이면 숫자 컬럼을 int / float 로 변환
+    # dispatch: WSDispatchQueue 를 지정하면 수신 루프는 대기열에 넣기만 하고 변환, on_result 호출은 작업자에서 실행
+    # on_gap: 연결이 끊겨 수신하지 못한 구간 {"start", "end", "tr_ids": {tr_id: [종목]}} 을 전달 (REST 로 보충 조회할 때 사용)
     def start(
             self,
             on_result: Callable[
                 [websockets.ClientConnection, str, pd.DataFrame, dict], None
             ],
             result_all_data: bool = False,
+            result_type: str = "dataframe",
+            typed: bool = False,
+            dispatch: WSDispatchQueue = None,
+            on_gap: Callable[[dict], None] = None,
     ):
+        if result_type not in ("dataframe", "tuple", "record"):
+            raise ValueError(f"unknown result_type: {result_type}")
         self.on_result = on_result
         self.result_all_data = result_all_data
+        self.result_type = result_type
+        self.typed = typed
+        self.dispatch = dispatch
+        self.on_gap = on_gap
+        import asyncio
+
         try:
-            asyncio.run(self.__runner())
+            with self.__clientContext():
+                asyncio.run(self.__runner())
         except KeyboardInterrupt:
             print("Closing by KeyboardInterrupt")
+
+    # 이미 실행 중인 이벤트 루프에서 다른 비동기 작업(call_async 등)과 함께 실행할 때 사용
+    # ex) await asyncio.gather(kws.start_async(on_result), poll_quotes())
+    async def start_async(
+            self,
+            on_result: Callable[
+                [websockets.ClientConnection, str, pd.DataFrame, dict], None
+            ],
+            result_all_data: bool = False,
+            result_type: str = "dataframe",
+            typed: bool = False,
+            dispatch: WSDispatchQueue = None,
+            on_gap: Callable[[dict], None] = None,
+    ):
+        if result_type not in ("dataframe", "tuple", "record"):
+            raise ValueError(f"unknown result_type: {result_type}")
+        self.on_result = on_result
+        self.result_all_data = result_all_data
+        self.result_type = result_type
+        self.typed = typed
+        self.dispatch = dispatch
+        self.on_gap = on_gap
+        with self.__clientContext():
+            await self.__runner()
+
+    def __clientContext(self):
+        return self.client.activate() if self.client is not None else nullcontext()
+
+
+# tr_id 별 종목당 예상 초당 메시지 수, 구독을 세션에 나눌 때 사용 (없는 tr_id 는 1)
+_wsExpectedRates: dict = {}
+
+
+def set_ws_rate(tr_id: str, rate: float):
+    _wsExpectedRates[tr_id] = rate
+
+
+class KISWebSocketPool:
+    """
+    구독을 여러 웹소켓 세션에 나누어 세션당 구독 한도(40건)를 넘는 종목을 실시간 수신
+
+    접속키(앱키)마다 웹소켓 세션을 하나씩 열고, (tr_id, 종목) 구독은 세션별 예상 초당 메시지 수의 합이
+    고르게 되도록 나눈다. 모든 세션에서 받은 메시지는 받은 순서대로 하나의 대기열에 모아
+    on_result 를 한 곳에서 차례로 호출한다. 대기열이 가득 차면 가장 오래된 메시지를 버리고(dropped),
+    한 세션에서 오류가 나면 나머지 세션도 모두 종료한 뒤 오류를 전달한다.
+
+    Args:
+        api_url (str): 웹소켓 경로 (ex. "/tryitout")
+        clients (list[KISClient]): 세션별 클라이언트, 세션마다 해당 앱키로 접속키를 발급
+        sessions (int): clients 미지정시 세션 수 (auth_ws() 로 발급한 접속키를 함께 사용)
+        max_retries (int): 세션별 재접속 횟수
+        queue_size (int): 세션 공통 대기열 크기
+
+    Example:
+        >>> clients = [ka.KISClient("prod", appkey=k, appsecret=s) for k, s in app_keys]
+        >>> pool = ka.KISWebSocketPool("/tryitout", clients=clients)
+        >>> pool.subscribe(ccnl_krx, kospi200)
+        >>> pool.subscribe(asking_price_krx, kospi200, rate=3)
+        >>> pool.start(on_result)
+        >>> pool.stats()
+    """
+
+    def __init__(self, api_url: str, clients: list = None, sessions: int = 1, max_retries: int = 3,
+                 queue_size: int = 10000):
+        if queue_size < 1:
+            raise ValueError("queue_size must be positive")
+        self.api_url = api_url
+        self.clients = list(clients) if clients else [None] * sessions
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self.on_result = None
+        self.connections = []
+        self.dispatched = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self._expected_rates = []
+        self._entries = {}  # (tr_id, 종목): (함수명, 함수, 종목, kwargs, 예상 초당 메시지 수)
+        self._queue = None
+
+    # 구독 등록, rate: 종목당 예상 초당 메시지 수 (미지정시 set_ws_rate 로 지정한 값 또는 1)
+    def subscribe(
+            self,
+            request: Callable[[str, str, ...], (dict, list[str])],
+            data: list | str,
+            kwargs: dict = None,
+            rate: float = None,
+    ):
+        for item in [data] if type(data) is str else data:
+            tr_id, _ = _subscriptionKey(request, item, kwargs)
+            r = rate if rate is not None else _wsExpectedRates.get(tr_id, 1.0)
+            self._entries[(tr_id, item)] = (request.__name__, request, item, kwargs, r)
+
+    # 예상 초당 메시지 수가 큰 구독부터 부하가 가장 작은 세션에 배정
+    def _assign(self) -> list:
+        if len(self._entries) > _WS_MAX_SUBSCRIPTIONS * len(self.clients):
+            raise ValueError(
+                f"Subscription's max is {_WS_MAX_SUBSCRIPTIONS * len(self.clients)} for {len(self.clients)} sessions"
+            )
+
+        shards = [{"subscriptions": {}, "count": 0, "rate": 0.0} for _ in self.clients]
+        for name, request, item, kwargs, rate in sorted(self._entries.values(), key=lambda e: -e[4]):
+            shard = min((s for s in shards if s["count"] < _WS_MAX_SUBSCRIPTIONS), key=lambda s: s["rate"])
+            add_open_map(name, request, item, kwargs, target=shard["subscriptions"])
+            shard["count"] += 1
+            shard["rate"] += rate
+        return shards
+
+    def __enqueue(self, ws, tr_id, data, data_info):
+        if self._queue.full():  # on_result 가 수신을 따라가지 못하면 가장 오래된 메시지를 버림
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait((ws, tr_id, data, data_info))
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+
+    async def __dispatcher(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                break
+            try:
+                self.on_result(*item)
+            except Exception:
+                logging.exception("on_result failed")
+            self.dispatched += 1
+
+    async def start_async(
+            self,
+            on_result: Callable[
+                [websockets.ClientConnection, str, pd.DataFrame, dict], None
+            ],
+            result_all_data: bool = False,
+            result_type: str = "dataframe",
+            typed: bool = False,
+            on_gap: Callable[[dict], None] = None,
+    ):
+        import asyncio
+
+        self.on_result = on_result
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+
+        shards = self._assign()
+        # 접속키 발급(REST)은 이벤트 루프를 막지 않도록 스레드에서 동시에 실행
+        await asyncio.gather(*(
+            asyncio.to_thread(client.auth_ws)
+            for client in self.clients
+            if client is not None and "approval_key" not in client.headers_ws
+        ))
+        self.connections = [
+            KISWebSocket(self.api_url, self.max_retries, client, subscriptions=shard["subscriptions"])
+            for client, shard in zip(self.clients, shards)
+        ]
+        self._expected_rates = [shard["rate"] for shard in shards]
+
+        dispatcher = asyncio.create_task(self.__dispatcher())
+        sessions = [
+            asyncio.create_task(kws.start_async(self.__enqueue, result_all_data, result_type, typed, on_gap=on_gap))
+            for kws in self.connections
+        ]
+        try:
+            await asyncio.gather(*sessions)
+            await self._queue.put(None)  # 남은 메시지 처리 후 종료
+            await dispatcher
+        finally:
+            # 한 세션이 실패(또는 취소)하면 남은 세션과 dispatcher 도 종료
+            for task in sessions + [dispatcher]:
+                task.cancel()
+            await asyncio.gather(*sessions, dispatcher, return_exceptions=True)
+
+    def start(
+            self,
+            on_result: Callable[
+                [websockets.ClientConnection, str, pd.DataFrame, dict], None
+            ],
+            result_all_data: bool = False,
+            result_type: str = "dataframe",
+            typed: bool = False,
+            on_gap: Callable[[dict], None] = None,
+    ):
+        import asyncio
+
+        try:
+            asyncio.run(self.start_async(on_result, result_all_data, result_type, typed, on_gap))
+        except KeyboardInterrupt:
+            print("Closing by KeyboardInterrupt")
+
+    # 세션별 연결 상태, 처리량과 대기열 상태
+    def stats(self) -> dict:
+        connections = []
+        for i, kws in enumerate(self.connections):
+            st = kws.stats()
+            st["expected_rate"] = self._expected_rates[i]
+            st["appkey"] = kws.client.env.my_app[:6] + "..." if kws.client is not None else None
+            connections.append(st)
+        return {
+            "connections": connections,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "dispatched": self.dispatched,
+            "dropped": self.dropped,
+        }
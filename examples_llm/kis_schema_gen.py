@@ -0,0 +1,76 @@
+"""
+kis_schema.json 생성
+
+examples_llm/*/*/chk_*.py 의 COLUMN_MAPPING (컬럼명: 한글 설명) 으로 컬럼 타입을 추정하여
+tr_id 별 스키마 {tr_id: {컬럼명: 'int' / 'float' / 'date' / 'time'}} 를 만든다.
+tr_id 는 같은 폴더의 API 함수 파일에서 찾으며, 문자열로 둘 컬럼은 저장하지 않는다.
+ka.call(..., typed=True), ka.fetch_pages(..., typed=True) 에서 사용한다.
+
+사용법: python kis_schema_gen.py  (examples_llm, examples_user 의 kis_schema.json 갱신)
+"""
+
+import ast
+import glob
+import json
+import os
+import re
+import sys
+
+sys.path.extend(['.'])
+import kis_auth as ka
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUTPUTS = [
+    os.path.join(ROOT, "kis_schema.json"),
+    os.path.join(ROOT, "..", "examples_user", "kis_schema.json"),
+]
+
+TR_ID_PATTERN = re.compile(r'tr_id\s*=\s*"([A-Z0-9]+)"')
+
+
+def read_column_mapping(chk_path: str) -> dict:
+    """chk_*.py 에서 COLUMN_MAPPING 값을 읽음 (모듈을 import 하지 않고 구문 분석)"""
+    with open(chk_path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == "COLUMN_MAPPING" for target in node.targets
+        ):
+            return ast.literal_eval(node.value)
+    return {}
+
+
+def read_tr_ids(api_path: str) -> list:
+    """API 함수 파일에서 사용하는 tr_id 목록 (모의투자 TR 은 실전투자 TR 과 같은 스키마 사용)"""
+    with open(api_path, encoding="utf-8") as f:
+        return sorted(set(TR_ID_PATTERN.findall(f.read())))
+
+
+def main():
+    registry = {}
+    for chk_path in sorted(glob.glob(os.path.join(ROOT, "*", "*", "chk_*.py"))):
+        folder = os.path.dirname(chk_path)
+        api_path = os.path.join(folder, os.path.basename(folder) + ".py")
+        if not os.path.exists(api_path):
+            continue
+
+        columns = {}
+        for column, description in read_column_mapping(chk_path).items():
+            dtype = ka._inferDtype(column, description)
+            if dtype is not None:
+                columns[column] = dtype
+        if len(columns) == 0:
+            continue
+
+        for tr_id in read_tr_ids(api_path):
+            registry.setdefault(tr_id, {}).update(columns)
+
+    for path in OUTPUTS:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(registry, f, ensure_ascii=False, indent=1, sort_keys=True)
+            f.write("\n")
+    print(f"{len(registry)} TR, {sum(len(c) for c in registry.values())} columns")
+
+
+if __name__ == "__main__":
+    main()
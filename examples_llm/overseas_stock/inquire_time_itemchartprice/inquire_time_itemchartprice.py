@@ -6,6 +6,7 @@ Created on 2025-06-30
 
 import logging
 import time
+from datetime import datetime, timedelta
 from typing import Optional, Tuple
 import sys
 
@@ -59,8 +60,8 @@ def inquire_time_itemchartprice(
         dataframe1 (Optional[pd.DataFrame]): 누적 데이터프레임 (output1)
         dataframe2 (Optional[pd.DataFrame]): 누적 데이터프레임 (output2)
         tr_cont (str): 연속 거래 여부
-        depth (int): 현재 재귀 깊이
-        max_depth (int): 최대 재귀 깊이 (기본값: 10)
+        depth (int): 이미 조회한 페이지 수
+        max_depth (int): 최대 연속조회 횟수 (기본값: 10)
         
     Returns:
         Tuple[pd.DataFrame, pd.DataFrame]: 해외주식분봉조회 데이터
@@ -108,70 +109,28 @@ def inquire_time_itemchartprice(
         "KEYB": keyb,
     }
 
-    res = ka._url_fetch(API_URL, tr_id, tr_cont, params)
+    # 다음 조회 키 : 이전 조회 결과의 마지막 분봉 시간에서 분갭(nmin)만큼 이전 시간 (형식: YYYYMMDDHHMMSS)
+    def next_keyb(res) -> str:
+        rows = res.getBody().output2
+        if not rows:  # 분봉이 없으면 다음 조회 키를 만들 수 없으므로 연속조회 종료
+            return ka.END_OF_PAGES
+        last = rows[-1]
+        last_time = datetime.strptime(last["xymd"] + last["xhms"], "%Y%m%d%H%M%S")
+        return (last_time - timedelta(minutes=int(nmin))).strftime("%Y%m%d%H%M%S")
 
-    if res.isOK():
-        # Output1 처리
-        if hasattr(res.getBody(), 'output1'):
-            output_data = res.getBody().output1
-            if output_data:
-                if isinstance(output_data, list):
-                    current_data1 = pd.DataFrame(output_data)
-                else:
-                    current_data1 = pd.DataFrame([output_data])
-                
-                if dataframe1 is not None:
-                    dataframe1 = pd.concat([dataframe1, current_data1], ignore_index=True)
-                else:
-                    dataframe1 = current_data1
-            else:
-                if dataframe1 is None:
-                    dataframe1 = pd.DataFrame()
-        else:
-            if dataframe1 is None:
-                dataframe1 = pd.DataFrame()
-        
-        # Output2 처리
-        if hasattr(res.getBody(), 'output2'):
-            output_data = res.getBody().output2
-            if output_data:
-                if isinstance(output_data, list):
-                    current_data2 = pd.DataFrame(output_data)
-                else:
-                    current_data2 = pd.DataFrame([output_data])
-                
-                if dataframe2 is not None:
-                    dataframe2 = pd.concat([dataframe2, current_data2], ignore_index=True)
-                else:
-                    dataframe2 = current_data2
-            else:
-                if dataframe2 is None:
-                    dataframe2 = pd.DataFrame()
-        else:
-            if dataframe2 is None:
-                dataframe2 = pd.DataFrame()
-        
-        tr_cont = res.getHeader().tr_cont
-        
-        if tr_cont in ["M", "F"]:
-            logger.info("Calling next page...")
-            ka.smart_sleep()
-            return inquire_time_itemchartprice(
-                auth,
-                excd,
-                symb,
-                nmin,
-                pinc,
-                next,
-                nrec,
-                fill,
-                keyb,
-                "N", dataframe1, dataframe2, depth + 1, max_depth
-            )
-        else:
-            logger.info("Data fetch complete.")
-            return dataframe1, dataframe2
-    else:
-        logger.error("API call failed: %s - %s", res.getErrorCode(), res.getErrorMessage())
-        res.printError(API_URL)
-        return pd.DataFrame(), pd.DataFrame()
+    # 연속조회(tr_cont)는 ka.fetch_pages 에서 반복 호출하고, DataFrame 은 마지막에 한번만 생성
+    output1, output2 = ka.fetch_pages(
+        API_URL, tr_id, params,
+        outputs=("output1", "output2"),
+        cursor={"NEXT": lambda res: "1", "PINC": lambda res: "1", "KEYB": next_keyb},
+        tr_cont=tr_cont,
+        max_pages=max_depth - depth
+    )
+
+    # 누적 데이터프레임이 전달된 경우 앞에 이어 붙여서 반환
+    if dataframe1 is not None:
+        output1 = pd.concat([dataframe1, output1], ignore_index=True)
+    if dataframe2 is not None:
+        output2 = pd.concat([dataframe2, output2], ignore_index=True)
+
+    return output1, output2
@@ -0,0 +1,395 @@
+"""
+kis_auth.py REST / 웹소켓 주요 처리 경로 벤치마크
+
+kis_mock_server.py 의 로컬 모의 서버를 사용하므로 네트워크, 앱키 없이 실행할 수 있으며,
+저장된 기준값(kis_benchmark_baseline.json)과 비교하여 느려진 항목(회귀)을 알려준다.
+
+기계(CPU, 파이썬 버전)마다 절대 시간이 다르므로 회귀 판단은 상대값으로 한다.
+항목마다 바로 앞에서 같은 프로세스로 기준 작업(_reference, JSON 파싱과 문자열 분리)을 측정하고,
+시간은 기준 작업 시간으로 나눈 값, 처리량은 기준 작업 시간을 곱한 값(기준 작업 1회 동안 처리하는 양)을 비교한다.
+
+측정 항목
+- import_kis_auth : kis_auth import 시간 (ms), REST 경로에서 무거운 모듈을 import 하면 실패, IMPORT_BUDGET_MS 를 넘으면 경고
+- url_fetch_roundtrip : _url_fetch 1회 왕복 시간 (us)
+- url_fetch_overhead : _url_fetch 왕복 시간에서 같은 요청을 requests.Session 으로 보낸 시간을 뺀 kis_auth 처리 비용 (us)
+- apiresp_construct : 응답 1건(레코드 20건)으로 APIResp 를 만드는 시간 (us)
+- pagination_pages_per_sec : inquire_balance 연속조회(20페이지) 처리량 (페이지/초)
+- ws_h0stcnt0_msgs_per_sec, ws_h0stasp0_msgs_per_sec : KISWebSocket 수신 처리(__subscriber) 처리량 (메시지/초)
+- ws_h0stcnt0_burst10_records_per_sec : 한 메시지에 10건씩 담긴 체결가 메시지의 수신 처리량 (건/초)
+- aes_decrypt_records_per_sec : 체결통보(ccnl_notice) AES256 복호화 처리량 (건/초)
+
+각 항목은 여러 번 측정하여 가장 좋은 값(시간은 최소, 처리량은 최대)을 사용한다.
+웹소켓 항목은 미리 만들어 둔 메시지를 수신 처리 함수에 직접 넣어 네트워크와 서버 비용을 제외한 클라이언트 처리 비용만 측정한다.
+*_functions.py 가 설정하는 INFO 로그(메시지마다 출력)는 측정 중에는 출력하지 않는다.
+
+사용법:
+    python kis_benchmark.py                   # 측정 후 기준값과 상대값 비교 (회귀가 있으면 종료 코드 1)
+    python kis_benchmark.py --save-baseline   # 측정 결과를 기준값으로 저장 (릴리스마다 갱신)
+    python kis_benchmark.py --only ws_ --tolerance 0.3 --quick
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.extend([ROOT, os.path.join(ROOT, "domestic_stock")])
+
+import kis_auth as ka
+from kis_mock_server import MockKISServer, TickGenerator, _aes_encrypt, connect_kis_auth
+
+BASELINE_PATH = os.path.join(ROOT, "kis_benchmark_baseline.json")
+IMPORT_BUDGET_MS = 200  # kis_auth import 시간 한도 (기계마다 다르므로 넘으면 경고만 출력)
+HEAVY_MODULES = ("pandas", "websockets", "Crypto", "yaml")  # REST 전용 import 시 불러오지 않아야 하는 모듈
+PRICE_URL = "/uapi/domestic-stock/v1/quotations/inquire-price"
+PRICE_PARAMS = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+
+BENCHMARKS = {}  # 이름: (함수, 단위, 값이 클수록 좋은지, 회귀로 보는 최소 변화량)
+
+
+# min_change : 기준값이 0 에 가까운 항목이 측정 오차로 회귀 판정되지 않도록 하는 절대 변화량 (측정 단위)
+def benchmark(name: str, unit: str, higher_is_better: bool = False, min_change: float = 0.0):
+    def register(func):
+        BENCHMARKS[name] = (func, unit, higher_is_better, min_change)
+        return func
+
+    return register
+
+
+# func() 을 rounds 번 측정한 값 목록
+# timeit 과 같이 측정 중에는 GC 를 멈추고, 첫 실행(namedtuple 타입 생성, 커넥션 연결 등)은 측정하지 않는다.
+def _measure(func, rounds: int) -> list:
+    func()
+    gc.collect()
+    gc.disable()
+    try:
+        return [func() for _ in range(rounds)]
+    finally:
+        gc.enable()
+
+
+# 최소값 (부하 등 외부 요인으로 느려진 측정은 제외)
+def _best(func, rounds: int) -> float:
+    return min(_measure(func, rounds))
+
+
+# 처리량(클수록 좋은 값)은 최대값
+def _bestRate(func, rounds: int) -> float:
+    return max(_measure(func, rounds))
+
+
+# 기준 작업 1회 시간 (us) : 응답 20건 JSON 파싱과 실시간 메시지 분리, 측정값을 상대값으로 바꿀 때 사용
+_REFERENCE_PAYLOAD = json.dumps({"output": [{f"field{i}": str(i * 1000) for i in range(30)} for _ in range(20)]})
+_REFERENCE_RECORD = "^".join(str(i * 100) for i in range(46))
+
+
+def _reference(rounds: int) -> float:
+    def once():
+        started = time.perf_counter()
+        for _ in range(200):
+            json.loads(_REFERENCE_PAYLOAD)
+            _REFERENCE_RECORD.split("^")
+        return (time.perf_counter() - started) / 200 * 1e6
+
+    return _best(once, rounds)
+
+
+# 기준 작업 시간(us) 기준의 상대값 (시간은 기준 작업 몇 회분인지, 처리량은 기준 작업 1회 동안 처리하는 양)
+def relative(name: str, value: float, reference_us: float) -> float:
+    func, unit, higher_is_better, min_change = BENCHMARKS[name]
+    return value * reference_us / 1e6 if higher_is_better else value / reference_us
+
+
+@benchmark("import_kis_auth", "ms")
+def bench_import(server, rounds: int) -> float:
+    code = (
+        "import sys, time; t = time.perf_counter(); import kis_auth; "
+        "print(time.perf_counter() - t); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+
+    def once():
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        elapsed, heavy = out.stdout.strip().split("\n") if "\n" in out.stdout.strip() else (out.stdout.strip(), "")
+        if heavy:
+            raise RuntimeError(f"import kis_auth loaded heavy modules: {heavy}")
+        return float(elapsed) * 1000
+
+    return _best(once, rounds)
+
+
+def _timeCalls(func, count: int) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        func()
+    return (time.perf_counter() - started) / count * 1e6
+
+
+@benchmark("url_fetch_roundtrip", "us")
+def bench_url_fetch(server, rounds: int) -> float:
+    return _best(lambda: _timeCalls(lambda: ka._url_fetch(PRICE_URL, "FHKST01010100", "", PRICE_PARAMS), 300), rounds)
+
+
+# 같은 요청을 requests.Session 과 _url_fetch 로 번갈아 보내고, 호출 쌍별 차이의 중앙값 (서버 응답 시간의 흔들림 상쇄)
+@benchmark("url_fetch_overhead", "us", min_change=50)
+def bench_url_fetch_overhead(server, rounds: int) -> float:
+    session = ka._getSession()
+    url = f"{server.rest_url}{PRICE_URL}"
+    headers = dict(ka._getHeaderTemplates().get("FHKST01010100"), tr_cont="")
+
+    def once():
+        differences = []
+        for _ in range(300):
+            started = time.perf_counter()
+            session.get(url, headers=headers, params=PRICE_PARAMS).json()
+            raw = time.perf_counter() - started
+            started = time.perf_counter()
+            ka._url_fetch(PRICE_URL, "FHKST01010100", "", PRICE_PARAMS)
+            differences.append((time.perf_counter() - started - raw) * 1e6)
+        return statistics.median(differences)
+
+    return _best(once, rounds)
+
+
+@benchmark("apiresp_construct", "us")
+def bench_apiresp(server, rounds: int) -> float:
+    body = server._synthetic_body("FHKST03010100", PRICE_PARAMS)
+    res = ka._buildResponse(
+        200, {"Content-Type": "application/json", "tr_id": "FHKST03010100", "tr_cont": "D"},
+        json.dumps(body).encode("utf-8"),
+    )
+    return _best(lambda: _timeCalls(lambda: ka.APIResp(res), 2000), rounds)
+
+
+@benchmark("pagination_pages_per_sec", "pages/s", higher_is_better=True)
+def bench_pagination(server, rounds: int) -> float:
+    from domestic_stock_functions import inquire_balance
+
+    pages = 20
+    bodies = []
+    for _ in range(pages):
+        body = server._synthetic_body("TTTC8434R", {})
+        body.update(ctx_area_fk100="", ctx_area_nk100="")
+        bodies.append(body)
+    server.add_fixture("TTTC8434R", bodies)
+
+    def once():
+        started = time.perf_counter()
+        df1, df2 = inquire_balance(
+            env_dv="real", cano="00000000", acnt_prdt_cd="01", afhr_flpr_yn="N", inqr_dvsn="01", unpr_dvsn="01",
+            fund_sttl_icld_yn="N", fncg_amt_auto_rdpt_yn="N", prcs_dvsn="00", max_depth=pages,
+        )
+        if len(df2) != pages * server.page_rows:
+            raise RuntimeError(f"unexpected row count {len(df2)}")
+        return pages / (time.perf_counter() - started)
+
+    return _bestRate(once, rounds)
+
+
+class _FrameSource:
+    """미리 만든 메시지를 차례로 돌려주는 웹소켓 연결 대용 (async for 로 수신)"""
+
+    def __init__(self, frames: list):
+        self._frames = frames
+
+    async def __aiter__(self):
+        for frame in self._frames:
+            yield frame
+
+    async def pong(self, data):
+        pass
+
+
+# 수신 처리량 (건/초), records_per_frame 건씩 담은 메시지 count 개를 처리
+def _subscriberThroughput(server, request, tr_id: str, rounds: int, count: int = 2000, records_per_frame: int = 1,
+                          result_type: str = "dataframe", typed: bool = False) -> float:
+    msg, columns = request("1", "005930")
+    ka.add_data_map(tr_id=tr_id, columns=columns)
+    generator = TickGenerator(seed=1)
+    frames = [
+        f"0|{tr_id}|{records_per_frame:03d}|"
+        + "^".join("^".join(generator.record(columns, "005930")) for _ in range(records_per_frame))
+        for _ in range(count)
+    ]
+
+    kws = ka.KISWebSocket(api_url="/tryitout")
+    kws.on_result = lambda ws, tr_id, df, data_info: None
+    kws.result_type = result_type
+    kws.typed = typed
+
+    def once():
+        started = time.perf_counter()
+        asyncio.run(kws._KISWebSocket__subscriber(_FrameSource(frames)))
+        return count * records_per_frame / (time.perf_counter() - started)
+
+    return _bestRate(once, rounds)
+
+
+@benchmark("ws_h0stcnt0_msgs_per_sec", "msgs/s", higher_is_better=True)
+def bench_ws_ccnl(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import ccnl_krx
+
+    return _subscriberThroughput(server, ccnl_krx, "H0STCNT0", rounds)
+
+
+@benchmark("ws_h0stasp0_msgs_per_sec", "msgs/s", higher_is_better=True)
+def bench_ws_asking_price(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import asking_price_krx
+
+    return _subscriberThroughput(server, asking_price_krx, "H0STASP0", rounds)
+
+
+@benchmark("ws_h0stcnt0_burst10_records_per_sec", "records/s", higher_is_better=True)
+def bench_ws_burst(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import ccnl_krx
+
+    return _subscriberThroughput(server, ccnl_krx, "H0STCNT0", rounds, count=500, records_per_frame=10)
+
+
+@benchmark("ws_h0stcnt0_tuple_msgs_per_sec", "msgs/s", higher_is_better=True)
+def bench_ws_tuple(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import ccnl_krx
+
+    return _subscriberThroughput(server, ccnl_krx, "H0STCNT0", rounds, result_type="tuple")
+
+
+@benchmark("ws_h0stcnt0_record_typed_msgs_per_sec", "msgs/s", higher_is_better=True)
+def bench_ws_record_typed(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import ccnl_krx
+
+    return _subscriberThroughput(server, ccnl_krx, "H0STCNT0", rounds, result_type="record", typed=True)
+
+
+@benchmark("ws_h0stcnt0_burst10_tuple_records_per_sec", "records/s", higher_is_better=True)
+def bench_ws_burst_tuple(server, rounds: int) -> float:
+    from domestic_stock_functions_ws import ccnl_krx
+
+    return _subscriberThroughput(server, ccnl_krx, "H0STCNT0", rounds, count=500, records_per_frame=10,
+                                 result_type="tuple")
+
+
+@benchmark("aes_decrypt_records_per_sec", "records/s", higher_is_better=True)
+def bench_aes(server, rounds: int, count: int = 5000) -> float:
+    from domestic_stock_functions_ws import ccnl_notice
+
+    msg, columns = ccnl_notice("1", "mockuser")
+    key, iv = "k" * 32, "i" * 16
+    generator = TickGenerator(seed=1)
+    ciphers = [_aes_encrypt(key, iv, "^".join(generator.record(columns, "005930"))) for _ in range(count)]
+
+    def once():
+        started = time.perf_counter()
+        for cipher in ciphers:
+            ka.aes_cbc_base64_dec(key, iv, cipher)
+        return count / (time.perf_counter() - started)
+
+    return _bestRate(once, rounds)
+
+
+def run(only: str = None, quick: bool = False) -> dict:
+    """
+    벤치마크 실행
+
+    Args:
+        only (str): 이름이 이 값으로 시작하는 항목만 실행
+        quick (bool): 반복 횟수를 줄여 빠르게 실행 (결과 편차가 커짐)
+
+    Returns:
+        dict: {이름: (측정값, 바로 앞에서 측정한 기준 작업 시간(us))}
+    """
+    rounds = 2 if quick else 5
+    results = {}
+    logging.disable(logging.INFO)
+    with MockKISServer(page_rows=20, seed=1) as server:
+        connect_kis_auth(ka, server)
+        ka.set_rate_limit("prod", 1e9)  # 호출 한도 대기 제외
+        ka.auth()
+        # 합성 응답 생성 비용이 왕복 시간에 포함되지 않도록 시세 조회 응답을 고정
+        price = server._synthetic_body("FHKST01010100", PRICE_PARAMS)
+        server.add_fixture("FHKST01010100", {key: price[key] for key in ("rt_cd", "msg_cd", "msg1", "output")})
+        for name, (func, unit, higher_is_better, min_change) in BENCHMARKS.items():
+            if only is not None and not name.startswith(only):
+                continue
+            reference_us = _reference(rounds)
+            value = func(server, rounds)
+            results[name] = (value, reference_us)
+            print(f"{name:42s} {value:14.1f} {unit:10s} (relative {relative(name, value, reference_us):.4g})")
+    logging.disable(logging.NOTSET)
+    return results
+
+
+def _machine() -> str:
+    return f"{platform.python_implementation()} {platform.python_version()} / {platform.system()} {platform.machine()}"
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    기준값 대비 상대값이 tolerance(비율) 이상 느려진 항목 목록 [(이름, 상대값, 기준 상대값)]
+
+    min_change 는 측정 단위이므로 이번 실행의 기준 작업 시간으로 상대값 단위로 바꾸어 적용한다.
+    """
+    regressions = []
+    for name, (value, reference_us) in results.items():
+        func, unit, higher_is_better, min_change = BENCHMARKS[name]
+        base = baseline.get("relative", {}).get(name)
+        if base is None:
+            continue
+        current = relative(name, value, reference_us)
+        change = base - current if higher_is_better else current - base
+        if change > abs(base) * tolerance and change > relative(name, min_change, reference_us):
+            regressions.append((name, current, base))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="kis_auth 벤치마크")
+    parser.add_argument("--only", help="이름이 이 값으로 시작하는 항목만 실행")
+    parser.add_argument("--quick", action="store_true", help="반복 횟수를 줄여 빠르게 실행")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="회귀로 판단할 변화 비율 (기본 0.25)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="기준값 파일")
+    parser.add_argument("--save-baseline", action="store_true", help="측정 결과를 기준값으로 저장")
+    args = parser.parse_args()
+
+    results = run(args.only, args.quick)
+
+    import_ms = results.get("import_kis_auth", (0.0, 0.0))[0]
+    if import_ms > IMPORT_BUDGET_MS:
+        print(f"warning: import kis_auth took {import_ms:.1f}ms (budget {IMPORT_BUDGET_MS}ms)")
+
+    if args.save_baseline:
+        baseline = {"machine": _machine(), "relative": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline["relative"] = json.load(f).get("relative", {})
+        baseline["relative"].update({
+            name: float(f"{relative(name, value, reference_us):.4g}") for name, (value, reference_us) in results.items()
+        })
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved : {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("baseline not found, run with --save-baseline first")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for name, value, base in regressions:
+        print(f"REGRESSION {name}: relative {value:.4g} (baseline {base:.4g}, {baseline.get('machine')})")
+    if len(regressions) > 0:
+        sys.exit(1)
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,658 @@
+"""
+KIS Open API 모의 서버 (부하 테스트, 벤치마크용)
+
+실전/모의투자 도메인 대신 로컬에서 REST / 웹소켓 API 를 흉내내어, 네트워크 없이 kis_auth.py 와
+*_functions.py / *_functions_ws.py 를 그대로 실행하고 처리량을 측정할 수 있도록 한다.
+
+REST
+- /oauth2/tokenP, /oauth2/Approval, /oauth2/revokeP, /uapi/hashkey : 접근토큰, 웹소켓 접속키, 해시키 발급
+- 그 외 경로 : 요청 header 의 tr_id 로 응답을 찾는다.
+    - 녹화된 응답(fixture)이 있으면 그대로, 없으면 kis_schema.json 의 컬럼으로 만든 합성 응답을 보낸다.
+    - 여러 페이지 응답은 header tr_cont (M: 다음 페이지 있음, D: 마지막)와 body 의 ctx_area_* 연속조회 키로 전달한다.
+    - 앱키별 초당 호출 한도를 넘으면 실제 서버처럼 HTTP 500 과 EGW00201(초당 거래건수 초과) 오류를 보낸다.
+    - 재시도 테스트용으로 다음 n 건을 일시 오류(fail_requests)로 응답하거나, 응답을 늦출(rest_delay) 수 있다.
+
+웹소켓
+- 구독 등록(tr_type "1") / 해제("2") 요청에 SUBSCRIBE SUCCESS / UNSUBSCRIBE SUCCESS 시스템 메시지와 AES key, iv 로 응답
+- 구독한 종목마다 "0|tr_id|건수|값^값^..." 형식의 실시간 데이터를 보내며, 한 메시지에 여러 건(records_per_frame)을 담을 수 있다.
+- 체결통보(tr_id 가 CNI0 / CNI9 로 끝나는 TR)는 실제와 같이 AES256-CBC 로 암호화하여 "1|..." 로 보낸다.
+- 주기적으로 PINGPONG 시스템 메시지를 보낸다.
+- 재접속 테스트용으로 모든 세션을 강제로 끊거나(drop_ws_connections), 발급한 접속키를 만료(expire_approval_keys)시킬 수 있다.
+- 실시간 데이터는 녹화된 레코드(fixture)를 반복 재생하거나, *_functions_ws.py 의 컬럼 정보로 합성한 틱을 사용한다.
+
+Fixture 폴더 (선택)
+- <tr_id>.json : 응답 body (dict) 또는 페이지별 응답 body 목록 (list)
+  ex) json.dump([res.getResponse().json() for res in ka.paginate(...)], f)
+- <tr_id>.ws : 실시간 데이터 레코드 (한 줄에 한 건, '^' 로 구분된 평문 값)
+
+사용법:
+    python kis_mock_server.py --rest-port 18080 --ws-port 18081 --fixtures ./fixtures
+
+    >>> import kis_auth as ka
+    >>> from kis_mock_server import MockKISServer, connect_kis_auth
+    >>> with MockKISServer(rate_limit=20) as server:
+    ...     connect_kis_auth(ka, server)
+    ...     ka.auth()
+    ...     df = inquire_price("real", "J", "005930")
+"""
+
+import argparse
+import ast
+import base64
+import glob
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import kis_auth as ka
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 실시간 체결통보 TR (H0STCNI0, H0STCNI9, H0IFCNI0 등), 데이터를 AES256 으로 암호화하여 보낸다.
+ENCRYPTED_TR_PATTERN = re.compile(r"CNI\d$")
+MAX_SUBSCRIPTIONS = 41  # 웹소켓 세션당 최대 구독 수
+CURSOR_PREFIX = "MOCK"  # 모의 서버가 발급하는 연속조회 키 (MOCK + 페이지 번호)
+
+# kis_devlp.yaml 이 없는 환경(CI 등)에서 사용할 설정값
+MOCK_CONFIG = {
+    "my_app": "MOCKAPPKEY",
+    "my_sec": "MOCKAPPSECRET",
+    "paper_app": "MOCKPAPERAPPKEY",
+    "paper_sec": "MOCKPAPERAPPSECRET",
+    "my_htsid": "mockuser",
+    "my_acct_stock": "00000000",
+    "my_acct_future": "00000000",
+    "my_paper_stock": "00000000",
+    "my_paper_future": "00000000",
+    "my_prod": "01",
+    "my_agent": "kis-mock-client",
+}
+
+# 합성 REST 응답에 사용할 기본 컬럼 (kis_schema.json 에 없는 TR)
+DEFAULT_COLUMNS = ("stck_bsop_date", "stck_prpr", "prdy_vrss", "prdy_ctrt", "acml_vol", "acml_tr_pbmn")
+
+
+def load_ws_columns(root: str = ROOT) -> dict:
+    """
+    *_functions_ws.py 에서 TR 별 실시간 데이터 컬럼 목록을 읽음 (모듈을 import 하지 않고 구문 분석)
+
+    Args:
+        root (str): examples_user 또는 examples_llm 폴더
+
+    Returns:
+        dict: {tr_id: [컬럼명, ...]}
+    """
+    columns_by_tr = {}
+    for path in sorted(glob.glob(os.path.join(root, "*", "*_functions_ws.py"))):
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for func in tree.body:
+            if not isinstance(func, ast.FunctionDef):
+                continue
+            tr_ids, columns = [], None
+            for node in ast.walk(func):
+                if not isinstance(node, ast.Assign) or not isinstance(node.targets[0], ast.Name):
+                    continue
+                name = node.targets[0].id
+                if name == "tr_id" and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                    tr_ids.append(node.value.value)
+                elif name == "columns" and isinstance(node.value, ast.List):
+                    columns = ast.literal_eval(node.value)
+            if columns is not None:
+                for tr_id in tr_ids:
+                    columns_by_tr.setdefault(tr_id, columns)
+    return columns_by_tr
+
+
+def _aes_encrypt(key: str, iv: str, text: str) -> str:
+    # pip install pycryptodome
+    from Crypto.Cipher import AES
+    from Crypto.Util.Padding import pad
+
+    cipher = AES.new(key.encode("utf-8"), AES.MODE_CBC, iv.encode("utf-8"))
+    return base64.b64encode(cipher.encrypt(pad(text.encode("utf-8"), AES.block_size))).decode("ascii")
+
+
+def _random_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789") for _ in range(length))
+
+
+class TickGenerator:
+    """
+    컬럼명으로 값의 종류(가격, 수량, 비율, 일자, 시간, 종목코드)를 추정하여 합성 레코드를 만드는 생성기
+
+    가격은 종목별로 기준가에서 호가 단위만큼 무작위로 움직이고, 시간은 레코드마다 1초씩 증가한다.
+    값의 종류는 TR 별로 한번만 계산하여 레코드 생성 비용을 줄인다.
+
+    Args:
+        seed (int): 난수 시드 (같은 시드면 같은 데이터)
+    """
+
+    def __init__(self, seed: int = None):
+        self._rng = random.Random(seed)
+        self._kinds = {}  # 컬럼 목록(tuple): 값 종류 목록
+        self._prices = {}  # 종목코드: 현재가
+        self._seq = 0
+
+    @staticmethod
+    def _kind(column: str) -> str:
+        name = column.lower()
+        if name.endswith("iscd") or name in ("pdno", "symb", "rsym"):
+            return "code"
+        dtype = ka._inferDtype(name)
+        if dtype == "int" and name.split("_")[-1].rstrip("0123456789") in (
+                "prpr", "prc", "pric", "oprc", "hgpr", "lwpr", "clpr", "mxpr", "llam", "sdpr", "sspr", "askp", "bidp",
+                "unpr"):
+            return "price"
+        return dtype or "text"
+
+    def record(self, columns: list, key: str) -> list:
+        """columns 순서대로의 값 목록 (key: 종목코드)"""
+        kinds = self._kinds.get(tuple(columns))
+        if kinds is None:
+            kinds = [self._kind(column) for column in columns]
+            self._kinds[tuple(columns)] = kinds
+
+        rng = self._rng
+        price = self._prices.get(key) or rng.randrange(10000, 100000, 100)
+        price = max(100, price + rng.choice((-100, 0, 0, 100)))
+        self._prices[key] = price
+        self._seq += 1
+        at = datetime(2000, 1, 1, 9) + timedelta(seconds=self._seq % 23400)
+
+        values = []
+        for kind in kinds:
+            if kind == "price":
+                values.append(str(price + rng.randrange(-5, 6) * 100))
+            elif kind == "int":
+                values.append(str(rng.randrange(1, 100000)))
+            elif kind == "float":
+                values.append(f"{rng.uniform(-5, 5):.2f}")
+            elif kind == "date":
+                values.append(datetime.now().strftime("%Y%m%d"))
+            elif kind == "time":
+                values.append(at.strftime("%H%M%S"))
+            elif kind == "code":
+                values.append(key)
+            else:
+                values.append("0")
+        return values
+
+
+class _RateWindow:
+    """앱키별 최근 1초 호출 수 (초과시 EGW00201)"""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def allow(self, appkey: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            calls = self._calls.setdefault(appkey, deque())
+            while calls and now - calls[0] >= 1.0:
+                calls.popleft()
+            if len(calls) >= self.rate:
+                return False
+            calls.append(now)
+            return True
+
+
+class MockKISServer:
+    """
+    KIS Open API REST / 웹소켓 모의 서버
+
+    Args:
+        host (str): 접속 주소
+        rest_port (int): REST 포트 (0 이면 빈 포트 사용)
+        ws_port (int): 웹소켓 포트 (0 이면 빈 포트 사용)
+        fixtures (str): 녹화된 응답 폴더 (모듈 설명 참고)
+        rate_limit (int): 앱키별 초당 호출 한도, None 이면 제한 없음
+        pages (int): 합성 응답의 페이지 수 (연속조회 테스트용)
+        page_rows (int): 합성 응답의 페이지당 레코드 수
+        tick_interval (float): 구독 종목별 실시간 데이터 전송 간격(초), 0 이면 가능한 빨리 전송
+        tick_limit (int): 구독 종목별 최대 전송 메시지 수, None 이면 구독 해제까지 계속 전송
+        records_per_frame (int): 실시간 메시지 하나에 담을 레코드 수
+        ping_interval (float): PINGPONG 전송 간격(초)
+        seed (int): 합성 데이터 난수 시드
+        rest_delay (float): tr_id 요청의 응답 지연(초), 동시 요청(병합, 우선순위) 테스트용
+
+    Example:
+        >>> server = MockKISServer(pages=3, tick_interval=0.01).start()
+        >>> server.rest_url, server.ws_url
+        ('http://127.0.0.1:50123', 'ws://127.0.0.1:50124')
+        >>> server.stop()
+    """
+
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            rest_port: int = 0,
+            ws_port: int = 0,
+            fixtures: str = None,
+            rate_limit: int = None,
+            pages: int = 1,
+            page_rows: int = 20,
+            tick_interval: float = 0.1,
+            tick_limit: int = None,
+            records_per_frame: int = 1,
+            ping_interval: float = 30.0,
+            seed: int = None,
+            rest_delay: float = 0.0,
+    ):
+        self.host = host
+        self.rest_port = rest_port
+        self.ws_port = ws_port
+        self.rate_limit = rate_limit
+        self.pages = pages
+        self.page_rows = page_rows
+        self.tick_interval = tick_interval
+        self.tick_limit = tick_limit
+        self.records_per_frame = records_per_frame
+        self.ping_interval = ping_interval
+        self.rest_delay = rest_delay
+        self.stats = Counter()
+
+        self._seed = seed
+        self._generator = TickGenerator(seed)
+        self._rate = _RateWindow(rate_limit) if rate_limit is not None else None
+        self._fixtures = {}  # tr_id: [body, ...]
+        self._ws_fixtures = {}  # tr_id: [[값, ...], ...]
+        self._ws_columns = None
+        self._http = None
+        self._loop = None
+        self._ws_server = None
+        self._ws_sessions = set()
+        self._expired_approval_keys = set()
+        self._approval_keys = set()
+        self._failures = []  # 다음 tr_id 요청들에 보낼 (HTTP 상태코드, msg_cd) 오류
+        self._threads = []
+        self._lock = threading.Lock()
+
+        if fixtures is not None:
+            self.load_fixtures(fixtures)
+
+    @property
+    def rest_url(self) -> str:
+        return f"http://{self.host}:{self.rest_port}"
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.ws_port}"
+
+    ########### fixture
+
+    def load_fixtures(self, path: str):
+        for file_path in sorted(glob.glob(os.path.join(path, "*.json"))):
+            with open(file_path, encoding="utf-8") as f:
+                self.add_fixture(os.path.basename(file_path)[:-5], json.load(f))
+        for file_path in sorted(glob.glob(os.path.join(path, "*.ws"))):
+            with open(file_path, encoding="utf-8") as f:
+                self.add_ws_fixture(os.path.basename(file_path)[:-3], [line.rstrip("\n") for line in f if line.strip()])
+
+    # REST 응답 등록 (body: 응답 body 또는 페이지별 응답 body 목록)
+    def add_fixture(self, tr_id: str, body: dict | list):
+        self._fixtures[tr_id] = body if isinstance(body, list) else [body]
+
+    # 실시간 데이터 레코드 등록 (records: '^' 로 구분된 문자열 또는 값 목록), 구독 종목별로 처음부터 반복 재생
+    def add_ws_fixture(self, tr_id: str, records: list):
+        self._ws_fixtures[tr_id] = [record.split("^") if isinstance(record, str) else list(record) for record in records]
+
+    def ws_columns(self, tr_id: str) -> list:
+        with self._lock:
+            if self._ws_columns is None:
+                self._ws_columns = load_ws_columns()
+        return self._ws_columns.get(tr_id, [])
+
+    ########### REST
+
+    def _token_body(self) -> dict:
+        expired = datetime.now() + timedelta(days=1)
+        return {
+            "access_token": "mock-" + hashlib.sha256(os.urandom(16)).hexdigest(),
+            "access_token_token_expired": expired.strftime("%Y-%m-%d %H:%M:%S"),
+            "token_type": "Bearer",
+            "expires_in": 86400,
+        }
+
+    # (HTTP 상태코드, 응답 header, 응답 body)
+    def handle_rest(self, method: str, path: str, headers: dict, params: dict) -> tuple:
+        self.stats["rest_requests"] += 1
+        if path == "/oauth2/tokenP":
+            self.stats["tokens"] += 1
+            return 200, {}, self._token_body()
+        if path == "/oauth2/Approval":
+            approval_key = "mock-approval-" + os.urandom(8).hex()
+            with self._lock:
+                self._approval_keys.add(approval_key)
+            return 200, {}, {"approval_key": approval_key}
+        if path == "/oauth2/revokeP":
+            return 200, {}, {"code": 200, "message": "접근토큰 폐기에 성공하였습니다"}
+        if path == "/uapi/hashkey":
+            return 200, {}, {"BODY": params, "HASH": hashlib.sha256(json.dumps(params).encode()).hexdigest()}
+
+        if self._rate is not None and not self._rate.allow(headers.get("appkey", "")):
+            self.stats["throttled"] += 1
+            return 500, {}, {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+        tr_id = headers.get("tr_id")
+        if not tr_id:
+            return 500, {}, {"rt_cd": "1", "msg_cd": "EGW00205", "msg1": "tr_id 가 없습니다."}
+        self.stats[f"tr:{tr_id}"] += 1
+        self.stats[f"appkey:{headers.get('appkey', '')}"] += 1
+        with self._lock:
+            failure = self._failures.pop(0) if self._failures else None
+        if failure is not None:
+            self.stats["failed"] += 1
+            status, msg_cd = failure
+            return status, {}, {"rt_cd": "1", "msg_cd": msg_cd, "msg1": "일시적인 오류가 발생했습니다."}
+        if self.rest_delay > 0:
+            time.sleep(self.rest_delay)
+
+        page = self._request_page(headers, params)
+        pages = self._fixtures.get(tr_id)
+        if pages is not None:
+            body = dict(pages[min(page, len(pages) - 1)])
+            page_count = len(pages)
+        else:
+            body = self._synthetic_body(tr_id, params)
+            page_count = self.pages
+
+        more = page + 1 < page_count
+        cursor = f"{CURSOR_PREFIX}{page + 1:05d}" if more else ""
+        for key in [key for key in body if key.lower().startswith("ctx_area_")]:
+            body[key] = cursor
+        if pages is None:
+            body["ctx_area_fk100"] = body["ctx_area_nk100"] = cursor
+        return 200, {"tr_id": tr_id, "tr_cont": "M" if more else "D", "gt_uid": os.urandom(16).hex()}, body
+
+    # 연속조회(tr_cont N) 요청이면 연속조회 키에서 페이지 번호를 읽음
+    @staticmethod
+    def _request_page(headers: dict, params: dict) -> int:
+        if headers.get("tr_cont") != "N":
+            return 0
+        for value in params.values():
+            if isinstance(value, str) and value.startswith(CURSOR_PREFIX) and value[len(CURSOR_PREFIX):].isdigit():
+                return int(value[len(CURSOR_PREFIX):])
+        return 0
+
+    def _synthetic_body(self, tr_id: str, params: dict) -> dict:
+        columns = list(ka._getSchemaRegistry().get(tr_id, {})) or list(DEFAULT_COLUMNS)
+        key = next(
+            (value for name, value in params.items() if isinstance(value, str) and ("ISCD" in name.upper() or name.upper() == "PDNO") and value),
+            "005930",
+        )
+        rows = [dict(zip(columns, self._generator.record(columns, key))) for _ in range(self.page_rows)]
+        return {
+            "rt_cd": "0",
+            "msg_cd": "MCA00000",
+            "msg1": "정상처리 되었습니다.",
+            "output": rows[:1],
+            "output1": rows[:1],
+            "output2": rows,
+        }
+
+    ########### 웹소켓
+
+    def _frames(self, tr_id: str, key: str):
+        fixture = self._ws_fixtures.get(tr_id)
+        columns = self.ws_columns(tr_id) or list(DEFAULT_COLUMNS)
+        index = 0
+        while True:
+            records = []
+            for _ in range(self.records_per_frame):
+                if fixture:
+                    records.append(fixture[index % len(fixture)])
+                    index += 1
+                else:
+                    records.append(self._generator.record(columns, key))
+            yield len(records), "^".join(value for record in records for value in record)
+
+    async def _stream(self, ws, tr_id: str, key: str, aes: tuple):
+        import asyncio
+
+        encrypted = ENCRYPTED_TR_PATTERN.search(tr_id) is not None
+        sent = 0
+        for count, data in self._frames(tr_id, key):
+            if self.tick_limit is not None and sent >= self.tick_limit:
+                return
+            if encrypted:
+                frame = f"1|{tr_id}|{count:03d}|{_aes_encrypt(aes[0], aes[1], data)}"
+            else:
+                frame = f"0|{tr_id}|{count:03d}|{data}"
+            await ws.send(frame)
+            sent += 1
+            self.stats["ws_frames"] += 1
+            self.stats["ws_records"] += count
+            await asyncio.sleep(self.tick_interval)
+
+    async def _ping(self, ws):
+        import asyncio
+
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"header": {"tr_id": "PINGPONG", "datetime": datetime.now().strftime("%Y%m%d%H%M%S")}}))
+
+    @staticmethod
+    def _system_message(tr_id: str, tr_key: str, encrypt: str, ok: bool, msg: str, aes: tuple = None) -> str:
+        body = {"rt_cd": "0" if ok else "1", "msg_cd": "OPSP0000" if ok else "OPSP8996", "msg1": msg}
+        if aes is not None:
+            body["output"] = {"iv": aes[1], "key": aes[0]}
+        return json.dumps({"header": {"tr_id": tr_id, "tr_key": tr_key, "encrypt": encrypt}, "body": body})
+
+    async def handle_ws(self, ws):
+        import asyncio
+
+        rng = random.Random(self._seed)
+        aes = (_random_text(rng, 32), _random_text(rng, 16))  # 세션별 AES256 key, iv
+        streams = {}  # (tr_id, tr_key): 전송 태스크
+        ping = asyncio.create_task(self._ping(ws))
+        self.stats["ws_sessions"] += 1
+        self._ws_sessions.add(ws)
+        try:
+            async for raw in ws:
+                try:
+                    msg = json.loads(raw)
+                    tr_type = msg["header"]["tr_type"]
+                    tr_id = msg["body"]["input"]["tr_id"]
+                    tr_key = msg["body"]["input"]["tr_key"]
+                except (ValueError, KeyError, TypeError):
+                    await ws.send(self._system_message("", "", "N", False, "JSON PARSING ERROR"))
+                    continue
+
+                encrypt = "Y" if ENCRYPTED_TR_PATTERN.search(tr_id) else "N"
+                if msg["header"].get("approval_key") in self._expired_approval_keys:
+                    await ws.send(self._system_message(tr_id, tr_key, encrypt, False, "invalid approval : NOT FOUND"))
+                elif tr_type == "1":
+                    if (tr_id, tr_key) in streams:
+                        await ws.send(self._system_message(tr_id, tr_key, encrypt, False, "ALREADY IN SUBSCRIBE"))
+                    elif len(streams) >= MAX_SUBSCRIPTIONS:
+                        await ws.send(self._system_message(tr_id, tr_key, encrypt, False, "MAX SUBSCRIBE OVER"))
+                    else:
+                        await ws.send(self._system_message(tr_id, tr_key, encrypt, True, "SUBSCRIBE SUCCESS", aes))
+                        streams[(tr_id, tr_key)] = asyncio.create_task(self._stream(ws, tr_id, tr_key, aes))
+                elif tr_type == "2":
+                    task = streams.pop((tr_id, tr_key), None)
+                    if task is not None:
+                        task.cancel()
+                    await ws.send(self._system_message(tr_id, tr_key, encrypt, True, "UNSUBSCRIBE SUCCESS", aes))
+        except Exception as e:  # 연결 종료
+            logging.debug("mock websocket closed: %s", e)
+        finally:
+            self._ws_sessions.discard(ws)
+            ping.cancel()
+            for task in streams.values():
+                task.cancel()
+
+    # 모든 웹소켓 세션을 종료 메시지 없이 끊음 (네트워크 단절 흉내)
+    def drop_ws_connections(self):
+        def drop():
+            for ws in list(self._ws_sessions):
+                ws.transport.abort()
+
+        self._loop.call_soon_threadsafe(drop)
+
+    # 다음 count 건의 tr_id 요청을 HTTP status 와 msg_cd 오류로 응답 (재시도 테스트용)
+    # ex. fail_requests(1, 500, "EGW00201") : 초당 거래건수 초과
+    def fail_requests(self, count: int, status: int = 503, msg_cd: str = "EGW00500"):
+        with self._lock:
+            self._failures.extend([(status, msg_cd)] * count)
+
+    # 지금까지 발급한 웹소켓 접속키를 만료시킴 (만료된 접속키의 구독 요청은 invalid approval 로 응답)
+    def expire_approval_keys(self):
+        with self._lock:
+            self._expired_approval_keys |= self._approval_keys
+            self._approval_keys = set()
+
+    ########### 실행
+
+    def start(self):
+        self._start_rest()
+        self._start_ws()
+        logging.info("KIS mock server : %s, %s", self.rest_url, self.ws_url)
+        return self
+
+    def _start_rest(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            disable_nagle_algorithm = True  # header, body 를 따로 보내므로 지연 ACK 대기(약 40ms) 방지
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, method: str, params: dict):
+                path = self.path.split("?", 1)[0]
+                headers = {key.lower(): value for key, value in self.headers.items()}
+                status, reply_headers, body = server.handle_rest(method, path, headers, params)
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                for key, value in reply_headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                from urllib.parse import parse_qsl, urlsplit
+
+                self._reply("GET", dict(parse_qsl(urlsplit(self.path).query, keep_blank_values=True)))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                raw = self.rfile.read(length) if length > 0 else b""
+                try:
+                    params = json.loads(raw) if raw else {}
+                except ValueError:
+                    params = {}
+                self._reply("POST", params if isinstance(params, dict) else {})
+
+        self._http = ThreadingHTTPServer((self.host, self.rest_port), Handler)
+        self._http.daemon_threads = True
+        self.rest_port = self._http.server_address[1]
+        thread = threading.Thread(target=self._http.serve_forever, name="kis-mock-rest", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _start_ws(self):
+        import asyncio
+
+        from websockets.asyncio.server import serve
+
+        ready = threading.Event()
+
+        async def main():
+            self._ws_server = await serve(self.handle_ws, self.host, self.ws_port, ping_interval=None, max_queue=None)
+            self.ws_port = self._ws_server.sockets[0].getsockname()[1]
+            ready.set()
+            await self._ws_server.wait_closed()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(main())
+            self._loop.close()
+
+        thread = threading.Thread(target=run, name="kis-mock-ws", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        ready.wait()
+
+    def stop(self):
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+        if self._ws_server is not None:
+            self._loop.call_soon_threadsafe(self._ws_server.close)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def connect_kis_auth(module, server: MockKISServer):
+    """
+    kis_auth 모듈이 모의 서버에 접속하도록 설정
+
+    실전/모의투자 REST, 웹소켓 도메인을 모의 서버로 바꾸고, 모의 서버가 발급한 토큰이 실제 토큰 파일을
+    덮어쓰지 않도록 토큰 파일을 임시 폴더로 옮긴다. kis_devlp.yaml 이 없으면 MOCK_CONFIG 를 사용한다.
+
+    Args:
+        module: kis_auth 모듈
+        server (MockKISServer): 실행 중인 모의 서버
+    """
+    if not os.path.exists(module.config_path):
+        module._cfg._data = dict(MOCK_CONFIG)
+    module._cfg["prod"] = module._cfg["vps"] = server.rest_url
+    module._cfg["ops"] = module._cfg["vops"] = server.ws_url
+    module.token_tmp = os.path.join(tempfile.gettempdir(), f"KIS_mock_{server.rest_port}")
+    module._resetHeaderTemplates()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS Open API 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--rest-port", type=int, default=18080)
+    parser.add_argument("--ws-port", type=int, default=18081)
+    parser.add_argument("--fixtures", help="녹화된 응답 폴더 (<tr_id>.json, <tr_id>.ws)")
+    parser.add_argument("--rate-limit", type=int, help="앱키별 초당 호출 한도 (미지정시 제한 없음)")
+    parser.add_argument("--pages", type=int, default=1, help="합성 응답의 페이지 수")
+    parser.add_argument("--page-rows", type=int, default=20, help="합성 응답의 페이지당 레코드 수")
+    parser.add_argument("--tick-interval", type=float, default=0.1, help="실시간 데이터 전송 간격(초)")
+    parser.add_argument("--records-per-frame", type=int, default=1, help="실시간 메시지 하나에 담을 레코드 수")
+    parser.add_argument("--ping-interval", type=float, default=30.0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--rest-delay", type=float, default=0.0, help="REST 응답 지연(초)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockKISServer(
+        args.host, args.rest_port, args.ws_port, args.fixtures, args.rate_limit, args.pages, args.page_rows,
+        args.tick_interval, None, args.records_per_frame, args.ping_interval, args.seed, args.rest_delay,
+    ).start()
+    print(f"REST : {server.rest_url}\nWebSocket : {server.ws_url}\n(Ctrl+C 로 종료)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
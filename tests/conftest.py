@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# 토큰, 설정 파일이 실제 ~/KIS/config 를 건드리지 않도록 임시 HOME 사용 (kis_auth import 전에 설정)
+os.environ["HOME"] = tempfile.mkdtemp(prefix="kis-test-home-")
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "examples_user")
+sys.path[:0] = [ROOT, os.path.join(ROOT, "domestic_stock"), os.path.join(ROOT, "overseas_stock")]
+
+import kis_auth as ka  # noqa: E402
+from kis_mock_server import MockKISServer, connect_kis_auth  # noqa: E402
+
+
+@pytest.fixture
+def mock_server():
+    with MockKISServer() as server:
+        connect_kis_auth(ka, server)
+        yield server
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import kis_auth as ka
+
+
+@pytest.fixture
+def pool(mock_server):
+    ka._cfg._data["my_app_pool"] = [{"my_app": "MOCKPOOLKEY1", "my_sec": "MOCKPOOLSECRET1"}]
+    ka.load_app_key_pool("prod")  # auth() 전에 불러와도 기본 앱키는 auth() 의 토큰 사용
+    ka.auth()
+    yield ka._appKeyPool
+    ka._appKeyPool[:] = []
+    ka._cfg._data.pop("my_app_pool", None)
+
+
+def test_user_bound_requests_are_not_sharded(pool):
+    headers = {"appkey": pool[0].appkey}
+    for params in ({"USER_ID": "mockuser"}, {"user_id": "mockuser"}, {"CANO": "00000000"}):
+        assert all(ka._pickAppKeySlot(headers, params, False) is None for _ in range(4))
+    assert {ka._pickAppKeySlot(headers, {"FID_INPUT_ISCD": "005930"}, False) for _ in range(4)} == set(pool)
+
+
+def test_pool_token_is_reissued_before_expiry(pool):
+    slot = pool[1]
+    old = slot.getToken()
+    expiring = (datetime.now() + timedelta(seconds=60)).strftime("%Y-%m-%d %H:%M:%S")
+    ka._getTokenStore().write(ka._tokenPath(slot.appkey), old, expiring)  # 만료 임박
+
+    new = slot.getToken()
+    assert new is not None and new != old
+
+
+def test_sharded_quote_uses_current_tokens(pool, mock_server):
+    for _ in range(4):
+        res = ka._url_fetch(
+            "/uapi/domestic-stock/v1/quotations/inquire-price",
+            "FHKST01010100",
+            "",
+            {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"},
+        )
+        assert res.isOK()
+    assert [stat["calls"] for stat in ka.get_app_key_pool_stats()] == [2, 2]
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import kis_auth as ka
+
+QUOTE_URL = "/uapi/domestic-stock/v1/quotations/inquire-price"
+QUOTE_PARAMS = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+
+
+def _clients():
+    a = ka.KISClient("prod", appkey="CLIENT_A_KEY", appsecret="CLIENT_A_SECRET", account="11111111")
+    b = ka.KISClient("vps", appkey="CLIENT_B_KEY", appsecret="CLIENT_B_SECRET", account="22222222")
+    assert a.auth() and b.auth()
+    return a, b
+
+
+# 호출 도중 다른 클라이언트로 전환될 틈을 두고, 실행 중의 환경과 응답을 기록
+def _quote(seen, barrier):
+    barrier.wait()
+    env = ka.getTREnv()
+    time.sleep(0.05)
+    res = ka._url_fetch(QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+    seen.append((env.my_app, ka.getTREnv().my_acct, ka.isPaperTrading(), res.isOK()))
+
+
+def test_clients_isolated_between_threads(mock_server):
+    ka.auth()
+    global_env = ka.getTREnv()
+    a, b = _clients()
+    seen_a, seen_b = [], []
+    barrier = threading.Barrier(6)
+    try:
+        with ThreadPoolExecutor(6) as pool:
+            futures = [pool.submit(a.call, _quote, seen_a, barrier) for _ in range(3)]
+            futures += [pool.submit(b.call, _quote, seen_b, barrier) for _ in range(3)]
+            for future in futures:
+                future.result()
+    finally:
+        a.close()
+        b.close()
+
+    assert seen_a == [("CLIENT_A_KEY", "11111111", False, True)] * 3
+    assert seen_b == [("CLIENT_B_KEY", "22222222", True, True)] * 3
+    assert mock_server.stats["appkey:CLIENT_A_KEY"] == 3
+    assert mock_server.stats["appkey:CLIENT_B_KEY"] == 3
+    assert ka.getTREnv() == global_env  # 전역 환경은 그대로
+
+
+def test_clients_isolated_between_tasks(mock_server):
+    ka.auth()
+    global_app = ka.getTREnv().my_app
+    a, b = _clients()
+
+    async def use(client, n):
+        apps = []
+        with client.activate():
+            for _ in range(n):
+                await asyncio.sleep(0)  # 다른 태스크가 자신의 클라이언트를 활성화하도록 양보
+                apps.append(ka.getTREnv().my_app)
+            await client.call_async(ka._url_fetch, QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+        return apps
+
+    async def main():
+        return await asyncio.gather(use(a, 5), use(b, 5), use(a, 5))
+
+    try:
+        apps_a, apps_b, apps_a2 = asyncio.run(main())
+    finally:
+        a.close()
+        b.close()
+
+    assert apps_a == apps_a2 == ["CLIENT_A_KEY"] * 5
+    assert apps_b == ["CLIENT_B_KEY"] * 5
+    assert mock_server.stats["appkey:CLIENT_A_KEY"] == 2
+    assert mock_server.stats["appkey:CLIENT_B_KEY"] == 1
+    assert ka.getTREnv().my_app == global_app
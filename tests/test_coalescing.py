@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import kis_auth as ka
+
+QUOTE_URL = "/uapi/domestic-stock/v1/quotations/inquire-price"
+QUOTE_PARAMS = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+ORDER_URL = "/uapi/domestic-stock/v1/trading/order-cash"
+ORDER_PARAMS = {
+    "CANO": "12345678", "ACNT_PRDT_CD": "01", "PDNO": "005930", "ORD_DVSN": "00",
+    "ORD_QTY": "1", "ORD_UNPR": "70000", "EXCG_ID_DVSN_CD": "KRX", "SLL_TYPE": "", "CNDT_PRIC": "",
+}
+
+
+# 같은 요청 n 건을 동시에 보냄 (서버 응답을 늦춰 요청이 겹치도록 함)
+def _fetchTogether(n, *args, **kwargs):
+    barrier = threading.Barrier(n)
+
+    def fetch():
+        barrier.wait()
+        return ka._url_fetch(*args, **kwargs)
+
+    with ThreadPoolExecutor(n) as pool:
+        return list(pool.map(lambda _: fetch(), range(n)))
+
+
+def test_identical_requests_share_one_call(mock_server):
+    ka.auth()
+    mock_server.rest_delay = 0.3
+    before = ka.get_coalescing_stats()
+    ka.set_request_coalescing(True)
+    try:
+        results = _fetchTogether(5, QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+    finally:
+        ka.set_request_coalescing(False)
+
+    assert all(res.isOK() for res in results)
+    assert mock_server.stats["tr:FHKST01010100"] == 1
+    assert ka.get_coalescing_stats()["shared"] - before["shared"] == 4
+
+
+def test_different_requests_not_shared(mock_server):
+    ka.auth()
+    mock_server.rest_delay = 0.2
+    ka.set_request_coalescing(True)
+    try:
+        ka._url_fetch(QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+        ka._url_fetch(QUOTE_URL, "FHKST01010100", "", {**QUOTE_PARAMS, "FID_INPUT_ISCD": "000660"})
+    finally:
+        ka.set_request_coalescing(False)
+
+    assert mock_server.stats["tr:FHKST01010100"] == 2
+
+
+def test_orders_never_coalesced(mock_server):
+    ka.auth()
+    mock_server.rest_delay = 0.3
+    before = ka.get_coalescing_stats()
+    ka.set_request_coalescing(True)
+    try:
+        results = _fetchTogether(3, ORDER_URL, "TTTC0012U", "", ORDER_PARAMS, postFlag=True)
+    finally:
+        ka.set_request_coalescing(False)
+
+    assert all(res.isOK() for res in results)
+    assert mock_server.stats["tr:TTTC0012U"] == 3
+    assert ka.get_coalescing_stats() == before
+    assert not ka._isCoalescable("TTTC0012U", False)  # GET 이라도 주문/정정/취소 TR 은 제외
+
+
+def test_excluded_tr_ids_not_coalesced(mock_server):
+    ka.auth(svr="vps")
+    mock_server.rest_delay = 0.3
+    excluded = set(ka._noCoalesceTRs)
+    ka.set_request_coalescing(True, exclude_tr_ids=["FHKST01010100"])
+    try:
+        results = _fetchTogether(3, QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+    finally:
+        ka.set_request_coalescing(False)
+        ka._noCoalesceTRs.clear()
+        ka._noCoalesceTRs.update(excluded)
+
+    assert all(res.isOK() for res in results)
+    assert mock_server.stats["tr:FHKST01010100"] == 3
@@ -0,0 +1,19 @@
+import kis_auth as ka
+
+BALANCE_URL = "/uapi/domestic-stock/v1/trading/inquire-balance"
+
+
+def test_paper_trading_calls_and_pages_share_tr_id(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_useMetrics", True)
+    ka.reset_metrics()
+    ka.auth(svr="vps")
+    mock_server.pages = 2
+
+    ka.fetch_pages(BALANCE_URL, "TTTC8434R", {"CANO": "12345678"}, outputs=("output1",),
+                   cursor=ka.CTX_AREA_CURSOR_100)
+
+    # 호출 수와 페이지 수가 모의투자 TR id(VTTC8434R) 하나의 시계열에 기록
+    metrics = ka.get_metrics()
+    assert list(metrics) == [("VTTC8434R", BALANCE_URL)]
+    assert metrics[("VTTC8434R", BALANCE_URL)]["calls"] == 2
+    assert metrics[("VTTC8434R", BALANCE_URL)]["pages_per_call"] == 2.0
@@ -0,0 +1,20 @@
+import kis_auth as ka
+import overseas_stock_functions as osf
+
+
+def _chartPage(rows: list) -> dict:
+    return {"rt_cd": "0", "msg_cd": "MCA00000", "msg1": "정상처리 되었습니다.", "output1": {"rsym": "DNASTSLA"}, "output2": rows}
+
+
+def test_empty_chart_page_stops_paging(mock_server):
+    # 연속조회 가능(tr_cont M)인데 분봉 목록이 비어 있으면 다음 조회 키 없이 종료
+    ka.auth()
+    mock_server.add_fixture("HHDFS76950200", [_chartPage([]), _chartPage([{"xymd": "20241014", "xhms": "140100"}])])
+
+    df1, df2 = osf.inquire_time_itemchartprice(
+        auth="", excd="NAS", symb="TSLA", nmin="5", pinc="1", next="", nrec="120", fill="", keyb=""
+    )
+
+    assert mock_server.stats["tr:HHDFS76950200"] == 1
+    assert len(df1) == 1
+    assert df2.empty
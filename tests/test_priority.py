@@ -0,0 +1,66 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import kis_auth as ka
+
+QUOTE_URL = "/uapi/domestic-stock/v1/quotations/inquire-price"
+QUOTE_PARAMS = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+ORDER_URL = "/uapi/domestic-stock/v1/trading/order-cash"
+ORDER_PARAMS = {
+    "CANO": "12345678", "ACNT_PRDT_CD": "01", "PDNO": "005930", "ORD_DVSN": "00",
+    "ORD_QTY": "1", "ORD_UNPR": "70000", "EXCG_ID_DVSN_CD": "KRX", "SLL_TYPE": "", "CNDT_PRIC": "",
+}
+
+
+def _waitUntil(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_order_preempts_queued_quotes(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_usePriorityScheduler", True)
+    ka.set_rate_limit("prod", 2)
+    ka.auth()
+    limiter = ka._getRateLimiter()
+    done = []  # (요청 종류, 응답 받은 순서)
+    lock = threading.Lock()
+
+    def fetch(kind, *args, **kwargs):
+        res = ka._url_fetch(*args, **kwargs)
+        with lock:
+            done.append(kind)
+        return res
+
+    try:
+        with ThreadPoolExecutor(8) as pool:
+            quotes = [pool.submit(fetch, "quote", QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS) for _ in range(6)]
+            _waitUntil(lambda: limiter.queued() >= 3)  # 한도가 차서 시세 조회가 대기열에 쌓인 상태
+            queued = limiter.queued() - 1  # 대기열 맨 앞의 조회는 이미 자리를 얻었을 수 있음
+            order = pool.submit(fetch, "order", ORDER_URL, "TTTC0012U", "", ORDER_PARAMS, postFlag=True)
+            assert order.result().isOK()
+            assert all(quote.result().isOK() for quote in quotes)
+    finally:
+        ka.set_rate_limit("prod", ka._defaultRateLimits["prod"])
+
+    # 나중에 온 주문이 먼저 대기 중이던 시세 조회보다 앞서 전송됨
+    assert len(done) - done.index("order") - 1 >= queued >= 2
+    assert ka._requestPriority(ORDER_URL, "TTTC0012U", True) == ka.PRIORITY_ORDER
+
+
+def test_quotes_leave_reserve_for_orders(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_usePriorityScheduler", True)
+    limiter = ka.RateLimiter(10)
+    for _ in range(8):  # 시세 조회는 구간의 20% (2건)를 남겨둠
+        limiter.acquire(ka.PRIORITY_QUOTE)
+    assert limiter.available() == 2
+
+    started = time.monotonic()
+    limiter.acquire(ka.PRIORITY_ORDER)  # 주문은 남겨둔 자리로 바로 전송
+    assert time.monotonic() - started < 0.1
+
+    started = time.monotonic()
+    limiter.acquire(ka.PRIORITY_QUOTE)  # 시세 조회는 구간이 지날 때까지 대기
+    assert time.monotonic() - started > 0.5
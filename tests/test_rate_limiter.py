@@ -0,0 +1,83 @@
+import time
+
+import kis_auth as ka
+from kis_mock_server import _RateWindow
+
+
+def _maxPerWindow(times: list) -> int:
+    return max(sum(1 for t in times if start <= t < start + 1.0) for start in times)
+
+
+def test_first_second_does_not_burst():
+    limiter = ka.RateLimiter(5)
+    started = time.monotonic()
+    times = []
+    for _ in range(12):
+        limiter.acquire()
+        times.append(time.monotonic())
+
+    assert sum(1 for t in times if t < started + 1.0) <= 5
+    assert _maxPerWindow(times) <= 5
+
+
+def test_idle_bucket_does_not_burst():
+    limiter = ka.RateLimiter(5)
+    limiter.acquire()
+    time.sleep(1.5)  # 쉬고 난 뒤에도 1초 구간 한도를 넘지 않음
+    times = []
+    for _ in range(12):
+        limiter.acquire()
+        times.append(time.monotonic())
+
+    assert _maxPerWindow(times) <= 5
+
+
+def _acquireTimes(limiter: ka.RateLimiter, count: int) -> list:
+    started = time.monotonic()
+    times = []
+    for _ in range(count):
+        limiter.acquire()
+        times.append(time.monotonic() - started)
+    return times
+
+
+def test_fractional_rate():
+    limiter = ka.RateLimiter(0.5)  # 2초에 1건
+    times = _acquireTimes(limiter, 2)
+
+    assert limiter.capacity == 1
+    assert times[1] - times[0] >= 2.0
+
+
+def test_capacity_sets_burst_and_window():
+    limiter = ka.RateLimiter(10, capacity=5)  # 0.5초 구간에 5건
+    times = _acquireTimes(limiter, 10)
+    assert times[4] < 0.1 and 0.5 <= times[5] < 0.7
+    assert _maxPerWindow(times) <= 10
+
+    limiter = ka.RateLimiter(5, capacity=10)  # 한번에 10건, 2초 구간
+    times = _acquireTimes(limiter, 11)
+    assert times[9] < 0.1 and times[10] >= 2.0
+
+
+def test_server_rate_limit_not_exceeded(mock_server):
+    mock_server._rate = _RateWindow(5)
+    ka.set_rate_limit("prod", 5)
+    policy = ka._retryPolicy
+    ka.set_retry_policy(ka.RetryPolicy(max_retries=0))
+    try:
+        ka.auth()
+        results = [
+            ka._url_fetch(
+                "/uapi/domestic-stock/v1/quotations/inquire-price",
+                "FHKST01010100",
+                "",
+                {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"},
+            )
+            for _ in range(15)
+        ]
+    finally:
+        ka.set_retry_policy(policy)
+        ka.set_rate_limit("prod", ka._defaultRateLimits["prod"])
+
+    assert [res.getErrorCode() for res in results if not res.isOK()] == []
@@ -0,0 +1,71 @@
+import gc
+import weakref
+
+import kis_auth as ka
+
+
+# 타이머 만료 시점 실행 (cancel 로 finished 를 설정한 뒤 타이머 함수를 직접 실행)
+def _fire(timer):
+    timer.cancel()
+    timer.function()
+
+
+def test_enabling_after_auth_still_reauths(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_autoReAuth", False)
+    client = ka.KISClient("prod")
+    assert client.auth()
+    timer = client._reAuthTimers["rest"]
+
+    ka._autoReAuth = True  # auth() 이후에 켜도 예약된 타이머가 재발급
+    last_auth_time = client.last_auth_time
+    _fire(timer)
+    assert client.last_auth_time > last_auth_time
+    assert client._reAuthTimers["rest"] is not timer
+    client.close()
+
+
+def test_disabled_timer_stops_until_enabled(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_autoReAuth", False)
+    client = ka.KISClient("prod")
+    assert client.auth()
+    timer = client._reAuthTimers["rest"]
+
+    _fire(timer)  # 꺼져 있으면 재발급하지 않고 다시 예약하지도 않음
+    assert client._reAuthTimers["rest"] is timer and timer.finished.is_set()
+
+    ka.set_auto_reauth(True)  # 켜면 멈춘 타이머를 다시 예약
+    assert client._reAuthTimers["rest"] is not timer
+    assert not client._reAuthTimers["rest"].finished.is_set()
+    client.close()
+
+
+def test_approval_key_timer_keeps_rest_token(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_autoReAuth", True)
+    ka.auth()
+    ka.auth_ws()
+    token = ka.getTREnv().my_token
+    approval_key = ka._base_headers_ws["approval_key"]
+
+    _fire(ka._reAuthTimers["ws"])  # 접속키만 재발급, 요청 중인 REST 환경의 토큰은 그대로
+    assert ka._base_headers_ws["approval_key"] != approval_key
+    assert ka.getTREnv().my_token == token
+    assert not ka._reAuthTimers["ws"].finished.is_set()
+
+
+def test_timer_does_not_keep_client_alive(mock_server, monkeypatch):
+    monkeypatch.setattr(ka, "_autoReAuth", True)
+    client = ka.KISClient("prod")
+    assert client.auth() and client.auth_ws()
+    timers = list(client._reAuthTimers.values())
+    assert len(timers) == 2 and all(timer.daemon for timer in timers)
+
+    # 다시 인증하면 이전 타이머는 취소
+    assert client.auth()
+    assert timers[0].finished.is_set() and client._reAuthTimers["rest"] is not timers[0]
+    timers = list(client._reAuthTimers.values())
+
+    ref = weakref.ref(client)
+    del client
+    gc.collect()
+    assert ref() is None
+    assert all(timer.finished.is_set() for timer in timers)  # 사라진 클라이언트의 타이머는 취소
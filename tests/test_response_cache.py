@@ -0,0 +1,34 @@
+import kis_auth as ka
+import domestic_stock_functions as dsf
+
+
+def test_cache_policy_applies_in_paper_trading(mock_server):
+    ka.auth(svr="vps")
+    ka.clear_response_cache()
+    before = ka.get_cache_stats()["hits"]
+
+    # 캐시 정책은 실전투자 TR id(CTPF1002R)로 등록, 모의투자에서는 VTPF1002R 로 요청
+    for _ in range(3):
+        dsf.search_stock_info(prdt_type_cd="300", pdno="005930")
+
+    assert mock_server.stats["tr:VTPF1002R"] == 1
+    assert ka.get_cache_stats()["hits"] - before == 2
+    assert ka._requestPriority("/uapi/domestic-stock/v1/quotations/search-stock-info", "VTPF1002R", False) \
+        == ka.PRIORITY_REFERENCE
+
+
+def test_cache_hit_returns_fresh_response(mock_server):
+    ka.auth()
+    ka.clear_response_cache()
+    params = {"PRDT_TYPE_CD": "300", "PDNO": "005930"}
+    url = "/uapi/domestic-stock/v1/quotations/search-stock-info"
+
+    first = ka._url_fetch(url, "CTPF1002R", "", params)
+    first.getBody().output.clear()  # 호출한 쪽에서 응답을 변경해도
+    second = ka._url_fetch(url, "CTPF1002R", "", params)
+    second.getBody().output.clear()
+    third = ka._url_fetch(url, "CTPF1002R", "", params)
+
+    assert mock_server.stats["tr:CTPF1002R"] == 1
+    assert second is not third
+    assert len(third.getBody().output) > 0  # 캐시 적중 결과는 원래 응답 그대로
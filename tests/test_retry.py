@@ -0,0 +1,78 @@
+import kis_auth as ka
+
+QUOTE_URL = "/uapi/domestic-stock/v1/quotations/inquire-price"
+QUOTE_PARAMS = {"FID_COND_MRKT_DIV_CODE": "J", "FID_INPUT_ISCD": "005930"}
+ORDER_URL = "/uapi/domestic-stock/v1/trading/order-cash"
+ORDER_PARAMS = {
+    "CANO": "12345678", "ACNT_PRDT_CD": "01", "PDNO": "005930", "ORD_DVSN": "00",
+    "ORD_QTY": "1", "ORD_UNPR": "70000", "EXCG_ID_DVSN_CD": "KRX", "SLL_TYPE": "", "CNDT_PRIC": "",
+}
+
+
+def _fastRetry():
+    policy = ka._retryPolicy
+    ka.set_retry_policy(ka.RetryPolicy(max_retries=3, base_delay=0.01, max_delay=0.05))
+    return policy
+
+
+def test_get_retries_transient_errors(mock_server):
+    ka.auth()
+    policy = _fastRetry()
+    before = ka.get_retry_stats()
+    try:
+        mock_server.fail_requests(2)
+        res = ka._url_fetch(QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+    finally:
+        ka.set_retry_policy(policy)
+
+    after = ka.get_retry_stats()
+    assert res.isOK()
+    assert mock_server.stats["tr:FHKST01010100"] == 3
+    assert after["transient"] - before["transient"] == 2
+    assert after["retried_calls"] - before["retried_calls"] == 1
+
+
+def test_post_not_retried_on_transient_error(mock_server):
+    ka.auth()
+    policy = _fastRetry()
+    before = ka.get_retry_stats()
+    try:
+        mock_server.fail_requests(1)
+        res = ka._url_fetch(ORDER_URL, "TTTC0012U", "", ORDER_PARAMS, postFlag=True)
+    finally:
+        ka.set_retry_policy(policy)
+
+    # 주문은 서버에 접수되었을 수 있으므로 일시 오류에 재전송하지 않는다
+    assert not res.isOK()
+    assert mock_server.stats["tr:TTTC0012U"] == 1
+    assert ka.get_retry_stats()["retries"] == before["retries"]
+
+
+def test_post_retried_on_throttle(mock_server):
+    ka.auth()
+    policy = _fastRetry()
+    before = ka.get_retry_stats()
+    try:
+        mock_server.fail_requests(1, 500, "EGW00201")  # 호출 한도 초과는 처리되지 않은 요청
+        res = ka._url_fetch(ORDER_URL, "TTTC0012U", "", ORDER_PARAMS, postFlag=True)
+    finally:
+        ka.set_retry_policy(policy)
+
+    assert res.isOK()
+    assert mock_server.stats["tr:TTTC0012U"] == 2
+    assert ka.get_retry_stats()["throttle"] - before["throttle"] == 1
+
+
+def test_retry_gives_up_after_max_retries(mock_server):
+    ka.auth()
+    policy = _fastRetry()
+    before = ka.get_retry_stats()
+    try:
+        mock_server.fail_requests(4)
+        res = ka._url_fetch(QUOTE_URL, "FHKST01010100", "", QUOTE_PARAMS)
+    finally:
+        ka.set_retry_policy(policy)
+
+    assert not res.isOK()
+    assert mock_server.stats["tr:FHKST01010100"] == 4
+    assert ka.get_retry_stats()["gave_up"] - before["gave_up"] == 1
@@ -0,0 +1,24 @@
+import pandas as pd
+
+import kis_auth as ka
+
+
+def test_sign_and_name_columns_stay_text():
+    assert ka._inferDtype("prdy_vrss_sign", "전일 대비") is None
+    assert ka._inferDtype("nav_prdy_vrss_sign", "NAV 전일 대비 일자") is None
+    assert ka._inferDtype("hts_kor_isnm", "HTS 한글 종목명 시간") is None
+    assert ka._inferDtype("CNTG_ISNM40", "체결종목명 일자") is None
+    assert ka._inferDtype("prdt_name", "상품명 대비") is None
+    assert ka._inferDtype("prdy_vrss", "전일 대비") == "int"
+
+
+def test_registered_schema_keeps_sign_text():
+    # 국내주식 예상체결지수 추이 (FHPST01840000) : 부호는 문자열, 등락률은 float
+    schema = ka._getSchemaRegistry()["FHPST01840000"]
+    assert "prdy_vrss_sign" not in schema
+    assert schema["prdy_ctrt"] == "float"
+
+    df = ka.apply_schema(pd.DataFrame([{"prdy_vrss_sign": "2", "prdy_ctrt": "1.25"}]), "FHPST01840000")
+    assert df["prdy_vrss_sign"].tolist() == ["2"]
+    assert df["prdy_ctrt"].tolist() == [1.25]
+    assert "CNTG_ISNM40" not in ka._getSchemaRegistry()["H0STCNI0"]
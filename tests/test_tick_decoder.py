@@ -0,0 +1,23 @@
+import kis_auth as ka
+
+COLUMNS = ["MKSC_SHRN_ISCD", "STCK_CNTG_HOUR", "STCK_PRPR", "PRDY_VRSS_SIGN", "PRDY_CTRT", "CNTG_VOL"]
+
+
+def test_typed_decode_keeps_non_numeric_values():
+    decoder = ka.TickDecoder("H0STCNT0", COLUMNS, "tuple", typed=True)
+    payload = "^".join(["005930", "093000", "71000", "2", "1.25", "10"]
+                       + ["000660", "093000", "-", "3", " ", "12.5"])
+
+    rows = decoder.decode(payload, 2)
+
+    assert rows[0] == ("005930", "093000", 71000, "2", 1.25, 10)
+    assert rows[1] == ("000660", "093000", "-", "3", " ", 12.5)  # 변환할 수 없는 값은 문자열 그대로
+
+
+def test_typed_record_decode_with_blank_values():
+    decoder = ka.TickDecoder("H0STCNT0", COLUMNS, "record", typed=True)
+
+    record = decoder.decode("005930^093000^^2^^-", 1)[0]
+
+    assert record.STCK_PRPR is None and record.PRDY_CTRT is None
+    assert record.CNTG_VOL == "-"
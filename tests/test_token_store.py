@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+import time
+
+import kis_auth as ka
+
+# 같은 앱키로 동시에 토큰을 요청하는 프로세스 (start_at 시각에 함께 시작)
+_CHILD = """
+import sys, time
+from types import SimpleNamespace
+import kis_auth as ka
+from kis_mock_server import connect_kis_auth
+
+rest_url, ws_url, rest_port, start_at = sys.argv[1], sys.argv[2], int(sys.argv[3]), float(sys.argv[4])
+connect_kis_auth(ka, SimpleNamespace(rest_url=rest_url, ws_url=ws_url, rest_port=rest_port))
+client = ka.KISClient("prod", appkey="SHARED_APP_KEY", appsecret="SHARED_APP_SECRET")
+time.sleep(max(0.0, start_at - time.time()))
+assert client.auth()
+client.close()
+print(client.getTREnv().my_token)
+"""
+
+
+def _issueTogether(server, n):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    start_at = str(time.time() + 1.0)
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", _CHILD, server.rest_url, server.ws_url, str(server.rest_port), start_at],
+            env=env, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(n)
+    ]
+    tokens = [proc.communicate(timeout=60)[0].strip() for proc in procs]
+    assert [proc.returncode for proc in procs] == [0] * n
+    return tokens
+
+
+def test_processes_share_one_token(mock_server):
+    token_path = ka._tokenPath("SHARED_APP_KEY")
+    if os.path.exists(token_path):
+        os.remove(token_path)
+
+    tokens = _issueTogether(mock_server, 4)
+
+    # 먼저 잠금을 얻은 프로세스만 발급하고 나머지는 저장된 토큰을 사용
+    assert mock_server.stats["tokens"] == 1
+    assert len(set(tokens)) == 1 and tokens[0].startswith("mock-")
+    assert ka.TokenStore().read(token_path) == tokens[0]
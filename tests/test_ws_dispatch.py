@@ -0,0 +1,116 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import kis_auth as ka
+from domestic_stock_functions_ws import ccnl_krx
+
+
+# 첫 메시지 처리를 gate 로 멈춰 둔 상태에서 items 를 넣고, 처리된 순서와 통계를 반환
+async def _fill(dispatch: ka.WSDispatchQueue, items: list):
+    gate = threading.Event()
+    handled = []
+
+    def handler(tr_id, item):
+        gate.wait()
+        handled.append(item)
+
+    dispatch.start(handler)
+    await dispatch.put("H0STCNT0", None, "first")
+    await asyncio.sleep(0.05)  # 작업자가 first 를 꺼내 대기
+    putter = asyncio.create_task(_putAll(dispatch, items))
+    await asyncio.sleep(0.05)
+    blocked = not putter.done()
+    gate.set()
+    await asyncio.wait_for(putter, 2)
+    for _ in range(100):
+        if sum(dispatch.dispatched.values()) + sum(dispatch.dropped.values()) >= len(items) + 1:
+            break
+        await asyncio.sleep(0.01)
+    dispatch.close()
+    return handled, dispatch.stats()["H0STCNT0"], blocked
+
+
+async def _putAll(dispatch, items):
+    for key, item in items:
+        await dispatch.put("H0STCNT0", key, item)
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_drop_oldest(threads):
+    dispatch = ka.WSDispatchQueue(maxsize=2, overflow="drop_oldest", threads=threads)
+    handled, stats, _ = asyncio.run(_fill(dispatch, [(None, "a"), (None, "b"), (None, "c"), (None, "d")]))
+
+    assert handled == ["first", "c", "d"]
+    assert stats["dropped"] == 2 and stats["max_depth"] == 2
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_conflate_keeps_latest_per_key(threads):
+    dispatch = ka.WSDispatchQueue(maxsize=10, overflow="conflate", threads=threads)
+    handled, stats, _ = asyncio.run(_fill(dispatch, [("005930", "a1"), ("000660", "b1"), ("005930", "a2")]))
+
+    assert handled == ["first", "a2", "b1"]
+    assert stats["dropped"] == 1
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_block_waits_for_space(threads):
+    dispatch = ka.WSDispatchQueue(maxsize=1, overflow="block", threads=threads)
+    handled, stats, blocked = asyncio.run(_fill(dispatch, [(None, "a"), (None, "b"), (None, "c")]))
+
+    assert blocked  # 대기열이 가득 차 있는 동안 put 이 기다림
+    assert handled == ["first", "a", "b", "c"]
+    assert stats["dropped"] == 0
+
+
+def test_slow_callback_does_not_delay_receiving(mock_server):
+    mock_server.tick_interval = 0.01
+    ka.auth_ws()
+    kws = ka.KISWebSocket(api_url="/tryitout", subscriptions={})
+    ka.add_open_map("ccnl_krx", ccnl_krx, ["005930", "000660"], target=kws.subscriptions)
+    dispatch = ka.WSDispatchQueue(maxsize=10)
+    handled = []
+
+    def on_result(ws, tr_id, records, data_info):
+        time.sleep(0.3)  # 느린 전략 콜백
+        handled.append(tr_id)
+
+    async def main():
+        task = asyncio.create_task(kws.start_async(on_result, result_type="tuple", dispatch=dispatch))
+        await asyncio.sleep(1.0)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+
+    assert 1 <= len(handled) <= 5
+    assert kws.messages >= 50  # 콜백이 처리하는 동안에도 계속 수신
+    assert dispatch.stats()["H0STCNT0"]["dropped"] > 0
+
+
+@pytest.mark.parametrize("threads", [False, True])
+def test_async_handler_runs_on_event_loop(threads):
+    dispatch = ka.WSDispatchQueue(threads=threads)
+    loops = []
+
+    async def handle(item):
+        await asyncio.sleep(0)
+        loops.append((item, asyncio.get_running_loop()))
+
+    async def main():
+        dispatch.start(lambda tr_id, item: handle(item))
+        for item in ("a", "b"):
+            await dispatch.put("H0STCNT0", None, item)
+        await asyncio.sleep(0.3)
+        dispatch.close()
+        return asyncio.get_running_loop()
+
+    loop = asyncio.run(main())
+    assert [item for item, _ in loops] == ["a", "b"]
+    assert all(running is loop for _, running in loops)
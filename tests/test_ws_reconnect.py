@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import pytest
+
+import kis_auth as ka
+from domestic_stock_functions_ws import ccnl_krx, asking_price_krx
+
+
+def _websocket(**kwargs) -> ka.KISWebSocket:
+    ka.auth_ws()
+    kws = ka.KISWebSocket(api_url="/tryitout", subscriptions={}, backoff_base=0.1, backoff_max=0.2, **kwargs)
+    ka.add_open_map("ccnl_krx", ccnl_krx, ["005930", "000660"], target=kws.subscriptions)
+    ka.add_open_map("asking_price_krx", asking_price_krx, ["005930"], target=kws.subscriptions)
+    return kws
+
+
+async def _cancel(task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def test_one_gap_per_outage(mock_server):
+    mock_server.tick_interval = 0.01
+    kws = _websocket(max_retries=5)
+    gaps = []
+
+    async def main():
+        task = asyncio.create_task(kws.start_async(lambda *args: None, result_type="tuple", on_gap=gaps.append))
+        await asyncio.sleep(0.5)
+        for _ in range(2):
+            mock_server.drop_ws_connections()
+            await asyncio.sleep(1.0)
+        await _cancel(task)
+
+    asyncio.run(main())
+
+    assert kws.reconnects == 2
+    assert len(gaps) == 2
+    assert gaps[0]["end"] <= gaps[1]["start"]  # 구간이 겹치지 않음
+    for gap in gaps:
+        assert gap["start"] < gap["end"]
+        assert gap["tr_ids"] == {"H0STCNT0": ["005930", "000660"], "H0STASP0": ["005930"]}
+
+
+def test_rejected_approval_backs_off_and_gives_up(mock_server, monkeypatch):
+    mock_server.tick_interval = 0.01
+    kws = _websocket(max_retries=3)
+    gaps = []
+
+    async def noRefresh(self):  # 접속키 재발급 실패
+        pass
+
+    monkeypatch.setattr(ka.KISWebSocket, "_KISWebSocket__refreshApproval", noRefresh)
+
+    async def main():
+        task = asyncio.create_task(kws.start_async(lambda *args: None, result_type="tuple", on_gap=gaps.append))
+        await asyncio.sleep(0.5)
+        mock_server.expire_approval_keys()
+        mock_server.drop_ws_connections()
+        # 접속은 되지만 구독 등록이 거부되므로 재시도 횟수가 초기화되지 않고 max_retries 후 종료
+        await asyncio.wait_for(task, 5)
+
+    asyncio.run(main())
+
+    assert kws.retry_count == 3
+    assert kws.reconnects == 0
+    assert len(gaps) == 1 and gaps[0]["end"] is None
+
+
+def test_pool_issues_approval_keys_off_the_event_loop(mock_server, monkeypatch):
+    issue = ka.KISClient.auth_ws
+
+    def slowAuthWs(self):  # 접속키 발급 응답이 느린 경우
+        time.sleep(0.3)
+        return issue(self)
+
+    monkeypatch.setattr(ka.KISClient, "auth_ws", slowAuthWs)
+    pool = ka.KISWebSocketPool("/tryitout", clients=[ka.KISClient("prod"), ka.KISClient("prod")], max_retries=1)
+    pool.subscribe(ccnl_krx, ["005930", "000660"])
+    ticks = []
+
+    async def heartbeat():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.05)
+
+    async def main():
+        beat = asyncio.create_task(heartbeat())
+        task = asyncio.create_task(pool.start_async(lambda *args: None))
+        await asyncio.sleep(0.5)
+        await _cancel(task)
+        await _cancel(beat)
+
+    asyncio.run(main())
+
+    assert all("approval_key" in client.headers_ws for client in pool.clients)
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.25  # 발급하는 동안에도 이벤트 루프가 동작
+
+
+def test_pool_stops_all_sessions_when_one_fails(mock_server, monkeypatch):
+    mock_server.tick_interval = 0.01
+    pool = ka.KISWebSocketPool("/tryitout", clients=[ka.KISClient("prod"), ka.KISClient("prod")], max_retries=1)
+    pool.subscribe(ccnl_krx, ["005930", "000660"])
+    start = ka.KISWebSocket.start_async
+
+    async def failingStart(self, *args, **kwargs):
+        if self is pool.connections[1]:
+            await asyncio.sleep(0.3)
+            raise RuntimeError("session failed")
+        await start(self, *args, **kwargs)
+
+    monkeypatch.setattr(ka.KISWebSocket, "start_async", failingStart)
+
+    async def main():
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(pool.start_async(lambda *args: None, result_type="tuple"), 5)
+        messages = pool.connections[0].messages
+        await asyncio.sleep(0.3)
+        return messages
+
+    messages = asyncio.run(main())
+    assert messages > 0
+    assert pool.connections[0].messages == messages  # 남은 세션도 종료되어 더 이상 수신하지 않음
+    assert not pool.connections[0].connected
+
+
+def test_pool_queue_is_bounded():
+    pool = ka.KISWebSocketPool("/tryitout", queue_size=3)
+
+    async def main():
+        pool._queue = asyncio.Queue(maxsize=pool.queue_size)
+        for i in range(5):
+            pool._KISWebSocketPool__enqueue(None, "H0STCNT0", i, {})
+        return [pool._queue.get_nowait()[2] for _ in range(pool._queue.qsize())]
+
+    assert asyncio.run(main()) == [2, 3, 4]
+    assert pool.stats()["dropped"] == 2
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import kis_auth as ka
+from domestic_stock_functions_ws import ccnl_krx, asking_price_krx
+
+
+def _websocket() -> ka.KISWebSocket:
+    ka.auth_ws()
+    kws = ka.KISWebSocket(api_url="/tryitout", subscriptions={})
+    ka.add_open_map("ccnl_krx", ccnl_krx, ["005930"], target=kws.subscriptions)
+    return kws
+
+
+async def _cancel(task):
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+# 세션을 실행 중인 이벤트 루프의 다른 태스크를 모두 취소
+async def _stop():
+    for task in asyncio.all_tasks():
+        if task is not asyncio.current_task():
+            task.cancel()
+
+
+def test_subscriptions_change_while_running(mock_server):
+    mock_server.tick_interval = 0.01
+    kws = _websocket()
+    received = set()  # 수신한 (tr_id, 종목)
+
+    def on_result(ws, tr_id, rows, data_map):
+        received.update((tr_id, row[0]) for row in rows)
+
+    # 구독을 바꾸고, 해제 전에 보낸 메시지가 도착할 시간을 둔 뒤 새로 수신한 (tr_id, 종목)
+    async def change(coro):
+        result = await coro
+        await asyncio.sleep(0.2)
+        received.clear()
+        await asyncio.sleep(0.3)
+        return result, set(received)
+
+    async def main():
+        task = asyncio.create_task(kws.start_async(on_result, result_type="tuple"))
+        await asyncio.sleep(0.5)
+        assert received == {("H0STCNT0", "005930")}
+
+        result, seen = await change(kws.add_subscriptions(ccnl_krx, ["000660", "005930"]))
+        assert result["added"] == [("H0STCNT0", "000660")]  # 이미 구독 중인 종목은 다시 등록하지 않음
+        assert seen == {("H0STCNT0", "005930"), ("H0STCNT0", "000660")}
+
+        result, seen = await change(kws.remove_subscriptions(ccnl_krx, "005930"))
+        assert result["removed"] == [("H0STCNT0", "005930")]
+        assert seen == {("H0STCNT0", "000660")}
+
+        result, seen = await change(kws.set_subscriptions(asking_price_krx, ["035720"]))
+        assert seen == {("H0STCNT0", "000660"), ("H0STASP0", "035720")}
+
+        result, seen = await change(kws.set_subscriptions(ccnl_krx, ["035720"]))
+        assert result == {"added": [("H0STCNT0", "035720")], "removed": [("H0STCNT0", "000660")]}
+        assert seen == {("H0STCNT0", "035720"), ("H0STASP0", "035720")}
+
+        await _cancel(task)
+
+    asyncio.run(main())
+
+    assert sorted(kws.subscribed()) == [("H0STASP0", "035720"), ("H0STCNT0", "035720")]
+    assert kws.free_slots() == 38
+
+
+def test_over_max_subscriptions_changes_nothing(mock_server):
+    kws = _websocket()
+    codes = [f"{i:06d}" for i in range(41)]
+
+    with pytest.raises(ValueError):
+        asyncio.run(kws.set_subscriptions(ccnl_krx, codes))  # 접속 전이면 다음 접속할 때 적용
+    assert kws.subscribed() == [("H0STCNT0", "005930")]
+    assert kws.free_slots() == 39
+
+    asyncio.run(kws.set_subscriptions(ccnl_krx, codes[:40]))
+    assert kws.free_slots() == 0
+    with pytest.raises(ValueError):
+        asyncio.run(kws.add_subscriptions(asking_price_krx, "005930"))
+
+
+def test_subscribe_from_another_thread(mock_server):
+    mock_server.tick_interval = 0.01
+    kws = _websocket()
+    received = set()
+    started = threading.Event()
+
+    def on_result(ws, tr_id, rows, data_map):
+        received.update(row[0] for row in rows)
+        started.set()
+
+    def session():
+        try:
+            asyncio.run(kws.start_async(on_result, result_type="tuple"))
+        except asyncio.CancelledError:  # _stop 으로 종료
+            pass
+
+    thread = threading.Thread(target=session, daemon=True)
+    thread.start()
+    assert started.wait(5)
+
+    result = kws.run_threadsafe(kws.add_subscriptions(ccnl_krx, "000660")).result(5)
+    assert result["added"] == [("H0STCNT0", "000660")]
+    time.sleep(0.3)
+    assert "000660" in received
+
+    kws.run_threadsafe(_stop()).result(5)
+    thread.join(5)
+    assert not thread.is_alive()
+